@@ -0,0 +1,29 @@
+# Memetakan modul proyek (waiz-<nama>.py) ke nama import-nya (<nama>)
+# agar benchmark bisa dijalankan langsung dari repositori
+import os
+import sys
+import importlib.abc
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _WaizModuleFinder(importlib.abc.MetaPathFinder):
+    def find_spec(self, fullname, path, target=None):
+        if '.' in fullname:
+            return None
+        candidate = os.path.join(ROOT, f"waiz-{fullname}.py")
+        if os.path.exists(candidate):
+            return importlib.util.spec_from_file_location(fullname, candidate)
+        return None
+
+
+def install():
+    """Pasang finder modul proyek (idempoten)"""
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    if not any(isinstance(finder, _WaizModuleFinder) for finder in sys.meta_path):
+        sys.meta_path.append(_WaizModuleFinder())
+
+
+install()
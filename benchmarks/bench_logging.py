@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark overhead logging per pesan: pola lama (f-string, dump payload
+penuh, handler sinkron) dibandingkan log_setup (format malas, pemotongan
+payload, sampling, QueueHandler)
+
+"request_cpu" adalah waktu CPU thread pemanggil (time.thread_time), yaitu
+biaya yang ditanggung thread request; "total" adalah waktu wall-clock
+termasuk menunggu listener menulis seluruh antrean.
+
+Contoh:
+    python benchmarks/bench_logging.py --messages 20000 --sample-rate 0.1
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import _bootstrap  # noqa: F401
+
+import log_setup
+from log_setup import Payload
+
+logger = logging.getLogger("bench")
+
+USER_ID = "6281234567890"
+MESSAGE = "tambahkan teks ke bagian pendahuluan: " + "isi laporan kegiatan bulanan " * 8
+WEBHOOK = {
+    "object": "whatsapp_business_account",
+    "entry": [{"id": "1234567890", "changes": [{"field": "messages", "value": {
+        "messaging_product": "whatsapp",
+        "metadata": {"display_phone_number": "6280000000", "phone_number_id": "1098765432"},
+        "contacts": [{"profile": {"name": "Pengguna"}, "wa_id": USER_ID}],
+        "messages": [{"from": USER_ID, "id": "wamid." + "A" * 48, "timestamp": "1700000000",
+                      "type": "text", "text": {"body": MESSAGE}}],
+    }}]}],
+}
+ENTITIES = {"text_content": MESSAGE, "section": "pendahuluan"}
+CONTEXT = {"current_document": "doc-" + "b" * 32, "last_intent": "add_text",
+           "history": [{"intent": "add_text", "text": MESSAGE}] * 5}
+RESPONSE = json.dumps({"messaging_product": "whatsapp", "contacts": [{"input": USER_ID, "wa_id": USER_ID}],
+                       "messages": [{"id": "wamid." + "C" * 48}]})
+
+
+def log_message_before():
+    logger.info(f"Received webhook data: {WEBHOOK}")
+    logger.info(f"Processing message from {USER_ID}: {MESSAGE}")
+    logger.info(f"Detected intent: add_text with entities: {ENTITIES}")
+    logger.debug(f"Updated context for {USER_ID}: {CONTEXT}")
+    logger.info(f"Handling intent: add_text with entities: {ENTITIES}")
+    logger.info(f"WhatsApp API response: 200 - {RESPONSE}")
+
+
+def log_message_after():
+    logger.info("Received webhook: %s bytes", 900, extra={"event": "webhook_received", "bytes": 900})
+    logger.debug("Webhook data: %s", Payload(WEBHOOK))
+    logger.info("Processing message from %s: %s", USER_ID, Payload(MESSAGE, 200),
+                extra={"event": "message_received", "user_id": USER_ID})
+    logger.info("Detected intent: %s with entities: %s", "add_text", Payload(ENTITIES),
+                extra={"event": "intent_detected", "intent": "add_text"})
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Updated context for %s: %s", USER_ID, Payload(dict(CONTEXT)),
+                     extra={"event": "context_updated", "user_id": USER_ID})
+    logger.info("Handling intent: %s with entities: %s", "add_text", Payload(ENTITIES),
+                extra={"event": "intent_handled", "intent": "add_text"})
+    logger.info("WhatsApp API response: %s - %s", 200, Payload(RESPONSE, 256),
+                extra={"event": "whatsapp_response", "status": 200})
+
+
+def run(name, function, messages, stream, **setup):
+    if setup:
+        # Antrean cukup besar agar tidak ada record yang dibuang selama pengukuran
+        log_setup.setup_logging(stream=stream, queue_size=messages * 8, **setup)
+    else:
+        # Konfigurasi lama: basicConfig dengan handler sinkron
+        log_setup.stop_logging()
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter(log_setup.TEXT_FORMAT))
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+
+    dropped = log_setup.LOG_DROPPED._default.get()
+    start_pos = stream.tell()
+    start = time.perf_counter()
+    cpu_start = time.thread_time()
+    for _ in range(messages):
+        function()
+    request_cpu = time.thread_time() - cpu_start
+    log_setup.stop_logging()
+    total_time = time.perf_counter() - start
+    stream.flush()
+
+    return {
+        "mode": name,
+        "request_cpu_us_per_message": round(request_cpu / messages * 1e6, 2),
+        "total_us_per_message": round(total_time / messages * 1e6, 2),
+        "bytes_per_message": round((stream.tell() - start_pos) / messages, 1),
+        "dropped": log_setup.LOG_DROPPED._default.get() - dropped,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark overhead logging per pesan")
+    parser.add_argument("--messages", type=int, default=20000, help="Jumlah pesan yang disimulasikan")
+    parser.add_argument("--sample-rate", type=float, default=0.1, help="Sampling event bervolume tinggi")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as stream:
+        results = [
+            run("before", log_message_before, args.messages, stream),
+            run("text_sync", log_message_after, args.messages, stream, use_queue=False),
+            run("text_queue", log_message_after, args.messages, stream),
+            run("json_queue", log_message_after, args.messages, stream, fmt="json"),
+            run("json_queue_sampled", log_message_after, args.messages, stream, fmt="json",
+                sample_rate=args.sample_rate),
+        ]
+    print(json.dumps(results, indent=2), file=sys.__stdout__)
+
+
+if __name__ == "__main__":
+    main()
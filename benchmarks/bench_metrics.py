@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark overhead pencatatan metrik: ns per operasi untuk counter, counter
+berlabel, histogram dan timer, serta throughput saat banyak thread mencatat
+metrik yang sama
+
+Contoh:
+    python benchmarks/bench_metrics.py --iterations 500000 --threads 8
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import _bootstrap  # noqa: F401
+
+from metrics import MetricsRegistry
+
+
+def per_op_ns(function, iterations):
+    start = time.perf_counter_ns()
+    function(iterations)
+    return (time.perf_counter_ns() - start) / iterations
+
+
+def empty_loop(n):
+    for _ in range(n):
+        pass
+
+
+def bench_single(registry, iterations):
+    counter = registry.counter("bench_counter_total", "counter")
+    labelled = registry.counter("bench_labelled_total", "counter berlabel", ("intent",))
+    histogram = registry.histogram("bench_seconds", "histogram")
+
+    def inc(n):
+        for _ in range(n):
+            counter.inc()
+
+    def labels_inc(n):
+        for _ in range(n):
+            labelled.labels("create_document").inc()
+
+    def observe(n):
+        for _ in range(n):
+            histogram.observe(0.042)
+
+    def timer(n):
+        for _ in range(n):
+            with histogram.time():
+                pass
+
+    baseline = per_op_ns(empty_loop, iterations)
+    return {
+        name: round(per_op_ns(function, iterations) - baseline, 1)
+        for name, function in (("counter_inc", inc), ("labels_inc", labels_inc),
+                               ("histogram_observe", observe), ("histogram_time", timer))
+    }
+
+
+def bench_threads(registry, iterations, threads):
+    labelled = registry.counter("bench_threads_total", "counter berlabel", ("intent",))
+    histogram = registry.histogram("bench_threads_seconds", "histogram")
+    per_thread = iterations // threads
+
+    def work():
+        child = labelled.labels("send_message")
+        for i in range(per_thread):
+            child.inc()
+            histogram.observe(i * 1e-6)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter_ns()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter_ns() - start
+
+    total = per_thread * threads
+    assert labelled.labels("send_message").get() == total, "counter kehilangan increment"
+    return {"threads": threads, "ops": total * 2, "ns_per_op": round(elapsed / (total * 2), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark overhead pencatatan metrik")
+    parser.add_argument("--iterations", type=int, default=500000, help="Jumlah operasi per pengukuran")
+    parser.add_argument("--threads", type=int, default=8, help="Jumlah thread untuk uji kontensi")
+    args = parser.parse_args()
+
+    registry = MetricsRegistry()
+    report = {
+        "single_thread_ns": bench_single(registry, args.iterations),
+        "contended": bench_threads(registry, args.iterations, args.threads),
+    }
+    start = time.perf_counter()
+    body = registry.render()
+    report["render_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    report["render_bytes"] = len(body)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark riwayat revisi dokumen: overhead penyimpanan per edit, latensi
+undo/redo, dan waktu pemuatan dengan/tanpa checkpoint
+
+Contoh:
+    python benchmarks/bench_revisions.py --paragraphs 2000 --edits 5000
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import _bootstrap  # noqa: F401
+
+from storage_manager import StorageManager
+from document_processor import DocumentProcessor
+from revision_store import RevisionStore
+
+
+def dir_size(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+def bench(paragraphs, edits, checkpoint_every):
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = StorageManager(tmp, use_catalog=False, shard_levels=0)
+        revisions = RevisionStore(checkpoint_every=checkpoint_every or 10 ** 9)
+        processor = DocumentProcessor(storage, revisions=revisions)
+        doc_id = processor.create_document("Benchmark Revisi")
+        for i in range(paragraphs):
+            processor.add_text(doc_id, "isi", f"Paragraf {i} berisi kalimat contoh untuk pengujian revisi dokumen.")
+        doc_dir = storage.document_dir(doc_id)
+        base_size = dir_size(doc_dir)
+        doc_chars = len(processor.get_document(doc_id).text().encode('utf-8'))
+
+        rng = random.Random(1)
+        start = time.perf_counter()
+        for _ in range(edits):
+            i = rng.randrange(paragraphs)
+            processor.edit_text(doc_id, "isi", f"Paragraf {i} ", f"Paragraf {i}  ")
+            processor.edit_text(doc_id, "isi", f"Paragraf {i}  ", f"Paragraf {i} ")
+        edit_time = time.perf_counter() - start
+        n_edits = edits * 2
+        edit_bytes = dir_size(doc_dir) - base_size
+
+        undo_times = []
+        for _ in range(min(40, revisions.max_revisions)):
+            t = time.perf_counter()
+            processor.undo(doc_id)
+            undo_times.append(time.perf_counter() - t)
+        redo_times = []
+        for _ in range(len(undo_times)):
+            t = time.perf_counter()
+            processor.redo(doc_id)
+            redo_times.append(time.perf_counter() - t)
+
+        # Muat ulang dari disk (checkpoint + log, atau log penuh)
+        fresh = DocumentProcessor(storage, revisions=revisions)
+        start = time.perf_counter()
+        fresh.get_document(doc_id)
+        load_time = time.perf_counter() - start
+
+        processor.close()
+        fresh.close()
+        storage.close()
+
+    return {
+        "checkpoint_every": checkpoint_every or None,
+        "paragraphs": paragraphs,
+        "edits": n_edits,
+        "edit_us": round(edit_time / n_edits * 1e6, 1),
+        "bytes_per_edit": round(edit_bytes / n_edits, 1),
+        "snapshot_bytes_per_edit": doc_chars,
+        "undo_us": round(sum(undo_times) / len(undo_times) * 1e6, 1),
+        "redo_us": round(sum(redo_times) / len(redo_times) * 1e6, 1),
+        "load_ms": round(load_time * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark riwayat revisi dokumen")
+    parser.add_argument("--paragraphs", type=int, default=2000, help="Jumlah paragraf dokumen")
+    parser.add_argument("--edits", type=int, default=5000, help="Jumlah pasangan edit")
+    parser.add_argument("--checkpoints", type=int, nargs="+", default=[0, 100, 1000],
+                        help="Interval checkpoint yang dibandingkan (0 = tanpa checkpoint)")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    print(json.dumps([bench(args.paragraphs, args.edits, every) for every in args.checkpoints], indent=2))
+
+
+if __name__ == "__main__":
+    main()
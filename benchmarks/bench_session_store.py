@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Benchmark dan uji fault-injection persistensi sesi
+
+Contoh:
+    python benchmarks/bench_session_store.py --updates 2000 --threads 1 8 32
+    python benchmarks/bench_session_store.py --fault-injection --rounds 20
+"""
+import os
+import sys
+import json
+import time
+import random
+import signal
+import argparse
+import tempfile
+import subprocess
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import _bootstrap  # noqa: F401
+
+from session_store import AtomicSessionStore, WalSessionStore
+
+
+class LegacySessionStore(AtomicSessionStore):
+    """Perilaku lama: JSON indent=2 ditulis langsung ke file tujuan"""
+
+    def save(self, user_id, data):
+        with open(self.session_file(user_id), 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+STORES = {
+    "legacy": LegacySessionStore,
+    "atomic": AtomicSessionStore,
+    "wal": WalSessionStore,
+}
+
+
+def session_payload(user_id, seq):
+    return {
+        "user_id": user_id,
+        "seq": seq,
+        "current_document": "3f2b1c9e-7d3a-4a8b-9c1d-2e5f6a7b8c9d",
+        "last_intent": "add_text",
+        "history": [{"role": "user", "content": f"tambahkan paragraf {i}"} for i in range(5)],
+        "last_updated": time.time(),
+    }
+
+
+def directory_bytes(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def bench_mode(mode, n_updates, n_threads, n_users, fsync):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = STORES[mode](tmp, fsync=fsync)
+        per_thread = n_updates // n_threads
+
+        def worker(index):
+            for i in range(per_thread):
+                user_id = f"62812{(index * per_thread + i) % n_users:05d}"
+                store.save(user_id, session_payload(user_id, i))
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_threads)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        store.checkpoint()
+        size = directory_bytes(tmp)
+        store.close()
+
+    return {
+        "mode": mode,
+        "threads": n_threads,
+        "fsync": fsync,
+        "updates_per_sec": round(per_thread * n_threads / elapsed, 1),
+        "bytes_per_session": round(size / min(n_users, per_thread * n_threads), 1),
+    }
+
+
+def child_writer(mode, path):
+    """Proses anak: tulis sesi terus-menerus dan laporkan setiap save yang selesai"""
+    store = STORES[mode](path, fsync=True)
+    users = [f"62812{i:05d}" for i in range(20)]
+    seq = 0
+    while True:
+        seq += 1
+        user_id = random.choice(users)
+        store.save(user_id, session_payload(user_id, seq))
+        # Setelah save() kembali, pembaruan ini harus selamat dari crash
+        sys.stdout.write(f"{user_id} {seq}\n")
+        sys.stdout.flush()
+
+
+def fault_injection(mode, rounds):
+    """Bunuh proses penulis (SIGKILL) di titik acak lalu periksa konsistensi"""
+    torn = 0
+    lost = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(rounds):
+            proc = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), "--child", mode, tmp],
+                stdout=subprocess.PIPE, text=True
+            )
+            time.sleep(random.uniform(0.05, 0.3))
+            proc.send_signal(signal.SIGKILL)
+            output, _ = proc.communicate()
+
+            acked = {}
+            for line in output.splitlines():
+                parts = line.split()
+                if len(parts) == 2:
+                    acked[parts[0]] = int(parts[1])
+
+            # Periksa file mentah: tidak boleh ada file sesi yang terpotong
+            for name in os.listdir(tmp):
+                if name.endswith('.json'):
+                    try:
+                        with open(os.path.join(tmp, name), 'rb') as f:
+                            json.loads(f.read())
+                    except ValueError:
+                        torn += 1
+                        os.remove(os.path.join(tmp, name))
+
+            # Buka ulang: setiap save yang sudah kembali harus terlihat
+            store = STORES[mode](tmp, fsync=True)
+            for user_id, seq in acked.items():
+                data = store.load(user_id) or {}
+                if data.get("seq", 0) < seq:
+                    lost += 1
+            store.close()
+
+    return {"mode": mode, "rounds": rounds, "torn_files": torn, "lost_acked_updates": lost}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark persistensi sesi")
+    parser.add_argument("--updates", type=int, default=2000, help="Jumlah pembaruan per mode")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32], help="Jumlah thread penulis")
+    parser.add_argument("--users", type=int, default=500, help="Jumlah pengguna berbeda")
+    parser.add_argument("--modes", nargs="+", default=list(STORES), choices=list(STORES))
+    parser.add_argument("--no-fsync", action="store_true", help="Matikan fsync")
+    parser.add_argument("--fault-injection", action="store_true", help="Jalankan uji crash dengan SIGKILL")
+    parser.add_argument("--rounds", type=int, default=10, help="Jumlah putaran fault-injection")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child_writer(*args.child)
+        return 0
+
+    if args.fault_injection:
+        results = [fault_injection(mode, args.rounds) for mode in args.modes]
+        print(json.dumps(results, indent=2))
+        return 1 if any(r["mode"] != "legacy" and (r["torn_files"] or r["lost_acked_updates"])
+                        for r in results) else 0
+
+    results = [
+        bench_mode(mode, args.updates, threads, args.users, not args.no_fsync)
+        for mode in args.modes
+        for threads in args.threads
+    ]
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
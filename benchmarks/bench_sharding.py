@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark layout direktori datar vs ber-shard
+
+Contoh:
+    python benchmarks/bench_sharding.py --entries 100000
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import _bootstrap  # noqa: F401
+
+from sharding import ShardedLayout
+
+
+def bench_layout(levels, n_entries, n_lookups):
+    with tempfile.TemporaryDirectory() as tmp:
+        layout = ShardedLayout(tmp, levels)
+        keys = [f"62812{i:07d}" for i in range(n_entries)]
+
+        start = time.perf_counter()
+        for key in keys:
+            if levels:
+                layout.ensure_dir(key)
+            with open(layout.path(key, ".json"), 'w') as f:
+                f.write('{"last_updated":0}')
+        create_time = time.perf_counter() - start
+
+        sample = random.sample(keys, min(n_lookups, n_entries))
+        start = time.perf_counter()
+        for key in sample:
+            with open(layout.resolve(key, ".json"), 'rb') as f:
+                f.read()
+        lookup_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        new_keys = [f"62899{i:07d}" for i in range(n_lookups)]
+        for key in new_keys:
+            if levels:
+                layout.ensure_dir(key)
+            with open(layout.path(key, ".json"), 'w') as f:
+                f.write('{}')
+        insert_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        swept = sum(1 for _ in layout.iter_entries('.json'))
+        sweep_time = time.perf_counter() - start
+
+    return {
+        "levels": levels,
+        "entries": n_entries,
+        "create_us": round(create_time / n_entries * 1e6, 2),
+        "lookup_us": round(lookup_time / len(sample) * 1e6, 2),
+        "insert_us": round(insert_time / len(new_keys) * 1e6, 2),
+        "sweep_ms": round(sweep_time * 1000, 1),
+        "swept": swept,
+    }
+
+
+def bench_migration(n_entries):
+    with tempfile.TemporaryDirectory() as tmp:
+        flat = ShardedLayout(tmp, 0)
+        for i in range(n_entries):
+            with open(flat.path(f"62812{i:07d}", ".json"), 'w') as f:
+                f.write('{}')
+
+        layout = ShardedLayout(tmp, 2)
+        start = time.perf_counter()
+        for name in [n for n in os.listdir(tmp) if n.endswith('.json')]:
+            layout.migrate_file(name[:-len('.json')], os.path.join(tmp, name), ".json")
+        elapsed = time.perf_counter() - start
+        remaining = sum(1 for n in os.listdir(tmp) if n.endswith('.json'))
+
+    return {"entries": n_entries, "migrate_us": round(elapsed / n_entries * 1e6, 2), "flat_remaining": remaining}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark layout direktori ber-shard")
+    parser.add_argument("--entries", type=int, default=100000, help="Jumlah entri per layout")
+    parser.add_argument("--lookups", type=int, default=10000, help="Jumlah lookup acak")
+    parser.add_argument("--levels", type=int, nargs="+", default=[0, 1, 2], help="Level shard yang dibandingkan")
+    args = parser.parse_args()
+
+    print(json.dumps({
+        "layouts": [bench_layout(levels, args.entries, args.lookups) for levels in args.levels],
+        "migration": bench_migration(min(args.entries, 20000)),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
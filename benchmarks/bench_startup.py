@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark waktu startup: waktu impor modul (python -X importtime) dan waktu
+wall-clock sampai modul aplikasi siap, dibandingkan dengan anggaran
+
+Contoh:
+    python benchmarks/bench_startup.py --module webui --budget-ms 800
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+
+
+def run_import(module, cwd, importtime=False):
+    code = f"import sys; sys.path[:0] = [{BENCH_DIR!r}, {ROOT!r}]; import _bootstrap; import {module}"
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-c", code]
+    start = time.perf_counter()
+    result = subprocess.run(cmd, cwd=cwd, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"Impor {module} gagal:\n{result.stderr[-2000:]}")
+    return elapsed, result.stderr
+
+
+def parse_importtime(stderr):
+    """
+    Parse keluaran -X importtime
+
+    Returns:
+        list: Tuple (nama modul, self_us, cumulative_us, kedalaman)
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        except ValueError:
+            continue
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark waktu startup dengan -X importtime")
+    parser.add_argument("--module", default="webui", help="Modul yang diimpor (mis. webui, app)")
+    parser.add_argument("--runs", type=int, default=5, help="Jumlah pengulangan wall-clock")
+    parser.add_argument("--budget-ms", type=float, default=800, help="Anggaran waktu startup (median wall-clock)")
+    parser.add_argument("--top", type=int, default=10, help="Jumlah modul terberat yang ditampilkan")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # webui membaca config.json dari direktori kerja
+        with open(os.path.join(tmp, "config.json"), "w") as f:
+            json.dump({"openai_api_key": "benchmark"}, f)
+
+        run_import(args.module, tmp)  # pemanasan cache bytecode
+        walls = sorted(run_import(args.module, tmp)[0] for _ in range(args.runs))
+        _, stderr = run_import(args.module, tmp, importtime=True)
+
+    rows = parse_importtime(stderr)
+    top_level = [row for row in rows if row[3] == 1]
+    heaviest = sorted(top_level, key=lambda row: row[2], reverse=True)[:args.top]
+    median_ms = walls[len(walls) // 2] * 1000
+
+    report = {
+        "module": args.module,
+        "wall_ms": {"median": round(median_ms, 1), "min": round(walls[0] * 1000, 1)},
+        "import_total_ms": round(sum(row[2] for row in top_level) / 1000, 1),
+        "heaviest_imports_ms": {name: round(cumulative / 1000, 1) for name, _, cumulative, _ in heaviest},
+        "lazy_modules_loaded": sorted({row[0] for row in rows} & {"pyttsx3", "speech_recognition", "openai"}),
+        "budget_ms": args.budget_ms,
+        "within_budget": median_ms <= args.budget_ms,
+    }
+    print(json.dumps(report, indent=2))
+    return 0 if report["within_budget"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark katalog StorageManager vs pemindaian direktori
+
+Contoh:
+    python benchmarks/bench_storage_catalog.py --docs 100000 --scan-docs 5000
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import _bootstrap  # noqa: F401
+
+from storage_catalog import StorageCatalog
+from storage_manager import StorageManager
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def bench_catalog(n_docs, n_lookups, expired_ratio):
+    """Isi katalog dengan n_docs entri sintetis lalu ukur lookup dan range query"""
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog = StorageCatalog(os.path.join(tmp, "catalog.db"))
+        now = time.time()
+        doc_ids = [str(uuid.uuid4()) for _ in range(n_docs)]
+        n_expired = int(n_docs * expired_ratio)
+        rows = []
+        for i, doc_id in enumerate(doc_ids):
+            created_at = now - 200000 if i < n_expired else now - random.randint(0, 3600)
+            metadata = {"user_id": f"62812{i % 5000:05d}", "created_at": created_at}
+            rows.append((doc_id, metadata["user_id"], "document.docx", created_at,
+                         json.dumps(metadata, separators=(',', ':'))))
+
+        _, load_time = timed(catalog.upsert_documents_many, rows)
+
+        sample = random.sample(doc_ids, min(n_lookups, n_docs))
+        start = time.perf_counter()
+        for doc_id in sample:
+            catalog.get_document(doc_id)
+        lookup_time = time.perf_counter() - start
+
+        expired, expiry_time = timed(catalog.expired_documents, now - 86400)
+        _, user_time = timed(catalog.documents_for_user, "6281200042")
+        catalog.close()
+
+    return {
+        "docs": n_docs,
+        "bulk_load_s": round(load_time, 3),
+        "lookup_us": round(lookup_time / len(sample) * 1e6, 2),
+        "expiry_query_ms": round(expiry_time * 1000, 2),
+        "expired_found": len(expired),
+        "user_query_ms": round(user_time * 1000, 3),
+    }
+
+
+def bench_cleanup(n_docs):
+    """Bandingkan cleanup tanpa dokumen kadaluarsa: pemindaian vs katalog"""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "source.docx")
+        with open(source, 'wb') as f:
+            f.write(b"x" * 128)
+
+        manager = StorageManager(os.path.join(tmp, "store"))
+        for i in range(n_docs):
+            manager.save_document(str(uuid.uuid4()), source, {
+                "user_id": f"62812{i % 500:05d}",
+                "created_at": time.time()
+            })
+
+        _, results["catalog_cleanup_ms"] = timed(manager.cleanup_expired_data)
+        manager.catalog = None
+        _, results["scan_cleanup_ms"] = timed(manager.cleanup_expired_data)
+
+        manager = StorageManager(os.path.join(tmp, "store"))
+        _, rebuild_time = timed(manager.rebuild_catalog)
+        results["rebuild_ms"] = rebuild_time
+        manager.close()
+
+    return {"docs": n_docs, **{k: round(v * 1000, 2) for k, v in results.items()}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark katalog penyimpanan")
+    parser.add_argument("--docs", type=int, default=100000, help="Jumlah dokumen di katalog")
+    parser.add_argument("--lookups", type=int, default=20000, help="Jumlah lookup acak")
+    parser.add_argument("--expired", type=float, default=0.01, help="Rasio dokumen kadaluarsa")
+    parser.add_argument("--scan-docs", type=int, default=5000,
+                        help="Jumlah dokumen nyata di disk untuk perbandingan cleanup")
+    args = parser.parse_args()
+
+    print(json.dumps({
+        "catalog": bench_catalog(args.docs, args.lookups, args.expired),
+        "cleanup": bench_cleanup(args.scan_docs),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
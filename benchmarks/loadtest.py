@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Uji beban end-to-end secara offline
+
+Menjalankan stub lokal WhatsApp Graph API dan OpenAI (stub_servers.py),
+menjalankan waiz-app.py dan/atau webui.py sebagai proses terpisah yang
+diarahkan ke stub, lalu mengirim percakapan sintetis ke /webhook dan
+/api/chat dari sejumlah pengguna virtual.
+
+Latensi pesan WhatsApp diukur dari webhook dikirim sampai stub Graph API
+menerima balasan pertama untuk pengirim itu (webhook hanya mengantrekan
+pesan, jadi waktu balas HTTP /webhook dilaporkan terpisah sebagai
+"webhook_ack"). Pesan tanpa balasan dalam batas waktu dihitung error.
+
+Laporan: throughput, persentil latensi per jenis pesan, error, pemakaian
+CPU/RSS proses server, jumlah panggilan ke stub, dan ringkasan /metrics.
+
+Contoh:
+    python benchmarks/loadtest.py --target app --users 20 --duration 30
+    python benchmarks/loadtest.py --target both --latency-ms 150 --error-rate 0.02 --max-p95-ms 800
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import functools
+import tempfile
+import threading
+import subprocess
+from collections import defaultdict
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from stub_servers import StubBehavior, start_graph_stub, start_openai_stub  # noqa: E402
+
+TITLES = ("laporan bulanan", "proposal proyek", "notulen rapat", "surat lamaran", "catatan kuliah",
+          "monthly report", "rencana anggaran", "materi presentasi")
+SENTENCES = ("Rapat dimulai pukul sembilan pagi dan dihadiri seluruh anggota tim.",
+             "Anggaran kegiatan naik sepuluh persen dibandingkan tahun lalu.",
+             "Target penjualan kuartal ini belum tercapai karena kendala distribusi.",
+             "The project timeline was extended by two weeks after the review.",
+             "Semua peserta diminta mengumpulkan laporan sebelum hari Jumat.",
+             "Evaluasi akhir akan dilakukan oleh tim mutu bersama pimpinan.")
+CHAT_PROMPTS = ("Apa kabar?", "Tolong ringkas isi rapat tadi.", "Buatkan daftar tugas untuk minggu ini.",
+                "Jelaskan perbedaan laporan dan proposal.", "What is the weather like today?",
+                "Berikan saran judul untuk presentasi penjualan.", "Terima kasih atas bantuannya.")
+
+# Admission control dimatikan: dengan batas bawaan (1 pesan/detik per
+# pengirim) harness diam-diam mengukur pesan yang dibuang, bukan kapasitas
+HARNESS_ENV = {"WAIZ_ADMISSION_RATE": "0", "WAIZ_ADMISSION_MAX_INFLIGHT": "0"}
+
+# Lingkungan server: stub dipakai sebagai endpoint, log minimal
+SERVER_CODE = (
+    "import sys; sys.path[:0] = [{bench!r}, {root!r}]; import _bootstrap; "
+    "import {module} as target; target.app.run(host='127.0.0.1', port={port}, threaded=True)"
+)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def conversation(rng):
+    """
+    Buat satu percakapan sintetis pengguna WhatsApp
+
+    Returns:
+        list: Tuple (jenis, payload pesan) sesuai urutan
+    """
+    title = rng.choice(TITLES)
+    steps = [("create", {"type": "text", "text": {"body": f"buat dokumen {title}"}})]
+    for _ in range(rng.randint(2, 6)):
+        steps.append(("add_text", {"type": "text", "text": {"body": f"tambahkan teks {rng.choice(SENTENCES)}"}}))
+    if rng.random() < 0.5:
+        steps.append(("edit", {"type": "text", "text": {"body": "ubah teks 'Rapat' menjadi 'Pertemuan'"}}))
+    if rng.random() < 0.3:
+        steps.append(("undo", {"type": "text", "text": {"body": "batalkan"}}))
+    if rng.random() < 0.4:
+        steps.append(("search", {"type": "text", "text": {"body": f"cari dokumen {title.split()[0]}"}}))
+    if rng.random() < 0.2:
+        steps.append(("document", {"type": "document", "document": {"id": f"media{rng.randrange(10 ** 6)}",
+                                                                      "filename": "lampiran.pdf"}}))
+    if rng.random() < 0.2:
+        steps.append(("audio", {"type": "audio", "audio": {"id": f"media{rng.randrange(10 ** 6)}"}}))
+    if rng.random() < 0.3:
+        steps.append(("smalltalk", {"type": "text", "text": {"body": rng.choice(CHAT_PROMPTS)}}))
+    return steps
+
+
+def webhook_payload(sender, message_id, message):
+    message = dict(message, **{"from": sender, "id": message_id, "timestamp": str(int(time.time()))})
+    return {"object": "whatsapp_business_account", "entry": [{"id": "loadtest", "changes": [{
+        "field": "messages",
+        "value": {"messaging_product": "whatsapp",
+                  "metadata": {"display_phone_number": "628000000000", "phone_number_id": "loadtest"},
+                  "contacts": [{"profile": {"name": "Load Test"}, "wa_id": sender}],
+                  "messages": [message]}}]}]}
+
+
+class ServerProcess:
+    def __init__(self, module, workdir, env, ready_path):
+        self.module = module
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.ready_path = ready_path
+        self.log = open(os.path.join(workdir, f"{module}.log"), "w")
+        code = SERVER_CODE.format(bench=BENCH_DIR, root=ROOT, module=module, port=self.port)
+        self.process = subprocess.Popen([sys.executable, "-c", code], cwd=workdir, env=env,
+                                        stdout=self.log, stderr=subprocess.STDOUT)
+        self.samples = []
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def wait_ready(self, timeout=60):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"{self.module} berhenti saat startup (lihat {self.log.name})")
+            try:
+                if requests.get(self.url + self.ready_path, timeout=1).status_code < 500:
+                    return
+            except requests.RequestException:
+                time.sleep(0.2)
+        raise RuntimeError(f"{self.module} tidak siap dalam {timeout} detik")
+
+    def _read_proc(self):
+        # (detik CPU, RSS dalam byte) dari /proc; None jika tidak tersedia
+        try:
+            with open(f"/proc/{self.process.pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            ticks = os.sysconf("SC_CLK_TCK")
+            cpu = (int(fields[11]) + int(fields[12])) / ticks
+            rss = int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+            return cpu, rss
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def start_sampling(self, interval=0.5):
+        def sample():
+            while not self._stop.wait(interval):
+                reading = self._read_proc()
+                if reading is not None:
+                    self.samples.append((time.perf_counter(),) + reading)
+        self.samples.append((time.perf_counter(),) + (self._read_proc() or (0, 0)))
+        self._sampler = threading.Thread(target=sample, daemon=True)
+        self._sampler.start()
+
+    def resource_usage(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        if len(self.samples) < 2:
+            return None
+        (t0, cpu0, _), (t1, cpu1, _) = self.samples[0], self.samples[-1]
+        return {
+            "cpu_seconds": round(cpu1 - cpu0, 2),
+            "cpu_percent": round((cpu1 - cpu0) / (t1 - t0) * 100, 1) if t1 > t0 else None,
+            "rss_peak_mb": round(max(s[2] for s in self.samples) / 2 ** 20, 1),
+            "rss_end_mb": round(self.samples[-1][2] / 2 ** 20, 1),
+        }
+
+    def _metrics_text(self):
+        try:
+            return requests.get(self.url + "/metrics", timeout=5).text
+        except requests.RequestException:
+            return None
+
+    def scrape_metrics(self, prefixes=("waiz_",)):
+        """Ringkas histogram /metrics menjadi count dan rata-rata (ms)"""
+        text = self._metrics_text()
+        if text is None:
+            return None
+        sums, counts = {}, {}
+        for line in text.splitlines():
+            if line.startswith("#") or not line.startswith(prefixes):
+                continue
+            name, _, value = line.rpartition(" ")
+            if name.split("{")[0].endswith("_sum"):
+                sums[name.replace("_sum", "", 1)] = float(value)
+            elif name.split("{")[0].endswith("_count"):
+                counts[name.replace("_count", "", 1)] = float(value)
+        summary = {}
+        for name, count in counts.items():
+            if count and name in sums and name.split("{")[0].endswith("_seconds"):
+                summary[name] = {"count": int(count), "avg_ms": round(sums[name] / count * 1000, 2)}
+        return summary
+
+    def scrape_rejections(self):
+        """
+        Pesan yang tidak diproses server menurut /metrics
+
+        Returns:
+            dict: Jumlah keputusan admission throttled dan shed, atau None
+                jika /metrics tidak bisa dibaca
+        """
+        text = self._metrics_text()
+        if text is None:
+            return None
+        counts = {"throttled": 0, "shed": 0}
+        for line in text.splitlines():
+            if not line.startswith("waiz_admission_decisions_total{"):
+                continue
+            name, _, value = line.rpartition(" ")
+            for result in counts:
+                if f'result="{result}"' in name:
+                    counts[result] += int(float(value))
+        return counts
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.log.close()
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.acks = defaultdict(list)
+
+    def record(self, key, elapsed, ok):
+        with self._lock:
+            self.latencies[key].append(elapsed)
+            if not ok:
+                self.errors[key] += 1
+
+    def record_ack(self, key, elapsed):
+        """Catat waktu balas HTTP /webhook (pesan baru diantrekan, belum diproses)"""
+        with self._lock:
+            self.acks[key].append(elapsed)
+
+    def ack_report(self):
+        rows = {}
+        for key, values in sorted(self.acks.items()):
+            values = sorted(values)
+            rows[key] = {
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+                "max_ms": round(values[-1] * 1000, 1),
+            }
+        return rows
+
+    def report(self, duration):
+        rows = {}
+        total = 0
+        for key, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            total += len(values)
+            rows[key] = {
+                "requests": len(values),
+                "errors": self.errors.get(key, 0),
+                "rps": round(len(values) / duration, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p90_ms": round(percentile(values, 90) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+                "max_ms": round(values[-1] * 1000, 1),
+            }
+        return total, rows
+
+
+def send_webhook(session, url, payload, sender, recorder, kind, replies=None, timeout=60):
+    """
+    Kirim satu webhook dan catat latensinya
+
+    Dengan replies (ReplyLog stub Graph API), latensi dihitung sampai balasan
+    pertama untuk sender diterima stub; waktu balas /webhook dicatat sebagai
+    ack. Tanpa replies hanya waktu balas /webhook yang tersedia.
+
+    Balasan dikorelasikan per pengirim, bukan per pesan: balasan susulan
+    pesan sebelumnya (mis. notifikasi ekspor selesai) yang tiba setelah
+    webhook dikirim ikut terhitung sebagai balasan pesan ini.
+    """
+    seen = replies.count(sender) if replies is not None else 0
+    start = time.perf_counter()
+    try:
+        response = session.post(url + "/webhook", json=payload, timeout=timeout)
+        ok = response.status_code == 200
+    except requests.RequestException:
+        ok = False
+    acked = time.perf_counter()
+    if replies is None:
+        recorder.record(kind, acked - start, ok)
+        return
+    recorder.record_ack(kind, acked - start)
+    if ok:
+        ok = replies.wait(sender, seen, max(0.0, timeout - (acked - start)))
+    recorder.record(kind, time.perf_counter() - start, ok)
+
+
+def drive_app(url, user_index, deadline, recorder, seed, think_ms, replies=None):
+    rng = random.Random(seed + user_index)
+    session = requests.Session()
+    sender = f"62800{user_index:07d}"
+    counter = 0
+    while time.time() < deadline:
+        for kind, message in conversation(rng):
+            if time.time() >= deadline:
+                break
+            counter += 1
+            payload = webhook_payload(sender, f"wamid.lt.{user_index}.{counter}", message)
+            send_webhook(session, url, payload, sender, recorder, f"app.{kind}", replies)
+            if think_ms:
+                time.sleep(rng.uniform(0, 2 * think_ms) / 1000)
+
+
+def drive_webui(url, user_index, deadline, recorder, seed, think_ms):
+    rng = random.Random(seed * 31 + user_index)
+    session = requests.Session()
+    while time.time() < deadline:
+        start = time.perf_counter()
+        try:
+            response = session.post(url + "/api/chat", json={"message": rng.choice(CHAT_PROMPTS)}, timeout=60)
+            ok = response.status_code == 200 and "error" not in response.json()
+        except (requests.RequestException, ValueError):
+            ok = False
+        recorder.record("webui.chat", time.perf_counter() - start, ok)
+        if think_ms:
+            time.sleep(rng.uniform(0, 2 * think_ms) / 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Uji beban end-to-end dengan stub WhatsApp dan OpenAI")
+    parser.add_argument("--target", choices=("app", "webui", "both"), default="app")
+    parser.add_argument("--users", type=int, default=10, help="Pengguna virtual per target")
+    parser.add_argument("--duration", type=float, default=20, help="Durasi pengukuran (detik)")
+    parser.add_argument("--warmup", type=float, default=2, help="Pemanasan sebelum pengukuran (detik)")
+    parser.add_argument("--think-ms", type=float, default=0, help="Rata-rata jeda antar pesan per pengguna")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Latensi dasar stub")
+    parser.add_argument("--jitter-ms", type=float, default=20, help="Jitter latensi stub")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Peluang stub membalas error")
+    parser.add_argument("--token-ms", type=float, default=5, help="Jeda antar token stub OpenAI")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-p95-ms", type=float, help="Gagal jika p95 gabungan melebihi nilai ini")
+    parser.add_argument("--min-rps", type=float, help="Gagal jika throughput total di bawah nilai ini")
+    parser.add_argument("--output", help="Simpan laporan JSON ke file")
+    args = parser.parse_args()
+
+    behavior = StubBehavior(args.latency_ms, args.jitter_ms, args.error_rate, seed=args.seed)
+    graph = start_graph_stub(behavior)
+    openai = start_openai_stub(behavior, token_ms=args.token_ms)
+    targets = ["app", "webui"] if args.target == "both" else [args.target]
+    servers = {}
+
+    with tempfile.TemporaryDirectory(prefix="waiz-loadtest-") as workdir:
+        with open(os.path.join(workdir, "config.json"), "w") as f:
+            json.dump({"openai_api_key": "loadtest"}, f)
+        env = dict(os.environ,
+                   WAIZ_WHATSAPP_API_BASE=graph.url, WAIZ_WHATSAPP_API_TOKEN="loadtest",
+                   WAIZ_WHATSAPP_PHONE_NUMBER_ID="loadtest", WAIZ_OPENAI_BASE_URL=openai.url + "/v1",
+                   WAIZ_OPENAI_API_KEY="loadtest", WAIZ_TEMP_STORAGE_PATH=os.path.join(workdir, "storage"),
+                   WAIZ_UPLOAD_FOLDER=os.path.join(workdir, "uploads"),
+                   WAIZ_PROCESSED_FOLDER=os.path.join(workdir, "processed"),
+                   WAIZ_LOG_LEVEL="WARNING", WAIZ_DEBUG_MODE="false", **HARNESS_ENV)
+        try:
+            for module in targets:
+                servers[module] = ServerProcess(module, workdir, env, "/test" if module == "app" else "/api/config")
+            for server in servers.values():
+                server.wait_ready()
+
+            recorder = Recorder()
+            warmup = Recorder()
+            threads = []
+            phase_start = time.time()
+            for module, server in servers.items():
+                drive = functools.partial(drive_app, replies=graph.replies) if module == "app" else drive_webui
+                for i in range(args.users):
+                    threads.append(threading.Thread(
+                        target=lambda d=drive, s=server, i=i: (
+                            d(s.url, i, phase_start + args.warmup, warmup, args.seed, args.think_ms),
+                            d(s.url, i, phase_start + args.warmup + args.duration, recorder, args.seed + 1,
+                              args.think_ms)),
+                        daemon=True))
+            for thread in threads:
+                thread.start()
+            time.sleep(args.warmup)
+            measure_start = time.perf_counter()
+            for server in servers.values():
+                server.start_sampling()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - measure_start
+
+            total, rows = recorder.report(elapsed)
+            all_latencies = sorted(v for values in recorder.latencies.values() for v in values)
+            report = {
+                "targets": targets,
+                "users_per_target": args.users,
+                "duration_s": round(elapsed, 2),
+                "stub": {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms,
+                         "error_rate": args.error_rate, "token_ms": args.token_ms},
+                "total": {
+                    "requests": total,
+                    "errors": sum(recorder.errors.values()),
+                    "rps": round(total / elapsed, 2),
+                    "p50_ms": round((percentile(all_latencies, 50) or 0) * 1000, 1),
+                    "p95_ms": round((percentile(all_latencies, 95) or 0) * 1000, 1),
+                    "p99_ms": round((percentile(all_latencies, 99) or 0) * 1000, 1),
+                },
+                "by_kind": rows,
+                "webhook_ack": recorder.ack_report(),
+                "resources": {module: server.resource_usage() for module, server in servers.items()},
+                "server_metrics": {module: server.scrape_metrics() for module, server in servers.items()},
+                "rejected": servers["app"].scrape_rejections() if "app" in servers else None,
+                "stub_calls": {"graph": graph.stats, "openai": openai.stats},
+            }
+        finally:
+            for server in servers.values():
+                server.stop()
+            graph.stop()
+            openai.stop()
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+    failures = []
+    if args.max_p95_ms is not None and report["total"]["p95_ms"] > args.max_p95_ms:
+        failures.append(f"p95 {report['total']['p95_ms']} ms > {args.max_p95_ms} ms")
+    if args.min_rps is not None and report["total"]["rps"] < args.min_rps:
+        failures.append(f"throughput {report['total']['rps']} rps < {args.min_rps} rps")
+    for result, count in (report["rejected"] or {}).items():
+        if count:
+            failures.append(f"{count} pesan {result} oleh admission control")
+    for failure in failures:
+        print(f"REGRESI: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
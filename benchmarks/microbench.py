@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark jalur panas per modul dengan baseline JSON dan ambang regresi
+
+Setiap benchmark melaporkan ops per detik CPU proses (lebih besar lebih
+baik) dan skor: ops/detik dibagi kecepatan beban referensi tetap yang
+diukur bergantian dengan benchmark. Keduanya adalah median dari beberapa
+pengulangan. Skor dipakai untuk perbandingan agar hasil tidak ikut berubah
+saat kecepatan mesin/VM berubah-ubah. Hasil bisa disimpan sebagai baseline
+lalu dibandingkan; perintah compare/check keluar dengan kode 1 jika ada
+skor yang turun melebihi toleransinya. Operasi di bawah satu mikrodetik
+hanya dilaporkan, tidak menggagalkan perbandingan: noise skornya lebih
+besar daripada regresi yang ingin ditangkap.
+
+Contoh:
+    python benchmarks/microbench.py run --output /tmp/current.json
+    python benchmarks/microbench.py baseline            # tulis baselines/microbench.json
+    python benchmarks/microbench.py compare benchmarks/baselines/microbench.json /tmp/current.json
+    python benchmarks/microbench.py check --only nlp storage
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import statistics
+import argparse
+import platform
+import tempfile
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+import _bootstrap  # noqa: F401,E402
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baselines", "microbench.json")
+
+# Toleransi penurunan per modul (prefiks nama benchmark) atau per benchmark
+# (nama lengkap, didahulukan); storage lebih bergantung pada disk, operasi
+# yang sangat kecil (media, webui) lebih sensitif terhadap noise sehingga
+# toleransinya lebih longgar
+DEFAULT_TOLERANCES = {"nlp": 0.20, "storage": 0.30, "media": 0.25, "webhook": 0.25, "webui": 0.25,
+                      "nlp.process_message": 0.30}
+FALLBACK_TOLERANCE = 0.25
+# Benchmark yang lebih cepat dari ini (ops/detik di baseline) tidak digate
+GATE_MAX_RATE = 1_000_000
+
+BENCHMARKS = []
+
+
+def benchmark(name, full_only=False):
+    """Daftarkan fungsi benchmark; fungsi mengembalikan dict nama -> ops/detik"""
+    def decorator(function):
+        BENCHMARKS.append((name, function, full_only))
+        return function
+    return decorator
+
+
+def _reference():
+    # Beban Python murni yang tetap (string, dict, list) sebagai pembanding
+    table = {}
+    for i in range(500):
+        key = f"k{i}"
+        table[key] = key.upper()
+    return sorted(table.values())[:10]
+
+
+def _rate(function, ops, min_time):
+    loops = 0
+    start = time.process_time()
+    while True:
+        function()
+        loops += 1
+        elapsed = time.process_time() - start
+        if elapsed >= min_time:
+            return loops * ops / elapsed
+
+
+def measure(function, ops, repeats=9, min_time=0.1):
+    """
+    Ukur ops per detik CPU; function() menjalankan `ops` operasi sekali panggil
+
+    Setiap pengulangan diapit pengukuran beban referensi sehingga skornya
+    relatif terhadap kecepatan mesin saat itu. Median (bukan nilai terbaik)
+    dipakai agar satu pengulangan yang kebetulan cepat tidak menggeser
+    baseline.
+
+    Returns:
+        tuple: (median ops/detik, median skor)
+    """
+    function()  # pemanasan: cache, import malas, alokasi pertama
+    rates, scores = [], []
+    for _ in range(repeats):
+        before = _rate(_reference, 1, 0.02)
+        rate = _rate(function, ops, min_time)
+        after = _rate(_reference, 1, 0.02)
+        rates.append(rate)
+        scores.append(rate / ((before + after) / 2) * 1000)
+    return statistics.median(rates), statistics.median(scores)
+
+
+# --- NLP --------------------------------------------------------------------
+
+NLP_CORPUS = [
+    # Bahasa Indonesia
+    "buat dokumen laporan kegiatan bulanan", "bikin dokumen baru tentang proposal penelitian",
+    "tulis makalah berjudul 'Dampak Digitalisasi UMKM'",
+    "tambahkan teks ke bagian pendahuluan: Penelitian ini bertujuan mengukur dampak program.",
+    "masukkan paragraf ini: Anggaran naik sepuluh persen.",
+    "ubah 'sepuluh persen' menjadi 'dua belas persen'", "ganti 'Rapat' dengan 'Pertemuan' di bagian isi",
+    "export dokumen ini sebagai pdf", "kirim file dalam format docx", "batalkan perubahan terakhir",
+    "ulangi", "lihat riwayat revisi", "pilih dokumen notulen rapat", "cari kalimat anggaran",
+    "bantuan", "cara pakai asisten ini",
+    # English
+    "create a new document titled quarterly report", "add this paragraph to the summary section:",
+    "replace 'draft' with 'final'", "undo", "redo", "history", "open the document budget plan",
+    "search for revenue growth", "help", "how to use",
+    # Campuran dan tidak dikenali
+    "tolong create document tentang marketing plan", "selamat pagi, apa kabar?",
+    "terima kasih banyak atas bantuannya ya", "ok", "👍", "jadwal rapat besok jam berapa?",
+]
+
+
+@benchmark("nlp")
+def bench_nlp():
+    from nlp_engine import NLPEngine
+    engine = NLPEngine()
+    users = [f"6281{i:08d}" for i in range(50)]
+
+    def run():
+        for i, message in enumerate(NLP_CORPUS):
+            engine.process_message(message, users[i % len(users)])
+
+    results = {"nlp.process_message": measure(run, len(NLP_CORPUS))}
+
+    long_message = "tambahkan teks ke bagian isi: " + "kalimat panjang berisi uraian kegiatan. " * 100
+    results["nlp.process_message_long"] = measure(lambda: engine.process_message(long_message, users[0]), 1)
+
+    def context():
+        for user in users:
+            engine.update_context(user, {"last_intent": "add_text", "current_document": "doc"})
+            engine.get_context(user)
+
+    results["nlp.context_update"] = measure(context, len(users))
+    return results
+
+
+# --- Storage ----------------------------------------------------------------
+
+def session_payload(user_id, seq):
+    return {"user_id": user_id, "seq": seq, "current_document": "3f2b1c9e-7d3a-4a8b-9c1d-2e5f6a7b8c9d",
+            "last_intent": "add_text", "last_updated": time.time()}
+
+
+def bench_storage_size(entries):
+    from storage_manager import StorageManager
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = StorageManager(tmp, session_mode="wal", session_fsync=False,
+                                 session_cache_size=min(entries, 10000), session_flush_interval=3600,
+                                 session_dirty_threshold=entries * 2)
+        users = [f"6281{i:08d}" for i in range(entries)]
+        for i, user in enumerate(users):
+            storage.save_session_data(user, session_payload(user, i))
+        storage.flush_sessions()
+
+        rng = random.Random(1)
+        sample = [rng.choice(users) for _ in range(1000)]
+        seq = iter(range(10 ** 9))
+
+        def save():
+            for user in sample:
+                storage.save_session_data(user, session_payload(user, next(seq)))
+
+        def get():
+            for user in sample:
+                storage.get_session_data(user)
+
+        results[f"storage.save_session@{entries}"] = measure(save, len(sample), repeats=5)
+        results[f"storage.get_session@{entries}"] = measure(get, len(sample), repeats=5)
+        storage.flush_sessions()
+
+        # Sapuan cleanup tanpa ada yang kadaluarsa: murni biaya pemindaian
+        results[f"storage.cleanup_sweep@{entries}"] = measure(
+            lambda: storage.cleanup_expired_data(session_ttl=10 ** 9, document_ttl=10 ** 9), 1,
+            repeats=5, min_time=0.1)
+        storage.close()
+    return results
+
+
+@benchmark("storage")
+def bench_storage():
+    return bench_storage_size(10000)
+
+
+@benchmark("storage", full_only=True)
+def bench_storage_large():
+    return bench_storage_size(100000)
+
+
+# --- Media dan payload --------------------------------------------------------
+
+CONTENT_TYPES = ["application/pdf", "application/msword",
+                 "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                 "text/plain", "image/jpeg", "image/png", "audio/ogg; codecs=opus", "audio/mpeg",
+                 "video/mp4", "application/octet-stream", ""]
+
+
+@benchmark("media")
+def bench_media():
+    import config
+    from storage_manager import StorageManager
+    from media_handler import MediaHandler
+    overrides = {"WAIZ_UPLOAD_FOLDER": "uploads", "WAIZ_PROCESSED_FOLDER": "processed"}
+    saved = {name: os.environ.get(name) for name in overrides}
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update({name: os.path.join(tmp, folder) for name, folder in overrides.items()})
+        config.reload()
+        try:
+            storage = StorageManager(os.path.join(tmp, "storage"), use_catalog=False)
+            handler = MediaHandler(storage)
+
+            def extensions():
+                for content_type in CONTENT_TYPES:
+                    handler._get_file_extension(content_type)
+
+            results = {"media.get_file_extension": measure(extensions, len(CONTENT_TYPES))}
+            storage.close()
+        finally:
+            # Kembalikan lingkungan agar benchmark berikutnya memakai konfigurasi asli
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+            config.reload()
+    return results
+
+
+@benchmark("webhook")
+def bench_webhook_payload():
+    from log_setup import Payload
+    from traffic_recorder import Anonymizer, sender_of
+    from nlp_engine import NLPEngine
+
+    body = json.dumps({"object": "whatsapp_business_account", "entry": [{"id": "1", "changes": [{
+        "field": "messages", "value": {
+            "messaging_product": "whatsapp",
+            "metadata": {"display_phone_number": "628000000000", "phone_number_id": "1"},
+            "contacts": [{"profile": {"name": "Pengguna"}, "wa_id": "6281234567890"}],
+            "messages": [{"from": "6281234567890", "id": "wamid." + "A" * 48, "timestamp": "1700000000",
+                          "type": "text", "text": {"body": NLP_CORPUS[3]}}]}}]}]})
+    payload = json.loads(body)
+    anonymizer = Anonymizer("bench", NLPEngine().keywords())
+
+    def parse():
+        data = json.loads(body)
+        sender_of(data)
+
+    return {
+        "webhook.parse": measure(parse, 1),
+        "webhook.log_payload": measure(lambda: str(Payload(payload)), 1),
+        "webhook.anonymize": measure(lambda: anonymizer.payload(payload), 1),
+    }
+
+
+# --- Web UI -------------------------------------------------------------------
+
+@benchmark("webui")
+def bench_webui():
+    cwd = os.getcwd()
+    tmp = tempfile.mkdtemp(prefix="waiz-microbench-")
+    try:
+        # webui membaca config.json dari direktori kerja saat diimpor
+        os.chdir(tmp)
+        with open("config.json", "w") as f:
+            json.dump({"openai_api_key": "benchmark"}, f)
+        import webui
+    finally:
+        os.chdir(cwd)
+
+    results = {}
+    for size in (10, 1000):
+        webui.conversation_history[:] = [
+            {"role": "user" if i % 2 == 0 else "assistant", "content": f"pesan ke-{i} " * 10}
+            for i in range(size)
+        ]
+        results[f"webui.build_messages@{size}"] = measure(webui.build_messages, 1)
+
+    def append_turn():
+        webui.conversation_history.append({"role": "user", "content": "halo"})
+        webui.conversation_history.append({"role": "assistant", "content": "halo juga"})
+        webui.build_messages()
+
+    webui.conversation_history[:] = []
+    results["webui.history_turn"] = measure(append_turn, 1, repeats=5)
+    webui.conversation_history[:] = []
+    return results
+
+
+# --- Runner ------------------------------------------------------------------
+
+def run_benchmarks(only=None, full=True, runs=1):
+    """
+    Jalankan benchmark `runs` kali; tiap nilai adalah median antar putaran
+
+    Baseline sebaiknya diambil dari beberapa putaran agar satu putaran yang
+    kebetulan cepat (mesin sedang sepi) tidak membuat check berikutnya gagal.
+    """
+    logging.disable(logging.CRITICAL)
+    rates, ratios = {}, {}
+    for run in range(runs):
+        for name, function, full_only in BENCHMARKS:
+            if only and name not in only:
+                continue
+            if full_only and not full:
+                continue
+            start = time.perf_counter()
+            values = function()
+            for key, (rate, score) in values.items():
+                rates.setdefault(key, []).append(rate)
+                ratios.setdefault(key, []).append(score)
+            print(f"{name}: {len(values)} benchmark, {time.perf_counter() - start:.1f} s"
+                  + (f" (putaran {run + 1}/{runs})" if runs > 1 else ""), file=sys.stderr)
+    results = {key: round(statistics.median(values), 1) for key, values in rates.items()}
+    scores = {key: round(statistics.median(values), 3) for key, values in ratios.items()}
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "cpus": os.cpu_count()},
+        "tolerances": DEFAULT_TOLERANCES,
+        "results": results,
+        "scores": scores,
+    }
+
+
+def tolerance_for(name, tolerances, override=None):
+    if override is not None:
+        return override
+    if name in tolerances:
+        return tolerances[name]
+    return tolerances.get(name.split(".")[0], FALLBACK_TOLERANCE)
+
+
+def gated(name, baseline):
+    """Benchmark sub-mikrodetik hanya dilaporkan, tidak menggagalkan compare"""
+    rate = baseline.get("results", {}).get(name)
+    return rate is None or rate < GATE_MAX_RATE
+
+
+def compare(baseline, current, tolerance=None):
+    """
+    Bandingkan skor dengan baseline (ops/detik jika salah satu tidak punya skor)
+
+    Returns:
+        tuple: (baris laporan, daftar regresi)
+    """
+    tolerances = dict(DEFAULT_TOLERANCES, **baseline.get("tolerances", {}))
+    key = "scores" if baseline.get("scores") and current.get("scores") else "results"
+    base_values, current_values = baseline[key], current[key]
+    rows, regressions = [], []
+    for name, base in sorted(base_values.items()):
+        value = current_values.get(name)
+        if value is None:
+            rows.append(f"{name:40s} {base:14.3f} {'-':>14s}   (tidak dijalankan)")
+            continue
+        change = (value - base) / base if base else 0.0
+        if not gated(name, baseline):
+            rows.append(f"{name:40s} {base:14.3f} {value:14.3f} {change * 100:+7.1f}%  (< 1 us/op, info)")
+            continue
+        limit = tolerance_for(name, tolerances, tolerance)
+        status = "REGRESI" if change < -limit else "ok"
+        rows.append(f"{name:40s} {base:14.3f} {value:14.3f} {change * 100:+7.1f}%  (batas -{limit * 100:.0f}%) {status}")
+        if status == "REGRESI":
+            regressions.append(name)
+    for name in sorted(set(current_values) - set(base_values)):
+        rows.append(f"{name:40s} {'-':>14s} {current_values[name]:14.3f}   (baru)")
+    return key, rows, regressions
+
+
+def print_comparison(baseline, current, tolerance):
+    key, rows, regressions = compare(baseline, current, tolerance)
+    print(f"{'benchmark (' + ('skor' if key == 'scores' else 'ops/s') + ')':40s} {'baseline':>14s} {'sekarang':>14s}")
+    for row in rows:
+        print(row)
+    if regressions:
+        print(f"\n{len(regressions)} regresi: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    print("\nTidak ada regresi")
+    return 0
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save(path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark jalur panas dengan baseline JSON")
+    sub = parser.add_subparsers(dest="command", required=True)
+    modules = sorted({name for name, _, _ in BENCHMARKS})
+
+    for command in ("run", "baseline", "check"):
+        p = sub.add_parser(command)
+        p.add_argument("--only", nargs="+", choices=modules, help="Hanya modul ini")
+        p.add_argument("--quick", action="store_true", help="Lewati ukuran besar (mis. 100k sesi)")
+        p.add_argument("--runs", type=int, default=3 if command == "baseline" else 1,
+                       help="Jumlah putaran; nilai akhir adalah median (default: 3 untuk baseline)")
+        if command == "run":
+            p.add_argument("--output", help="Simpan hasil ke file JSON")
+        else:
+            p.add_argument("--baseline", default=DEFAULT_BASELINE, help="File baseline")
+        if command == "check":
+            p.add_argument("--tolerance", type=float, help="Timpa toleransi semua modul (mis. 0.2)")
+
+    p = sub.add_parser("compare")
+    p.add_argument("baseline")
+    p.add_argument("current")
+    p.add_argument("--tolerance", type=float, help="Timpa toleransi semua modul (mis. 0.2)")
+
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        return print_comparison(load(args.baseline), load(args.current), args.tolerance)
+
+    current = run_benchmarks(args.only, full=not args.quick, runs=max(1, args.runs))
+    if args.command == "run":
+        if args.output:
+            save(args.output, current)
+        print(json.dumps(current, indent=2))
+        return 0
+    if args.command == "baseline":
+        if args.only and os.path.exists(args.baseline):
+            # Perbarui sebagian baseline tanpa membuang modul lain
+            merged = load(args.baseline)
+            merged["results"].update(current["results"])
+            merged.setdefault("scores", {}).update(current["scores"])
+            merged["created"] = current["created"]
+            current = merged
+        save(args.baseline, current)
+        print(f"Baseline ditulis ke {args.baseline}")
+        return 0
+    return print_comparison(load(args.baseline), current, args.tolerance)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
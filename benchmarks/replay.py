@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Putar ulang rekaman webhook (WEBHOOK_RECORD_PATH) ke waiz-app.py
+
+Jarak waktu antar pesan diskalakan dengan --speed (1 = waktu asli, 10 =
+sepuluh kali lebih cepat, 0 = secepat mungkin). Urutan per pengirim selalu
+dipertahankan: semua pesan dari satu pengirim dikirim oleh worker yang sama
+secara berurutan.
+
+Tanpa --url, waiz-app.py dijalankan sebagai subprocess yang diarahkan ke stub
+lokal WhatsApp Graph API (lihat loadtest.py), sehingga replay berjalan offline.
+Dalam mode ini latensi pesan yang dibalas bot (teks, audio, dokumen) diukur
+sampai stub menerima balasannya; waktu balas /webhook dilaporkan terpisah
+sebagai "webhook_ack". Dengan --url hanya waktu balas /webhook yang terukur.
+
+Contoh:
+    python benchmarks/replay.py traffic.jsonl.gz --speed 10
+    python benchmarks/replay.py traffic.jsonl.gz --speed 0 --workers 16 --url http://127.0.0.1:5000
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import queue
+import argparse
+import tempfile
+import threading
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+import _bootstrap  # noqa: F401,E402
+
+from traffic_recorder import read_records, sender_of  # noqa: E402
+from loadtest import HARNESS_ENV, ServerProcess, Recorder, percentile, send_webhook  # noqa: E402
+from stub_servers import StubBehavior, start_graph_stub  # noqa: E402
+
+
+# Jenis pesan yang selalu dibalas waiz-app.py; jenis lain tidak ditunggu balasannya
+REPLY_TYPES = ("text", "audio", "document")
+
+
+def worker_for(sender, workers):
+    return zlib.crc32((sender or "").encode("utf-8")) % workers
+
+
+def replay(url, records, speed, workers, recorder, timeout=60, replies=None):
+    """
+    Kirim rekaman ke url/webhook
+
+    Args:
+        replies (ReplyLog, optional): Catatan balasan stub Graph API; jika ada,
+            latensi diukur sampai balasan diterima stub
+
+    Returns:
+        list: Keterlambatan kirim (detik) dibanding jadwal
+    """
+    queues = [queue.Queue() for _ in range(workers)]
+    lags = []
+    lags_lock = threading.Lock()
+    done = object()
+    first_t = records[0][0] if records else 0
+    start = time.perf_counter()
+
+    def work(q):
+        session = requests.Session()
+        while True:
+            item = q.get()
+            if item is done:
+                return
+            scheduled, payload = item
+            if scheduled is not None:
+                delay = start + scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                with lags_lock:
+                    lags.append(max(0.0, time.perf_counter() - start - scheduled))
+            kind = "replay"
+            message_type = None
+            for entry in payload.get("entry", []):
+                for change in entry.get("changes", []):
+                    for message in change.get("value", {}).get("messages", []):
+                        message_type = message.get("type", "unknown")
+                        kind = f"replay.{message_type}"
+            sender = sender_of(payload)
+            send_webhook(session, url, payload, sender, recorder, kind,
+                         replies if sender and message_type in REPLY_TYPES else None, timeout)
+
+    threads = [threading.Thread(target=work, args=(q,), daemon=True) for q in queues]
+    for thread in threads:
+        thread.start()
+    for t, payload in records:
+        scheduled = (t - first_t) / 1000 / speed if speed > 0 else None
+        queues[worker_for(sender_of(payload), workers)].put((scheduled, payload))
+    for q in queues:
+        q.put(done)
+    for thread in threads:
+        thread.join()
+    return lags
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Putar ulang rekaman webhook ke waiz-app.py")
+    parser.add_argument("file", help="File rekaman (.jsonl.gz)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Skala waktu (1, 10, ... ; 0 = secepat mungkin)")
+    parser.add_argument("--workers", type=int, default=8, help="Jumlah worker (pengirim dibagi per worker)")
+    parser.add_argument("--limit", type=int, help="Batasi jumlah pesan")
+    parser.add_argument("--url", help="Server yang sudah berjalan; tanpa ini waiz-app.py dijalankan dengan stub")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Latensi stub Graph API")
+    parser.add_argument("--output", help="Simpan laporan JSON ke file")
+    args = parser.parse_args()
+
+    records = []
+    for record in read_records(args.file):
+        records.append(record)
+        if args.limit and len(records) >= args.limit:
+            break
+    if not records:
+        print("Rekaman kosong", file=sys.stderr)
+        return 1
+    records.sort(key=lambda record: record[0])
+    senders = {sender_of(payload) for _, payload in records}
+
+    recorder = Recorder()
+    server = graph = None
+    workdir = tempfile.TemporaryDirectory(prefix="waiz-replay-")
+    try:
+        url = args.url
+        if not url:
+            graph = start_graph_stub(StubBehavior(args.latency_ms, args.latency_ms / 4))
+            env = dict(os.environ,
+                       WAIZ_WHATSAPP_API_BASE=graph.url, WAIZ_WHATSAPP_API_TOKEN="replay",
+                       WAIZ_WHATSAPP_PHONE_NUMBER_ID="replay",
+                       WAIZ_TEMP_STORAGE_PATH=os.path.join(workdir.name, "storage"),
+                       WAIZ_UPLOAD_FOLDER=os.path.join(workdir.name, "uploads"),
+                       WAIZ_PROCESSED_FOLDER=os.path.join(workdir.name, "processed"),
+                       WAIZ_WEBHOOK_RECORD_PATH="", WAIZ_LOG_LEVEL="WARNING", WAIZ_DEBUG_MODE="false",
+                       **HARNESS_ENV)
+            server = ServerProcess("app", workdir.name, env, "/test")
+            server.wait_ready()
+            server.start_sampling()
+            url = server.url
+
+        start = time.perf_counter()
+        lags = sorted(replay(url, records, args.speed, args.workers, recorder,
+                             replies=graph.replies if graph is not None else None))
+        elapsed = time.perf_counter() - start
+        total, rows = recorder.report(elapsed)
+        span = (records[-1][0] - records[0][0]) / 1000
+        report = {
+            "file": args.file,
+            "messages": total,
+            "senders": len(senders),
+            "speed": args.speed or "max",
+            "recorded_span_s": round(span, 2),
+            "replay_s": round(elapsed, 2),
+            "rps": round(total / elapsed, 2) if elapsed else None,
+            "errors": sum(recorder.errors.values()),
+            "schedule_lag_ms": {
+                "p50": round(percentile(lags, 50) * 1000, 1),
+                "p95": round(percentile(lags, 95) * 1000, 1),
+                "max": round(lags[-1] * 1000, 1),
+            } if lags else None,
+            "by_type": rows,
+            "webhook_ack": recorder.ack_report(),
+        }
+        if server is not None:
+            report["resources"] = server.resource_usage()
+            report["server_metrics"] = server.scrape_metrics()
+            report["rejected"] = server.scrape_rejections()
+    finally:
+        if server is not None:
+            server.stop()
+        if graph is not None:
+            graph.stop()
+        workdir.cleanup()
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    rejected = {result: count for result, count in (report.get("rejected") or {}).items() if count}
+    for result, count in rejected.items():
+        print(f"GAGAL: {count} pesan {result} oleh admission control", file=sys.stderr)
+    return 1 if rejected else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
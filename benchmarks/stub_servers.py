@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Server tiruan lokal untuk WhatsApp Graph API dan OpenAI chat completions
+
+Dipakai oleh benchmarks/loadtest.py agar uji beban bisa berjalan offline.
+Setiap stub punya latensi (dengan jitter) dan injeksi error yang bisa diatur.
+
+Endpoint Graph API yang ditiru:
+    POST /<versi>/<phone_id>/messages        kirim pesan (dicatat per penerima di ReplyLog)
+    GET  /<versi>/<phone_id>/media/<id>      lookup URL media
+    GET  /files/<id>                          download media
+    POST /<versi>/<phone_id>/media            upload media
+
+Endpoint OpenAI:
+    POST /v1/chat/completions                 biasa dan stream (SSE)
+
+Contoh (berdiri sendiri):
+    python benchmarks/stub_servers.py --graph-port 9001 --openai-port 9002 --latency-ms 80
+"""
+import re
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubBehavior:
+    def __init__(self, latency_ms=50, jitter_ms=20, error_rate=0.0, error_status=500, seed=None):
+        """
+        Perilaku stub
+
+        Args:
+            latency_ms (float): Latensi dasar per request
+            jitter_ms (float): Jitter acak (+/-) di atas latensi dasar
+            error_rate (float): Peluang request dibalas error
+            error_status (int): Status HTTP untuk error yang diinjeksi
+            seed (int, optional): Seed RNG agar hasil bisa diulang
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self, scale=1.0):
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        time.sleep(max(0.0, self.latency_ms + jitter) * scale / 1000)
+
+    def should_fail(self):
+        if self.error_rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+
+class ReplyLog:
+    """
+    Catatan pesan keluar per penerima di stub Graph API
+
+    Dipakai harness untuk mengukur latensi webhook sampai balasan: catat
+    count() sebelum mengirim webhook, lalu wait() sampai balasan berikutnya
+    untuk pengirim itu diterima stub.
+    """
+
+    def __init__(self):
+        self._counts = Counter()
+        self._cond = threading.Condition()
+
+    def add(self, recipient):
+        with self._cond:
+            self._counts[recipient] += 1
+            self._cond.notify_all()
+
+    def count(self, recipient):
+        with self._cond:
+            return self._counts[recipient]
+
+    def wait(self, recipient, seen, timeout):
+        """
+        Tunggu sampai ada balasan baru untuk penerima
+
+        Args:
+            recipient (str): Nomor penerima
+            seen (int): Nilai count() sebelum webhook dikirim
+            timeout (float): Batas waktu tunggu (detik)
+
+        Returns:
+            bool: True jika balasan baru diterima sebelum timeout
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._counts[recipient] > seen, timeout)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "WaizStub/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status, body, content_type="application/json"):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _count(self, route, status):
+        self.server.stats[f"{route} {status}"] += 1
+
+    def _inject_error(self, route):
+        behavior = self.server.behavior
+        behavior.delay()
+        if behavior.should_fail():
+            self._count(route, behavior.error_status)
+            self._send(behavior.error_status, {"error": {"message": "Injected error", "code": behavior.error_status}})
+            return True
+        return False
+
+
+class GraphStubHandler(_StubHandler):
+    _messages = re.compile(r"^/[^/]+/[^/]+/messages$")
+    _media_lookup = re.compile(r"^/[^/]+/[^/]+/media/([^/]+)$")
+    _media_upload = re.compile(r"^/[^/]+/[^/]+/media$")
+    _download = re.compile(r"^/files/([^/]+)$")
+
+    def do_GET(self):
+        match = self._media_lookup.match(self.path)
+        if match:
+            if self._inject_error("media_lookup"):
+                return
+            media_id = match.group(1)
+            host = self.headers.get("Host")
+            self._count("media_lookup", 200)
+            self._send(200, {"id": media_id, "url": f"http://{host}/files/{media_id}",
+                             "mime_type": self.server.media_type, "file_size": self.server.media_bytes})
+            return
+
+        match = self._download.match(self.path)
+        if match:
+            if self._inject_error("media_download"):
+                return
+            self._count("media_download", 200)
+            self._send(200, self.server.media_payload, self.server.media_type)
+            return
+
+        self._count("unknown", 404)
+        self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        body = self._body()
+        if self._messages.match(self.path):
+            try:
+                recipient = json.loads(body or b"{}").get("to")
+            except ValueError:
+                self._count("messages", 400)
+                self._send(400, {"error": {"message": "Invalid JSON"}})
+                return
+            # Balasan dianggap sampai saat request diterima, sebelum latensi stub
+            self.server.replies.add(recipient)
+            if self._inject_error("messages"):
+                return
+            self._count("messages", 200)
+            self._send(200, {"messaging_product": "whatsapp",
+                             "contacts": [{"input": recipient, "wa_id": recipient}],
+                             "messages": [{"id": f"wamid.{uuid.uuid4().hex}"}]})
+            return
+
+        if self._media_upload.match(self.path):
+            # Waktu upload sebanding dengan ukuran berkas
+            self.server.behavior.delay(1 + len(body) / (1024 * 1024))
+            if self.server.behavior.should_fail():
+                self._count("media_upload", self.server.behavior.error_status)
+                self._send(self.server.behavior.error_status, {"error": {"message": "Injected error"}})
+                return
+            self._count("media_upload", 200)
+            self._send(200, {"id": uuid.uuid4().hex})
+            return
+
+        self._count("unknown", 404)
+        self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+
+class OpenAIStubHandler(_StubHandler):
+    WORDS = ("Baik", "saya", "akan", "membantu", "Anda", "dengan", "dokumen", "itu", "sekarang",
+             "silakan", "lanjutkan", "pertanyaan", "berikutnya", "terima", "kasih")
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._count("unknown", 404)
+            self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        request = json.loads(self._body() or b"{}")
+        if self._inject_error("chat"):
+            return
+
+        max_tokens = int(request.get("max_tokens") or 150)
+        n_tokens = max(1, min(max_tokens, self.server.completion_tokens))
+        words = [self.WORDS[i % len(self.WORDS)] for i in range(n_tokens)]
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in request.get("messages", []))
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": n_tokens,
+                 "total_tokens": prompt_tokens + n_tokens}
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        model = request.get("model", "stub")
+        created = int(time.time())
+
+        if not request.get("stream"):
+            self._count("chat", 200)
+            time.sleep(n_tokens * self.server.token_ms / 1000)
+            self._send(200, {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": " ".join(words)}}],
+                "usage": usage,
+            })
+            return
+
+        self._count("chat_stream", 200)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(choices, extra=None):
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                     "model": model, "choices": choices}
+            if extra:
+                chunk.update(extra)
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        try:
+            event([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+            for i, word in enumerate(words):
+                time.sleep(self.server.token_ms / 1000)
+                event([{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}])
+            event([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+            if (request.get("stream_options") or {}).get("include_usage"):
+                event([], {"usage": usage})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # Klien memutus stream (mis. barge-in)
+            pass
+
+
+class StubServer:
+    def __init__(self, handler, behavior=None, host="127.0.0.1", port=0, **attributes):
+        """
+        Server stub yang berjalan di thread latar belakang
+
+        Args:
+            handler: Kelas handler (GraphStubHandler/OpenAIStubHandler)
+            behavior (StubBehavior): Latensi dan injeksi error
+            host (str): Alamat bind
+            port (int): Port (0 = pilih bebas)
+            **attributes: Atribut tambahan untuk handler (mis. media_bytes)
+        """
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.behavior = behavior or StubBehavior()
+        self.httpd.stats = Counter()
+        self.httpd.replies = ReplyLog()
+        for name, value in attributes.items():
+            setattr(self.httpd, name, value)
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name=f"stub-{handler.__name__}",
+                                        daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def stats(self):
+        return dict(self.httpd.stats)
+
+    @property
+    def replies(self):
+        return self.httpd.replies
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def start_graph_stub(behavior=None, port=0, media_bytes=256 * 1024, media_type="application/pdf"):
+    """Jalankan stub WhatsApp Graph API"""
+    return StubServer(GraphStubHandler, behavior, port=port, media_bytes=media_bytes, media_type=media_type,
+                      media_payload=b"%PDF-1.4\n" + b"0" * max(0, media_bytes - 9)).start()
+
+
+def start_openai_stub(behavior=None, port=0, completion_tokens=40, token_ms=5):
+    """Jalankan stub OpenAI chat completions"""
+    return StubServer(OpenAIStubHandler, behavior, port=port, completion_tokens=completion_tokens,
+                      token_ms=token_ms).start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub lokal WhatsApp Graph API dan OpenAI")
+    parser.add_argument("--graph-port", type=int, default=9001)
+    parser.add_argument("--openai-port", type=int, default=9002)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--token-ms", type=float, default=5, help="Jeda antar token stream OpenAI")
+    args = parser.parse_args()
+
+    behavior = StubBehavior(args.latency_ms, args.jitter_ms, args.error_rate)
+    graph = start_graph_stub(behavior, args.graph_port)
+    openai = start_openai_stub(behavior, args.openai_port, token_ms=args.token_ms)
+    print(f"WAIZ_WHATSAPP_API_BASE={graph.url}")
+    print(f"WAIZ_OPENAI_BASE_URL={openai.url}/v1")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        graph.stop()
+        openai.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
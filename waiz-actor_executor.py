@@ -0,0 +1,251 @@
+# Modul eksekusi per pengguna (actor): satu mailbox per pengguna aktif
+#
+# Pesan seorang pengguna diproses berurutan (konteks NLP dan dokumennya tidak
+# pernah disentuh dua thread sekaligus), sedangkan pengguna yang berbeda
+# diproses paralel oleh pool thread bersama. Actor hanya dijadwalkan ke pool
+# saat mailbox-nya berisi, jadi pengguna yang diam tidak memakai thread.
+import time
+import queue
+import logging
+import threading
+from collections import deque
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+ACTOR_MESSAGES = metrics.counter("waiz_actor_messages_total", "Pesan yang diproses actor per status", ("status",))
+ACTOR_WAIT_SECONDS = metrics.histogram("waiz_actor_queue_wait_seconds", "Waktu tunggu pesan di mailbox")
+ACTOR_RECLAIMED = metrics.counter("waiz_actor_reclaimed_total", "Actor menganggur yang dihapus")
+ACTOR_ACTIVE = metrics.gauge("waiz_actor_active", "Jumlah actor (pengguna) yang tersimpan")
+ACTOR_MAILBOX_DEPTH = metrics.gauge("waiz_actor_mailbox_depth", "Total pesan menunggu di semua mailbox")
+ACTOR_MAILBOX_MAX = metrics.gauge("waiz_actor_mailbox_max_depth", "Kedalaman mailbox terbesar")
+
+
+class _Actor:
+    __slots__ = ("key", "mailbox", "scheduled", "last_active", "processed", "busy_seconds")
+
+    def __init__(self, key):
+        self.key = key
+        self.mailbox = deque()
+        self.scheduled = False
+        self.last_active = time.monotonic()
+        self.processed = 0
+        self.busy_seconds = 0.0
+
+
+class ActorExecutor:
+    def __init__(self, workers=8, max_mailbox=50, idle_timeout=300, batch=8, deadline=0, name="waiz-actor"):
+        """
+        Executor dengan urutan serial per kunci (pengguna)
+
+        Args:
+            workers (int): Jumlah thread pool bersama
+            max_mailbox (int): Kapasitas mailbox per pengguna
+            idle_timeout (float): Actor tanpa pesan selama ini (detik) dihapus
+            batch (int): Pesan maksimum per giliran sebelum actor lain dilayani
+            deadline (float): Pesan yang menunggu lebih lama dari ini (detik)
+                tidak dijalankan (0 = tanpa batas)
+            name (str): Prefiks nama thread
+        """
+        self.max_mailbox = max_mailbox
+        self.idle_timeout = idle_timeout
+        self.batch = batch
+        self.deadline = deadline
+        self._actors = {}
+        self._lock = threading.Lock()
+        self._ready = queue.SimpleQueue()
+        self._stopping = False
+        self._pending = 0
+
+        self._threads = [
+            threading.Thread(target=self._work, name=f"{name}-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+        self._reaper_stop = threading.Event()
+        self._reaper = threading.Thread(target=self._reap_loop, name=f"{name}-reaper", daemon=True)
+        self._reaper.start()
+
+        ACTOR_ACTIVE.set_function(lambda: len(self._actors))
+        ACTOR_MAILBOX_DEPTH.set_function(lambda: self._pending)
+        ACTOR_MAILBOX_MAX.set_function(self.max_depth)
+
+    def submit(self, key, fn, *args, on_expired=None, **kwargs):
+        """
+        Jadwalkan fn(*args, **kwargs) pada actor milik key
+
+        Args:
+            on_expired (callable, optional): Dipanggil dengan (*args, **kwargs)
+                jika pesan melewati deadline sebelum diproses
+
+        Returns:
+            bool: False jika mailbox penuh atau executor sudah dihentikan
+        """
+        with self._lock:
+            if self._stopping:
+                ACTOR_MESSAGES.labels("rejected").inc()
+                return False
+            actor = self._actors.get(key)
+            if actor is None:
+                actor = self._actors[key] = _Actor(key)
+            if len(actor.mailbox) >= self.max_mailbox:
+                ACTOR_MESSAGES.labels("rejected").inc()
+                return False
+            actor.mailbox.append((time.perf_counter(), fn, args, kwargs, on_expired))
+            actor.last_active = time.monotonic()
+            self._pending += 1
+            schedule = not actor.scheduled
+            actor.scheduled = True
+        if schedule:
+            self._ready.put(actor)
+        return True
+
+    def _work(self):
+        while True:
+            actor = self._ready.get()
+            if actor is None:
+                return
+            for _ in range(self.batch):
+                with self._lock:
+                    if not actor.mailbox:
+                        break
+                    enqueued, fn, args, kwargs, on_expired = actor.mailbox.popleft()
+                    self._pending -= 1
+                started = time.perf_counter()
+                ACTOR_WAIT_SECONDS.observe(started - enqueued)
+                if self.deadline and started - enqueued > self.deadline:
+                    ACTOR_MESSAGES.labels("expired").inc()
+                    fn = on_expired
+                    if fn is None:
+                        continue
+                try:
+                    fn(*args, **kwargs)
+                    if fn is not on_expired:
+                        ACTOR_MESSAGES.labels("ok").inc()
+                except Exception as e:
+                    ACTOR_MESSAGES.labels("error").inc()
+                    logger.error(f"Error pada actor: {str(e)}")
+                actor.processed += 1
+                actor.busy_seconds += time.perf_counter() - started
+            with self._lock:
+                actor.last_active = time.monotonic()
+                if actor.mailbox:
+                    # Masih ada pesan: antre lagi di belakang agar adil ke pengguna lain
+                    requeue = True
+                else:
+                    actor.scheduled = False
+                    requeue = False
+            if requeue:
+                self._ready.put(actor)
+
+    def _reap_loop(self):
+        interval = max(1.0, min(60.0, self.idle_timeout / 2))
+        while not self._reaper_stop.wait(interval):
+            self.reap()
+
+    def reap(self):
+        """
+        Hapus actor yang mailbox-nya kosong dan menganggur melewati idle_timeout
+
+        Returns:
+            int: Jumlah actor yang dihapus
+        """
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            idle = [key for key, actor in self._actors.items()
+                    if not actor.scheduled and not actor.mailbox and actor.last_active < cutoff]
+            for key in idle:
+                del self._actors[key]
+        if idle:
+            ACTOR_RECLAIMED.inc(len(idle))
+            logger.debug(f"{len(idle)} actor menganggur dihapus")
+        return len(idle)
+
+    def max_depth(self):
+        with self._lock:
+            return max((len(actor.mailbox) for actor in self._actors.values()), default=0)
+
+    def hottest(self, limit=10):
+        """
+        Pengguna dengan antrean terpanjang, lalu waktu proses terbanyak
+
+        Returns:
+            list: Dict per actor, diurutkan dari yang paling sibuk
+        """
+        with self._lock:
+            rows = [(len(actor.mailbox), actor.busy_seconds, actor.processed, actor.key)
+                    for actor in self._actors.values()]
+        rows.sort(reverse=True)
+        return [
+            {"key": key, "depth": depth, "processed": processed, "busy_ms": round(busy * 1000, 1)}
+            for depth, busy, processed, key in rows[:limit]
+        ]
+
+    def stats(self):
+        return {
+            "actors": len(self._actors),
+            "pending": self._pending,
+            "max_depth": self.max_depth(),
+            "workers": len(self._threads),
+            "deadline": self.deadline,
+        }
+
+    def shutdown(self, wait=True, timeout=None):
+        """
+        Tolak pesan baru lalu hentikan pool
+
+        Args:
+            wait (bool): Tunggu mailbox habis diproses
+            timeout (float, optional): Batas waktu menunggu (detik)
+        """
+        with self._lock:
+            if self._stopping:
+                return
+            self._stopping = True
+        self._reaper_stop.set()
+        if wait:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while self._pending and (deadline is None or time.monotonic() < deadline):
+                time.sleep(0.05)
+        for _ in self._threads:
+            self._ready.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+
+def mask_key(key):
+    """Tampilkan hanya 4 karakter terakhir ID pengguna"""
+    key = str(key)
+    return "*" * max(0, len(key) - 4) + key[-4:]
+
+
+def register_flask(app, executor, token, path="/debug/actors"):
+    """
+    Tambahkan endpoint statistik actor dan pengguna tersibuk ke aplikasi Flask
+
+    Query: ?limit=10
+
+    Dilindungi token debug yang sama dengan /debug/memory.
+
+    Args:
+        token (callable): token() -> token debug yang berlaku saat ini
+    """
+    from flask import request, jsonify
+    from diagnostics import debug_authorized
+
+    def actors_endpoint():
+        if not debug_authorized(request, token()):
+            return jsonify({"status": "error", "message": "Tidak diizinkan"}), 403
+        try:
+            limit = int(request.args.get('limit', 10))
+        except ValueError:
+            return jsonify({"status": "error", "message": "Parameter tidak valid"}), 400
+        hottest = executor.hottest(limit)
+        for row in hottest:
+            row["key"] = mask_key(row["key"])
+        return jsonify(dict(executor.stats(), hottest=hottest))
+
+    app.add_url_rule(path, "debug_actors", actors_endpoint, methods=["GET"])
@@ -0,0 +1,172 @@
+# Modul admission control untuk webhook: token bucket per pengirim dan batas
+# jumlah pesan yang sedang diproses secara global
+#
+# Keputusan diambil sebelum NLP, download media, atau panggilan OpenAI,
+# sehingga pengirim yang membanjiri bot (atau bot loop) hanya memakan biaya
+# satu lookup dict. Pengirim yang ditahan mendapat satu balasan "mohon
+# pelan-pelan" per notice_interval, bukan satu balasan per pesan.
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+ADMITTED = "admitted"
+THROTTLED = "throttled"
+SHED = "shed"
+
+ADMISSION_DECISIONS = metrics.counter("waiz_admission_decisions_total", "Keputusan admission per hasil", ("result",))
+ADMISSION_NOTICES = metrics.counter("waiz_admission_notices_total", "Balasan 'mohon pelan-pelan' yang dikirim")
+ADMISSION_INFLIGHT = metrics.gauge("waiz_admission_inflight", "Pesan yang sedang diproses atau menunggu")
+ADMISSION_THROTTLED_SENDERS = metrics.gauge("waiz_admission_throttled_senders",
+                                            "Pengirim yang ditahan dalam notice_interval terakhir")
+ADMISSION_DUPLICATES = metrics.counter("waiz_admission_duplicates_total",
+                                       "Pesan kiriman ulang WhatsApp yang sudah pernah diterima")
+
+
+class RecentMessages:
+    def __init__(self, max_size=10000):
+        """
+        Daftar ID pesan yang sudah diterima, terbatas ukurannya
+
+        WhatsApp mengirim ulang seluruh webhook yang tidak dibalas 200,
+        termasuk pesan di dalamnya yang sudah dijadwalkan. ID yang tercatat
+        di sini dilewati saat webhook tersebut datang lagi.
+
+        Args:
+            max_size (int): Jumlah ID yang diingat (yang terlama dibuang dulu)
+        """
+        self.max_size = max_size
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def seen(self, message_id):
+        """
+        Returns:
+            bool: True jika message_id sudah pernah ditandai dengan add()
+        """
+        if not message_id:
+            return False
+        with self._lock:
+            if message_id in self._ids:
+                ADMISSION_DUPLICATES.inc()
+                return True
+        return False
+
+    def add(self, message_id):
+        """Tandai message_id sebagai sudah diterima"""
+        if not message_id or self.max_size <= 0:
+            return
+        with self._lock:
+            self._ids[message_id] = None
+            self._ids.move_to_end(message_id)
+            while len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated", "throttled_at", "notified_at")
+
+    def __init__(self, tokens, now):
+        self.tokens = tokens
+        self.updated = now
+        self.throttled_at = 0.0
+        self.notified_at = 0.0
+
+
+class AdmissionController:
+    def __init__(self, rate=1.0, burst=10, max_inflight=500, notice_interval=60, max_senders=100000):
+        """
+        Args:
+            rate (float): Token per detik per pengirim (0 = tanpa batas per pengirim)
+            burst (int): Kapasitas bucket (pesan beruntun yang masih diterima)
+            max_inflight (int): Batas global pesan yang diterima tapi belum selesai (0 = tanpa batas)
+            notice_interval (float): Jeda minimum antar balasan throttle ke pengirim yang sama (detik)
+            max_senders (int): Jumlah bucket maksimum sebelum bucket penuh dibersihkan
+        """
+        self.configure(rate, burst, max_inflight, notice_interval)
+        self.max_senders = max_senders
+        self.inflight = 0
+        self._buckets = {}
+        self._lock = threading.Lock()
+        ADMISSION_INFLIGHT.set_function(lambda: self.inflight)
+        ADMISSION_THROTTLED_SENDERS.set_function(self.throttled_senders)
+
+    def configure(self, rate, burst, max_inflight, notice_interval):
+        """Ubah batas saat berjalan (mis. setelah .env dimuat ulang)"""
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_inflight = max_inflight
+        self.notice_interval = notice_interval
+
+    def admit(self, sender_id):
+        """
+        Putuskan apakah pesan dari sender_id boleh diproses
+
+        Pesan yang diterima menambah inflight; panggil release() setelah
+        pesan selesai diproses (atau dibuang).
+
+        Returns:
+            tuple: (hasil, kirim_notice) dengan hasil ADMITTED, THROTTLED, atau
+                SHED; kirim_notice True jika pengirim perlu diberi tahu
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.rate > 0 and sender_id:
+                bucket = self._buckets.get(sender_id)
+                if bucket is None:
+                    if len(self._buckets) >= self.max_senders:
+                        self._sweep(now)
+                    bucket = self._buckets[sender_id] = _Bucket(self.burst, now)
+                else:
+                    bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+                    bucket.updated = now
+                if bucket.tokens < 1:
+                    bucket.throttled_at = now
+                    notify = now - bucket.notified_at >= self.notice_interval
+                    if notify:
+                        bucket.notified_at = now
+                        ADMISSION_NOTICES.inc()
+                    ADMISSION_DECISIONS.labels(THROTTLED).inc()
+                    return THROTTLED, notify
+            else:
+                bucket = None
+
+            if self.max_inflight and self.inflight >= self.max_inflight:
+                # Beban global penuh: token pengirim tidak dipotong
+                ADMISSION_DECISIONS.labels(SHED).inc()
+                return SHED, False
+
+            if bucket is not None:
+                bucket.tokens -= 1
+            self.inflight += 1
+        ADMISSION_DECISIONS.labels(ADMITTED).inc()
+        return ADMITTED, False
+
+    def release(self):
+        """Tandai satu pesan yang diterima admit() sudah selesai"""
+        with self._lock:
+            self.inflight = max(0, self.inflight - 1)
+
+    def _sweep(self, now):
+        # Bucket yang sudah terisi penuh kembali tidak membawa informasi apa pun
+        full = [sender for sender, bucket in self._buckets.items()
+                if bucket.tokens + (now - bucket.updated) * self.rate >= self.burst]
+        for sender in full:
+            del self._buckets[sender]
+        if len(self._buckets) >= self.max_senders:
+            # Masih penuh: buang bucket yang paling lama tidak aktif
+            oldest = sorted(self._buckets, key=lambda sender: self._buckets[sender].updated)
+            for sender in oldest[:len(oldest) // 2]:
+                del self._buckets[sender]
+
+    def throttled_senders(self):
+        cutoff = time.monotonic() - self.notice_interval
+        with self._lock:
+            return sum(1 for bucket in self._buckets.values() if bucket.throttled_at >= cutoff)
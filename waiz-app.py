@@ -6,32 +6,212 @@ import os
 import json
 import logging
 import uuid
+import time
+import atexit
 from datetime import datetime
 import config
+import metrics
+import tracing
+import log_setup
+from log_setup import Payload
 
 # Import modul kustom
 from document_processor import DocumentProcessor
+from export_cache import ExportCache
+from revision_store import RevisionStore
 from nlp_engine import NLPEngine
 from storage_manager import StorageManager
+from traffic_recorder import TrafficRecorder
+from media_handler import MediaHandler
+from audio_transcriber import AudioTranscriber
+import actor_executor
+from actor_executor import ActorExecutor
+import lanes
+from lanes import Lane
+import admission
+from admission import AdmissionController, RecentMessages
+from snapshot import Snapshotter, ShutdownSequence, install_signal_handlers
+import diagnostics
+import profiler
 
-# Konfigurasi logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Konfigurasi logging (LOG_FORMAT=json untuk log terstruktur)
+log_setup.setup_from_settings(config.get_settings())
 logger = logging.getLogger(__name__)
 
 # Initialize aplikasi Flask
 app = Flask(__name__)
+metrics.register_flask(app)
+tracing.register_flask(app, lambda: config.DEBUG_TOKEN)
+
+WEBHOOK_REQUESTS = metrics.counter("waiz_webhook_requests_total", "Jumlah request webhook per status HTTP", ("status",))
+WEBHOOK_SECONDS = metrics.histogram("waiz_webhook_seconds", "Durasi penanganan webhook")
+WHATSAPP_REQUESTS = metrics.counter("waiz_whatsapp_api_requests_total", "Jumlah panggilan WhatsApp API",
+                                    ("operation", "status"))
+WHATSAPP_SECONDS = metrics.histogram("waiz_whatsapp_api_seconds", "Durasi panggilan WhatsApp API", ("operation",))
 
 # Initialize modul-modul utama
 nlp_engine = NLPEngine()
-doc_processor = DocumentProcessor()
-storage_manager = StorageManager(config.TEMP_STORAGE_PATH)
+storage_manager = StorageManager(
+    config.TEMP_STORAGE_PATH,
+    session_mode=config.SESSION_STORE_MODE,
+    session_cache_size=config.SESSION_CACHE_SIZE,
+    session_flush_interval=config.SESSION_FLUSH_INTERVAL,
+    shard_levels=config.STORAGE_SHARD_LEVELS,
+    # Worker cluster berbagi direktori sesi tapi tidak boleh berbagi WAL:
+    # checkpoint satu worker akan memotong record worker lain
+    session_wal_name=f"sessions.worker{config.CLUSTER_WORKER_ID}.wal" if config.CLUSTER_WORKER_ID >= 0 else None
+)
+doc_processor = DocumentProcessor(
+    storage_manager,
+    export_cache=ExportCache(pdf_workers=config.EXPORT_PDF_WORKERS, pdf_timeout=config.EXPORT_PDF_TIMEOUT),
+    revisions=RevisionStore(max_revisions=config.REVISION_MAX_COUNT, max_age=config.REVISION_MAX_AGE)
+)
+
+media_handler = MediaHandler(storage_manager)
+transcriber = AudioTranscriber()
+
+# Lane interaktif: pesan satu pengguna diproses berurutan oleh actor-nya,
+# pengguna berbeda diproses paralel
+actors = ActorExecutor(
+    workers=config.ACTOR_WORKERS,
+    max_mailbox=config.ACTOR_MAILBOX_SIZE,
+    idle_timeout=config.ACTOR_IDLE_TIMEOUT,
+    deadline=config.LANE_INTERACTIVE_DEADLINE
+)
+# Lane berat: download/transkripsi media dan ekspor dokumen punya pool sendiri
+# sehingga tidak menahan perintah teks
+media_lane = Lane("media", workers=config.LANE_MEDIA_WORKERS,
+                  max_queue=config.LANE_MEDIA_QUEUE_SIZE, deadline=config.LANE_MEDIA_DEADLINE)
+export_lane = Lane("export", workers=config.LANE_EXPORT_WORKERS,
+                   max_queue=config.LANE_EXPORT_QUEUE_SIZE, deadline=config.LANE_EXPORT_DEADLINE)
+# Balasan throttle dikirim di luar thread webhook
+notice_lane = Lane("notice", workers=1, max_queue=100, deadline=30)
+
+# Admission control sebelum NLP: token bucket per pengirim dan batas global
+admission_control = AdmissionController(
+    rate=config.ADMISSION_RATE,
+    burst=config.ADMISSION_BURST,
+    max_inflight=config.ADMISSION_MAX_INFLIGHT,
+    notice_interval=config.ADMISSION_NOTICE_INTERVAL
+)
+
+def on_admission_config_change(old, new, changed):
+    """Terapkan batas admission baru saat .env dimuat ulang"""
+    if any(key.startswith("admission_") for key in changed):
+        admission_control.configure(new.admission_rate, new.admission_burst,
+                                    new.admission_max_inflight, new.admission_notice_interval)
+
+config.subscribe(on_admission_config_change)
+
+# Webhook yang dibalas 503 dikirim ulang utuh; pesan di dalamnya yang sudah
+# dijadwalkan dilewati berdasarkan ID
+recent_messages = RecentMessages(config.ADMISSION_DEDUP_SIZE)
+
+def shutdown_lanes(timeout=30):
+    """Hentikan lane berat lalu actor (pekerjaan lane bisa mengirim pesan ke actor)"""
+    media_lane.shutdown(timeout=timeout)
+    export_lane.shutdown(timeout=timeout)
+    notice_lane.shutdown(timeout=timeout)
+    actors.shutdown(timeout=timeout)
+
+actor_executor.register_flask(app, actors, lambda: config.DEBUG_TOKEN)
+lanes.register_flask(app, {"interactive": actors, "media": media_lane, "export": export_lane,
+                           "notice": notice_lane}, lambda: config.DEBUG_TOKEN)
+
+# Rekam trafik webhook (dianonimkan) jika WEBHOOK_RECORD_PATH diisi
+traffic_recorder = None
+if config.WEBHOOK_RECORD_PATH:
+    traffic_recorder = TrafficRecorder(
+        config.WEBHOOK_RECORD_PATH,
+        salt=config.WEBHOOK_RECORD_SALT,
+        keep_words=nlp_engine.keywords(),
+        sample_rate=config.WEBHOOK_RECORD_SAMPLE_RATE
+    )
+
+# Sampling trace mengikuti konfigurasi (ikut berubah saat .env dimuat ulang)
+def configure_tracing(settings):
+    tracing.TRACER.configure(
+        sample_rate=settings.trace_sample_rate,
+        buffer_size=settings.trace_buffer_size,
+        slow_ms=settings.trace_slow_ms
+    )
+
+configure_tracing(config.get_settings())
+config.subscribe(lambda old, new, changed: configure_tracing(new))
+
+def on_log_config_change(old, new, changed):
+    """Pasang ulang logging saat pengaturan LOG_* berubah"""
+    if any(key.startswith("log_") for key in changed):
+        log_setup.setup_from_settings(new)
+
+config.subscribe(on_log_config_change)
 
 # Pastikan direktori penyimpanan sementara ada
 os.makedirs(config.TEMP_STORAGE_PATH, exist_ok=True)
 
+# Hapus sesi dan dokumen kadaluarsa secara otomatis di latar belakang. Pada
+# mode cluster setiap worker hanya menjadwalkan data pengguna yang dirutekan
+# kepadanya, sehingga penghapusan selalu melewati cache sesi dan model
+# dokumen milik worker tersebut
+if config.EXPIRY_SCHEDULER:
+    expiry_owner = None
+    if config.CLUSTER_WORKER_ID >= 0:
+        from cluster import worker_for
+        expiry_owner = lambda user_id: (  # noqa: E731
+            worker_for(user_id, config.CLUSTER_WORKERS) == config.CLUSTER_WORKER_ID)
+    storage_manager.start_expiry_scheduler(
+        session_ttl=config.SESSION_TTL,
+        document_ttl=config.DOCUMENT_TTL,
+        owner=expiry_owner
+    )
+
+# Estimasi memori per subsistem (dihitung hanya saat /debug/memory diminta)
+diagnostics.register_source("nlp.user_contexts", diagnostics.collection_source(nlp_engine.user_contexts))
+diagnostics.register_source("documents.loaded", diagnostics.collection_source(doc_processor.documents, depth=8))
+diagnostics.register_source("documents.index", diagnostics.object_source(doc_processor.index, depth=7))
+diagnostics.register_source("documents.export_cache", diagnostics.object_source(doc_processor.export_cache))
+if storage_manager.session_cache is not None:
+    diagnostics.register_source("storage.session_cache", diagnostics.object_source(storage_manager.session_cache))
+diagnostics.register_source("actors", diagnostics.object_source(actors, entries=lambda: actors.stats()["actors"]))
+diagnostics.register_source("admission", diagnostics.object_source(admission_control))
+diagnostics.register_source("admission.recent_messages", diagnostics.object_source(recent_messages))
+diagnostics.register_source("tracing", diagnostics.object_source(tracing.TRACER, depth=8))
+if traffic_recorder is not None:
+    diagnostics.register_source("traffic_recorder", diagnostics.object_source(traffic_recorder))
+diagnostics.register_flask(app, lambda: config.DEBUG_TOKEN)
+# Profiler CPU dinyalakan sesuai permintaan lewat POST /debug/profile
+profiler.PROFILER.output_dir = config.PROFILE_DIR
+profiler.register_flask(app, lambda: config.DEBUG_TOKEN)
+memory_sampler = None
+if config.MEMORY_SAMPLER_INTERVAL > 0:
+    memory_sampler = diagnostics.AllocationSampler(config.MEMORY_SAMPLER_INTERVAL, config.MEMORY_SAMPLER_TOP)
+    memory_sampler.start()
+
+# Snapshot konteks pengguna dan dokumen yang sedang dimuat; dimuat saat
+# startup agar proses baru langsung "hangat" setelah deploy
+snapshotter = Snapshotter(os.path.join(config.SNAPSHOT_DIR, "app.json.gz"), max_age=config.SNAPSHOT_MAX_AGE)
+snapshotter.register("contexts", nlp_engine.export_contexts, nlp_engine.import_contexts)
+snapshotter.register("documents", doc_processor.snapshot_documents, doc_processor.warm_documents)
+# Dengan DEBUG_MODE, reloader werkzeug menjalankan modul ini juga di proses
+# induk yang hanya memantau file; snapshot dimuat (lalu dihapus) dan disimpan
+# hanya oleh proses anak yang melayani request
+RELOADER_PARENT = (__name__ == '__main__' and config.DEBUG_MODE
+                   and os.environ.get("WERKZEUG_RUN_MAIN") != "true")
+if not RELOADER_PARENT:
+    snapshotter.restore()
+
+# Urutan shutdown: tolak pesan baru (webhook dibalas 503 agar WhatsApp
+# mengirim ulang ke proses berikutnya), kuras antrean, snapshot, tutup
+shutdown = ShutdownSequence()
+shutdown.add("drain", lambda: shutdown_lanes(timeout=config.SHUTDOWN_DRAIN_TIMEOUT))
+if not RELOADER_PARENT:
+    shutdown.add("snapshot", snapshotter.save)
+if traffic_recorder is not None:
+    shutdown.add("traffic_recorder", traffic_recorder.close)
+shutdown.add("documents", doc_processor.close)
+shutdown.add("storage", storage_manager.close)
+atexit.register(shutdown.run)
+
 # Endpoint untuk verifikasi webhook WhatsApp
 @app.route('/webhook', methods=['GET'])
 def verify_webhook():
@@ -51,17 +231,34 @@ def verify_webhook():
 # Endpoint untuk menerima pesan WhatsApp
 @app.route('/webhook', methods=['POST'])
 def webhook():
+    start = time.perf_counter()
+    response = _handle_webhook()
+    WEBHOOK_SECONDS.observe(time.perf_counter() - start)
+    WEBHOOK_REQUESTS.labels(response[1]).inc()
+    return response
+
+def _handle_webhook():
+    if shutdown.stopping:
+        return jsonify({"status": "error", "message": "Server sedang dimatikan"}), 503
     try:
         data = request.get_json()
-        logger.info(f"Received webhook data: {data}")
+        logger.info("Received webhook: %s bytes", request.content_length or 0,
+                    extra={"event": "webhook_received", "bytes": request.content_length or 0})
+        logger.debug("Webhook data: %s", Payload(data))
+        if traffic_recorder is not None and isinstance(data, dict):
+            traffic_recorder.record(data)
         
         # Periksa apakah ini adalah pesan WhatsApp
         if 'object' in data and data['object'] == 'whatsapp_business_account':
+            accepted = True
             for entry in data.get('entry', []):
                 for change in entry.get('changes', []):
                     if change.get('field') == 'messages':
-                        process_whatsapp_message(change.get('value', {}))
+                        accepted = dispatch_message(change.get('value', {})) and accepted
             
+            if not accepted:
+                # WhatsApp mengirim ulang webhook yang tidak dibalas 200
+                return jsonify({"status": "error", "message": "Terlalu banyak pesan tertunda"}), 503
             return jsonify({"status": "success"}), 200
         
         return jsonify({"status": "error", "message": "Not a WhatsApp message"}), 400
@@ -70,6 +267,106 @@ def webhook():
         logger.error(f"Error processing webhook: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+def dispatch_message(value):
+    """
+    Jadwalkan pesan ke actor milik pengirimnya setelah lolos admission control
+
+    Pesan dari pengirim yang melewati batas dibuang (dengan satu balasan
+    "mohon pelan-pelan" per interval) dan tetap dibalas 200 agar WhatsApp
+    tidak mengirim ulang. Webhook tanpa pesan (mis. update status kirim)
+    langsung diterima tanpa memakai slot admission maupun actor. Pesan yang
+    sudah pernah diterima (webhook berisi beberapa pesan yang dikirim ulang
+    setelah 503) dilewati.
+
+    Returns:
+        bool: False jika server sedang penuh atau mailbox pengirim penuh
+    """
+    messages = value.get('messages')
+    sender_id = messages[0].get('from') if messages else None
+    if not sender_id:
+        return True
+    message_id = messages[0].get('id')
+    if recent_messages.seen(message_id):
+        logger.info("Pesan kiriman ulang dilewati", extra={"event": "duplicate_message"})
+        return True
+    decision, notify = admission_control.admit(sender_id)
+    if decision == admission.THROTTLED:
+        logger.info("Pesan dari pengirim yang ditahan dibuang", extra={"event": "sender_throttled"})
+        recent_messages.add(message_id)
+        if notify:
+            notice_lane.submit(send_whatsapp_message, sender_id, SLOW_DOWN_MESSAGE)
+        return True
+    if decision == admission.SHED:
+        logger.warning("Server penuh; pesan ditolak", extra={"event": "load_shed"})
+        return False
+    if not actors.submit(sender_id, _process_admitted, value, on_expired=_expire_admitted):
+        admission_control.release()
+        logger.warning("Mailbox pengguna penuh; pesan ditolak", extra={"event": "mailbox_full"})
+        return False
+    recent_messages.add(message_id)
+    return True
+
+SLOW_DOWN_MESSAGE = "Anda mengirim pesan terlalu cepat. Mohon tunggu sebentar sebelum mengirim pesan berikutnya."
+
+def _process_admitted(value):
+    try:
+        process_whatsapp_message(value)
+    finally:
+        admission_control.release()
+
+def _expire_admitted(value):
+    try:
+        _reply_expired(value)
+    finally:
+        admission_control.release()
+
+def _submit_text(sender_id, message_id, text):
+    """Kembalikan hasil lane berat ke actor pengguna sebagai pesan teks"""
+    value = {'messages': [{'from': sender_id, 'id': message_id, 'type': 'text', 'text': {'body': text}}]}
+    if not actors.submit(sender_id, process_whatsapp_message, value, on_expired=_reply_expired):
+        send_whatsapp_message(sender_id, "Maaf, terlalu banyak pesan tertunda. Silakan coba lagi nanti.")
+
+def _reply_expired(value_or_user, *args, **kwargs):
+    """Beri tahu pengguna bahwa permintaannya kadaluarsa di antrean"""
+    if isinstance(value_or_user, dict):
+        messages = value_or_user.get('messages') or [{}]
+        value_or_user = messages[0].get('from')
+    if value_or_user:
+        send_whatsapp_message(value_or_user, "Maaf, server sedang sibuk dan permintaan Anda tidak sempat diproses. "
+                                             "Silakan kirim ulang.")
+
+def transcribe_voice_message(sender_id, message_id, media_id):
+    """Lane media: download voice note, transkripsi, lalu proses sebagai teks"""
+    if not transcriber.transcription_available:
+        send_whatsapp_message(sender_id, "Transkripsi audio tidak tersedia. Silakan kirim pesan teks.")
+        return
+    file_path = media_handler.download_media(media_id)
+    text = transcriber.transcribe(file_path) if file_path else None
+    if not text:
+        send_whatsapp_message(sender_id, "Maaf, pesan suara Anda tidak dapat ditranskripsi.")
+        return
+    _submit_text(sender_id, message_id, text)
+
+def download_user_document(sender_id, document_id):
+    """Lane media: download dokumen kiriman pengguna ke penyimpanan"""
+    file_path = media_handler.download_media(document_id)
+    stored_id = media_handler.process_document(file_path, sender_id) if file_path else None
+    if stored_id:
+        # Konteks pengguna hanya diubah dari actor-nya
+        actors.submit(sender_id, nlp_engine.update_context, sender_id, {'last_document_stored_id': stored_id})
+
+def export_and_notify(user_id, doc_id, format_type):
+    """Lane ekspor: materialisasi dokumen lalu kabari pengguna"""
+    try:
+        doc_processor.export_document(doc_id, format_type)
+        
+        # Di implementasi nyata, Anda perlu mengunggah file ke WhatsApp API
+        # dan mengirimkannya ke pengguna
+        send_whatsapp_message(user_id, f"Dokumen Anda telah diekspor sebagai {format_type.upper()}. Sedang mengirim file...")
+    except Exception as e:
+        logger.error(f"Error exporting document: {str(e)}")
+        send_whatsapp_message(user_id, f"Terjadi kesalahan saat mengekspor dokumen: {str(e)}")
+
 def process_whatsapp_message(value):
     """Proses pesan masuk dari WhatsApp"""
     try:
@@ -79,54 +376,70 @@ def process_whatsapp_message(value):
             logger.warning("No message data found")
             return
         
-        sender_id = message_data.get('from')
-        message_id = message_data.get('id')
-        message_timestamp = message_data.get('timestamp')
-        
-        # Ekstrak konten pesan berdasarkan jenisnya
-        message_type = message_data.get('type')
-        message_content = ""
-        
-        if message_type == 'text':
-            # Pesan teks biasa
-            message_content = message_data.get('text', {}).get('body', '')
-        
-        elif message_type == 'audio':
-            # Pesan audio (voice note) - butuh transcription service
-            message_content = "[VOICE MESSAGE - Transcription needed]"
-            # Di implementasi nyata, Anda perlu mengunduh file audio dan 
-            # menggunakan layanan transkripsi seperti Google Speech-to-Text
-        
-        elif message_type == 'document':
-            # Dokumen yang dikirim user
-            document_id = message_data.get('document', {}).get('id')
-            document_name = message_data.get('document', {}).get('filename', 'unknown_file')
-            # Di implementasi nyata, Anda perlu mengunduh dokumen
-            message_content = f"[DOCUMENT RECEIVED: {document_name}]"
+        # Satu trace per pesan masuk; message_id WhatsApp dipakai sebagai ID trace
+        with tracing.start_trace("process_whatsapp_message", trace_id=message_data.get('id'),
+                                 type=message_data.get('type')):
+            sender_id = message_data.get('from')
+            message_id = message_data.get('id')
+            message_timestamp = message_data.get('timestamp')
+        
+            # Ekstrak konten pesan berdasarkan jenisnya
+            message_type = message_data.get('type')
+            message_content = ""
+        
+            if message_type == 'text':
+                # Pesan teks biasa
+                message_content = message_data.get('text', {}).get('body', '')
+        
+            elif message_type == 'audio':
+                # Pesan audio (voice note): download dan transkripsi di lane media,
+                # hasilnya kembali ke actor pengguna sebagai pesan teks
+                media_id = message_data.get('audio', {}).get('id')
+                if media_lane.submit(transcribe_voice_message, sender_id, message_id, media_id,
+                                     on_expired=_reply_expired):
+                    send_whatsapp_message(sender_id, "Pesan suara diterima, sedang ditranskripsi...")
+                else:
+                    send_whatsapp_message(sender_id, "Antrean pesan suara sedang penuh. Silakan coba lagi nanti.")
+                return
+        
+            elif message_type == 'document':
+                # Dokumen yang dikirim user
+                document_id = message_data.get('document', {}).get('id')
+                document_name = message_data.get('document', {}).get('filename', 'unknown_file')
+                message_content = f"[DOCUMENT RECEIVED: {document_name}]"
+                if document_id:
+                    # Download berjalan di lane media; balasan tidak menunggu
+                    if not media_lane.submit(download_user_document, sender_id, document_id,
+                                             on_expired=_reply_expired):
+                        send_whatsapp_message(sender_id, "Antrean dokumen sedang penuh. "
+                                                         "Silakan kirim ulang dokumen nanti.")
+                        return
             
-            # Simpan informasi dokumen untuk diproses
-            nlp_engine.update_context(sender_id, {
-                'last_document_id': document_id,
-                'last_document_name': document_name
-            })
-        
-        # Proses pesan dengan NLP engine
-        if message_content:
-            intent, entities, context = nlp_engine.process_message(message_content, sender_id)
+                # Simpan informasi dokumen untuk diproses
+                nlp_engine.update_context(sender_id, {
+                    'last_document_id': document_id,
+                    'last_document_name': document_name
+                })
+        
+            # Proses pesan dengan NLP engine
+            if message_content:
+                intent, entities, context = nlp_engine.process_message(message_content, sender_id)
             
-            # Tangani intent yang terdeteksi
-            response = handle_document_intent(intent, entities, context, sender_id)
+                # Tangani intent yang terdeteksi
+                response = handle_document_intent(intent, entities, context, sender_id)
             
-            # Kirim respons ke WhatsApp
-            send_whatsapp_message(sender_id, response)
+                # Kirim respons ke WhatsApp
+                send_whatsapp_message(sender_id, response)
     
     except Exception as e:
         logger.error(f"Error processing message: {str(e)}")
 
+@tracing.traced("handle_document_intent")
 def handle_document_intent(intent, entities, context, user_id):
     """Handle berbagai intent terkait dokumen"""
     
-    logger.info(f"Handling intent: {intent} with entities: {entities}")
+    logger.info("Handling intent: %s with entities: %s", intent, Payload(entities),
+                extra={"event": "intent_handled", "intent": intent})
     
     if intent == "create_document":
         # Ekstrak judul dan tipe dokumen
@@ -134,13 +447,34 @@ def handle_document_intent(intent, entities, context, user_id):
         doc_type = entities.get('document_type', 'docx')
         
         # Buat dokumen baru
-        doc_id = doc_processor.create_document(doc_title, doc_type)
+        doc_id = doc_processor.create_document(doc_title, doc_type, user_id=user_id)
         
         # Simpan ID dokumen dalam konteks user
         nlp_engine.update_context(user_id, {'current_document': doc_id})
         
         return f"Dokumen {doc_type.upper()} baru dengan judul '{doc_title}' telah dibuat. Apa yang ingin Anda tambahkan ke dalamnya?"
     
+    elif intent == "select_document":
+        # Cari dokumen milik user berdasarkan judul yang disebutkan
+        doc_title = entities.get('document_title', '')
+        matches = doc_processor.find_documents(user_id, doc_title)
+        if not matches:
+            return f"Tidak ada dokumen dengan judul '{doc_title}'. Silakan buat dokumen baru terlebih dahulu."
+        
+        doc_id, title = matches[0]
+        nlp_engine.update_context(user_id, {'current_document': doc_id})
+        return f"Dokumen '{title}' sekarang aktif. Apa yang ingin Anda lakukan?"
+    
+    elif intent == "search_document":
+        # Cari frasa di semua dokumen milik user
+        query = entities.get('query', '')
+        results = doc_processor.search(user_id, query, limit=5)
+        if not results:
+            return f"Teks '{query}' tidak ditemukan di dokumen Anda."
+        
+        lines = [f"- {r['title']} ({r['section']}): {r['text'][:80]}" for r in results]
+        return f"Ditemukan {len(results)} hasil untuk '{query}':\n" + "\n".join(lines)
+    
     elif intent == "add_text":
         # Dapatkan dokumen saat ini dari konteks
         doc_id = nlp_engine.get_context(user_id).get('current_document')
@@ -183,21 +517,43 @@ def handle_document_intent(intent, entities, context, user_id):
         if not doc_id:
             return "Tidak ada dokumen aktif. Silakan buat atau pilih dokumen terlebih dahulu."
         
-        # Ekspor dokumen ke format yang diminta
+        # Ekspor berjalan di lane ekspor; pengguna langsung mendapat konfirmasi
         format_type = entities.get('format', 'docx')
-        try:
-            file_path = doc_processor.export_document(doc_id, format_type)
-            
-            # Kirim notifikasi karena file akan dikirim terpisah
-            message = f"Dokumen Anda telah diekspor sebagai {format_type.upper()}. Sedang mengirim file..."
-            
-            # Di implementasi nyata, Anda perlu mengunggah file ke WhatsApp API
-            # dan mengirimkannya ke pengguna
-            
-            return message
-        except Exception as e:
-            logger.error(f"Error exporting document: {str(e)}")
-            return f"Terjadi kesalahan saat mengekspor dokumen: {str(e)}"
+        if not export_lane.submit(export_and_notify, user_id, doc_id, format_type, on_expired=_reply_expired):
+            return "Antrean ekspor sedang penuh. Silakan coba lagi beberapa saat lagi."
+        return f"Sedang menyiapkan dokumen {format_type.upper()}. Anda akan diberi tahu setelah selesai."
+    
+    elif intent in ("undo", "redo"):
+        # Batalkan atau ulangi revisi terakhir dokumen aktif
+        doc_id = nlp_engine.get_context(user_id).get('current_document')
+        if not doc_id:
+            return "Tidak ada dokumen aktif. Silakan buat atau pilih dokumen terlebih dahulu."
+        
+        op = doc_processor.undo(doc_id) if intent == "undo" else doc_processor.redo(doc_id)
+        if op is None:
+            return "Tidak ada perubahan yang bisa dibatalkan." if intent == "undo" else "Tidak ada perubahan yang bisa diulang."
+        
+        action = "dibatalkan" if intent == "undo" else "diulang"
+        return f"Perubahan terakhir di bagian {op['s']} telah {action}."
+    
+    elif intent == "show_history":
+        # Tampilkan revisi terakhir dokumen aktif
+        doc_id = nlp_engine.get_context(user_id).get('current_document')
+        if not doc_id:
+            return "Tidak ada dokumen aktif. Silakan buat atau pilih dokumen terlebih dahulu."
+        
+        revisions = doc_processor.get_history(doc_id, limit=5)
+        if not revisions:
+            return "Belum ada riwayat revisi untuk dokumen ini."
+        
+        lines = []
+        for rev in revisions:
+            when = datetime.fromtimestamp(rev['ts']).strftime('%H:%M') if rev.get('ts') else '-'
+            if rev['op'] == 'edit':
+                lines.append(f"- [{when}] {rev['s']}: '{rev['old']}' -> '{rev['new']}'")
+            else:
+                lines.append(f"- [{when}] {rev['s']}: tambah '{rev['t'][:50]}'")
+        return "Revisi terakhir:\n" + "\n".join(lines)
     
     elif intent == "help":
         # Kirim bantuan penggunaan
@@ -205,9 +561,13 @@ def handle_document_intent(intent, entities, context, user_id):
 Berikut adalah perintah yang dapat Anda gunakan:
 
 - "Buat dokumen baru tentang [judul]"
+- "Pilih dokumen [judul]"
+- "Cari [teks]"
 - "Tambahkan teks ini ke bagian [bagian]"
 - "Ubah [teks lama] menjadi [teks baru]"
 - "Ekspor dokumen sebagai PDF/DOCX"
+- "Batalkan" / "Ulangi" untuk undo dan redo
+- "Lihat riwayat" untuk melihat revisi terakhir
 - "Bantu saya" untuk melihat perintah ini lagi
         """
         return help_text
@@ -216,6 +576,7 @@ Berikut adalah perintah yang dapat Anda gunakan:
     
     return "Saya tidak yakin apa yang ingin Anda lakukan dengan dokumen Anda. Anda dapat membuat, mengedit, atau mengekspor dokumen."
 
+@tracing.traced("send_whatsapp_message")
 def send_whatsapp_message(recipient_id, message):
     """Kirim pesan teks melalui WhatsApp API"""
     url = config.WHATSAPP_API_URL
@@ -234,13 +595,19 @@ def send_whatsapp_message(recipient_id, message):
         }
     }
     
+    start = time.perf_counter()
     try:
         response = requests.post(url, headers=headers, data=json.dumps(data))
-        logger.info(f"WhatsApp API response: {response.status_code} - {response.text}")
+        WHATSAPP_REQUESTS.labels("send_message", response.status_code).inc()
+        logger.info("WhatsApp API response: %s - %s", response.status_code, Payload(response.text, 256),
+                    extra={"event": "whatsapp_response", "status": response.status_code})
         return response.json()
     except Exception as e:
+        WHATSAPP_REQUESTS.labels("send_message", "error").inc()
         logger.error(f"Error sending WhatsApp message: {str(e)}")
         return None
+    finally:
+        WHATSAPP_SECONDS.labels("send_message").observe(time.perf_counter() - start)
 
 # Endpoint untuk pengujian
 @app.route('/test', methods=['GET'])
@@ -248,6 +615,9 @@ def test_endpoint():
     return jsonify({"status": "ok", "message": "WhatsApp Document Assistant is running"})
 
 if __name__ == '__main__':
+    # Token dan pengaturan lain yang dibaca lewat config.* ikut diperbarui saat .env berubah
+    config.start_watcher()
+    install_signal_handlers()
     app.run(
         host=config.HOST,
         port=config.PORT,
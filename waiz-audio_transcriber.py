@@ -1,11 +1,16 @@
 # Modul untuk mentranskripsi file audio
 import os
 import logging
+import time
 import tempfile
 import config
+import metrics
 
 logger = logging.getLogger(__name__)
 
+TRANSCRIBE_SECONDS = metrics.histogram("waiz_transcription_seconds", "Durasi transkripsi audio")
+TRANSCRIBE_TOTAL = metrics.counter("waiz_transcriptions_total", "Jumlah transkripsi per hasil", ("status",))
+
 class AudioTranscriber:
     def __init__(self):
         """
@@ -65,13 +70,16 @@ class AudioTranscriber:
             str: Hasil transkripsi atau None jika gagal
         """
         if not self.is_supported_format(file_path):
+            TRANSCRIBE_TOTAL.labels("unsupported").inc()
             logger.warning(f"Format file tidak didukung: {file_path}")
             return None
         
         if not self.transcription_available:
+            TRANSCRIBE_TOTAL.labels("unavailable").inc()
             logger.warning("Layanan transkripsi tidak tersedia")
             return "Transkripsi audio tidak tersedia. Silakan kirim pesan teks."
         
+        start = time.perf_counter()
         try:
             # Placeholder untuk implementasi transkripsi sebenarnya
             # Di bawah ini adalah contoh implementasi menggunakan WhisperAI
@@ -95,9 +103,13 @@ class AudioTranscriber:
             
             # Karena ini hanya contoh, kita kembalikan pesan placeholder
             logger.info(f"Transcribing file: {file_path}")
+            TRANSCRIBE_SECONDS.observe(time.perf_counter() - start)
+            TRANSCRIBE_TOTAL.labels("success").inc()
             return "Ini adalah hasil transkripsi dari pesan suara Anda. Dalam implementasi sebenarnya, teks ini akan berisi transkripsi asli dari audio."
             
         except Exception as e:
+            TRANSCRIBE_SECONDS.observe(time.perf_counter() - start)
+            TRANSCRIBE_TOTAL.labels("error").inc()
             logger.error(f"Error dalam transkripsi: {str(e)}")
             return None
     
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# Mode multi-proses: satu ingress ringan + N worker dengan afinitas pengirim
+#
+# Ingress hanya mem-parse webhook dan meneruskan setiap pesan ke worker
+# berdasarkan hash sender_id, sehingga konteks NLP dan dokumen seorang
+# pengguna selalu berada (dan tetap hangat) di worker yang sama. Setiap
+# worker adalah proses terpisah yang memuat modul app (NLP, storage,
+# dokumen) dan memproses antreannya secara berurutan.
+#
+# Contoh:
+#     python cluster.py --workers 4 --port 5000
+import os
+import sys
+import time
+import zlib
+import queue
+import signal
+import logging
+import argparse
+import threading
+import multiprocessing
+
+import config
+import metrics
+import log_setup
+from snapshot import install_signal_handlers
+
+logger = logging.getLogger(__name__)
+
+CLUSTER_ROUTED = metrics.counter("waiz_cluster_routed_total", "Pesan yang diteruskan ke worker", ("worker",))
+CLUSTER_REJECTED = metrics.counter("waiz_cluster_rejected_total", "Pesan ditolak karena antrean worker penuh",
+                                   ("worker",))
+CLUSTER_RESTARTS = metrics.counter("waiz_cluster_worker_restarts_total", "Worker yang dijalankan ulang", ("worker",))
+CLUSTER_QUEUE = metrics.gauge("waiz_cluster_queue_depth", "Jumlah pesan menunggu per worker", ("worker",))
+CLUSTER_ALIVE = metrics.gauge("waiz_cluster_workers_alive", "Jumlah worker yang hidup")
+
+
+def worker_for(sender_id, workers):
+    """
+    Returns:
+        int: Indeks worker untuk pengirim (stabil antar restart)
+    """
+    return zlib.crc32(str(sender_id or "").encode("utf-8")) % workers
+
+
+def split_messages(data):
+    """
+    Pecah payload webhook menjadi satu value per pesan
+
+    Yields:
+        tuple: (sender_id, value) dengan value berisi tepat satu pesan
+    """
+    if not isinstance(data, dict) or data.get('object') != 'whatsapp_business_account':
+        return
+    for entry in data.get('entry', []):
+        for change in entry.get('changes', []):
+            if change.get('field') != 'messages':
+                continue
+            value = change.get('value', {})
+            for message in value.get('messages', []):
+                single = dict(value)
+                single['messages'] = [message]
+                yield message.get('from'), single
+
+
+def _worker_main(worker_id, inbox, overrides):
+    """Entry point proses worker"""
+    os.environ.update(overrides)
+    # Ctrl+C dan SIGTERM ditangani ingress, yang mengirim sentinel setelah
+    # pesan terakhir sehingga worker sempat menguras antrean dan snapshot
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    import app as worker_app  # membangun NLPEngine, StorageManager, DocumentProcessor
+
+    worker_logger = logging.getLogger(f"cluster.worker{worker_id}")
+    worker_logger.info(f"Worker {worker_id} siap (pid {os.getpid()})")
+    try:
+        while True:
+            value = inbox.get()
+            if value is None:
+                break
+            # Mailbox pengirim penuh: tahan antrean worker sampai ada ruang
+            while not worker_app.dispatch_message(value):
+                time.sleep(0.05)
+    finally:
+        worker_app.shutdown.run()
+        worker_logger.info(f"Worker {worker_id} berhenti")
+
+
+class WorkerSupervisor:
+    def __init__(self, workers, queue_size=1000, check_interval=1.0, max_backoff=30.0):
+        """
+        Jalankan dan awasi proses worker
+
+        Args:
+            workers (int): Jumlah worker
+            queue_size (int): Kapasitas antrean per worker
+            check_interval (float): Jeda pemeriksaan worker (detik)
+            max_backoff (float): Jeda maksimum sebelum restart berulang (detik)
+        """
+        self.workers = workers
+        self.check_interval = check_interval
+        self.max_backoff = max_backoff
+        self.queue_size = queue_size
+        self._ctx = multiprocessing.get_context("spawn")
+        self.queues = [self._ctx.Queue(queue_size) for _ in range(workers)]
+        self.processes = [None] * workers
+        self._failures = [0] * workers
+        self._next_start = [0.0] * workers
+        self._started = [0.0] * workers
+        self._stopping = threading.Event()
+        self._thread = None
+
+        for worker_id in range(workers):
+            CLUSTER_QUEUE.labels(worker_id).set_function(lambda worker_id=worker_id: self.queues[worker_id].qsize())
+        CLUSTER_ALIVE.set_function(lambda: sum(1 for p in self.processes if p is not None and p.is_alive()))
+
+    def _overrides(self, worker_id):
+        # Setiap worker menjalankan penjadwal kadaluarsa untuk pengguna miliknya
+        # dan memakai WAL sesi sendiri (lihat app.py); rekaman trafik ditangani
+        # ingress. Snapshot per worker: pengguna yang sama kembali ke worker
+        # yang sama selama jumlah worker tidak berubah
+        return {
+            "WAIZ_WEBHOOK_RECORD_PATH": "",
+            "WAIZ_SNAPSHOT_DIR": os.path.join(config.SNAPSHOT_DIR, f"worker{worker_id}-of-{self.workers}"),
+            "WAIZ_CLUSTER_WORKERS": str(self.workers),
+            "WAIZ_CLUSTER_WORKER_ID": str(worker_id),
+        }
+
+    def _start(self, worker_id):
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self.queues[worker_id], self._overrides(worker_id)),
+            name=f"waiz-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        self.processes[worker_id] = process
+        self._started[worker_id] = time.monotonic()
+        logger.info(f"Worker {worker_id} dijalankan (pid {process.pid})")
+
+    def _replace_queue(self, worker_id):
+        # Worker yang mati saat membaca antrean bisa meninggalkan lock baca
+        # antrean dalam keadaan terkunci; worker baru selalu memakai antrean
+        # baru. Pesan yang tertinggal di antrean lama hilang (WhatsApp tidak
+        # mengirim ulang karena webhook sudah dibalas 200).
+        old_queue = self.queues[worker_id]
+        self.queues[worker_id] = self._ctx.Queue(self.queue_size)
+        try:
+            lost = old_queue.qsize()
+        except NotImplementedError:
+            lost = 0
+        if lost:
+            logger.warning(f"{lost} pesan di antrean worker {worker_id} hilang")
+        old_queue.close()
+        old_queue.cancel_join_thread()
+
+    def start(self):
+        for worker_id in range(self.workers):
+            self._start(worker_id)
+        self._thread = threading.Thread(target=self._supervise, name="waiz-cluster-supervisor", daemon=True)
+        self._thread.start()
+
+    def _supervise(self):
+        while not self._stopping.wait(self.check_interval):
+            for worker_id, process in enumerate(self.processes):
+                if process is None or process.is_alive() or self._stopping.is_set():
+                    continue
+                now = time.monotonic()
+                if self._next_start[worker_id] == 0.0:
+                    # Crash berulang dalam waktu singkat -> backoff eksponensial
+                    self._failures[worker_id] += 1
+                    backoff = min(self.max_backoff, 0.5 * 2 ** (self._failures[worker_id] - 1))
+                    self._next_start[worker_id] = now + backoff
+                    logger.error(f"Worker {worker_id} mati (exit code {process.exitcode}); "
+                                 f"restart dalam {backoff:.1f} detik")
+                if now >= self._next_start[worker_id]:
+                    self._next_start[worker_id] = 0.0
+                    CLUSTER_RESTARTS.labels(worker_id).inc()
+                    self._replace_queue(worker_id)
+                    self._start(worker_id)
+            # Worker yang stabil selama satu menit dianggap pulih
+            for worker_id, process in enumerate(self.processes):
+                if self._failures[worker_id] and process is not None and process.is_alive() \
+                        and time.monotonic() - self._started[worker_id] > 60:
+                    self._failures[worker_id] = 0
+
+    def submit(self, sender_id, value):
+        """
+        Teruskan satu pesan ke worker pemilik pengirim
+
+        Returns:
+            bool: False jika antrean worker penuh
+        """
+        worker_id = worker_for(sender_id, self.workers)
+        try:
+            self.queues[worker_id].put_nowait(value)
+        except queue.Full:
+            CLUSTER_REJECTED.labels(worker_id).inc()
+            return False
+        CLUSTER_ROUTED.labels(worker_id).inc()
+        return True
+
+    def stop(self, timeout=30.0):
+        """Kirim sentinel, tunggu antrean habis, lalu hentikan paksa yang tersisa"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+        for q in self.queues:
+            try:
+                q.put(None, timeout=1)
+            except queue.Full:
+                pass
+        deadline = time.monotonic() + timeout
+        for worker_id, process in enumerate(self.processes):
+            if process is None:
+                continue
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"Worker {worker_id} tidak berhenti dalam batas waktu; dihentikan paksa")
+                process.terminate()
+                process.join(5)
+
+
+def create_ingress(supervisor):
+    """
+    Buat aplikasi Flask ingress
+
+    Returns:
+        Flask: Aplikasi dengan /webhook, /test, /metrics
+    """
+    from flask import Flask, request, jsonify
+    from nlp_engine import NLPEngine
+    from traffic_recorder import TrafficRecorder
+
+    ingress = Flask(__name__)
+    metrics.register_flask(ingress)
+
+    recorder = None
+    if config.WEBHOOK_RECORD_PATH:
+        recorder = TrafficRecorder(config.WEBHOOK_RECORD_PATH, salt=config.WEBHOOK_RECORD_SALT,
+                                   keep_words=NLPEngine().keywords(),
+                                   sample_rate=config.WEBHOOK_RECORD_SAMPLE_RATE)
+        ingress.config["TRAFFIC_RECORDER"] = recorder
+
+    @ingress.route('/webhook', methods=['GET'])
+    def verify_webhook():
+        mode = request.args.get('hub.mode')
+        token = request.args.get('hub.verify_token')
+        if mode == 'subscribe' and token and token == config.WEBHOOK_VERIFY_TOKEN:
+            return request.args.get('hub.challenge', '')
+        return jsonify({"status": "error", "message": "Verification failed"}), 403
+
+    @ingress.route('/webhook', methods=['POST'])
+    def webhook():
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or data.get('object') != 'whatsapp_business_account':
+            return jsonify({"status": "error", "message": "Not a WhatsApp message"}), 400
+        if recorder is not None:
+            recorder.record(data)
+        rejected = 0
+        for sender_id, value in split_messages(data):
+            if not supervisor.submit(sender_id, value):
+                rejected += 1
+        if rejected:
+            # WhatsApp mengirim ulang webhook yang tidak dibalas 200
+            return jsonify({"status": "error", "message": "Worker sibuk"}), 503
+        return jsonify({"status": "success"}), 200
+
+    @ingress.route('/test', methods=['GET'])
+    def test_endpoint():
+        alive = sum(1 for p in supervisor.processes if p is not None and p.is_alive())
+        return jsonify({"status": "ok", "workers": supervisor.workers, "alive": alive})
+
+    return ingress
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Jalankan AI-WaiZ dengan beberapa proses worker")
+    parser.add_argument("--workers", type=int, default=config.CLUSTER_WORKERS,
+                        help="Jumlah worker (0 = jumlah CPU)")
+    parser.add_argument("--queue-size", type=int, default=config.CLUSTER_QUEUE_SIZE,
+                        help="Kapasitas antrean per worker")
+    parser.add_argument("--host", default=config.HOST)
+    parser.add_argument("--port", type=int, default=config.PORT)
+    args = parser.parse_args()
+
+    log_setup.setup_from_settings(config.get_settings())
+    workers = args.workers or os.cpu_count() or 1
+    supervisor = WorkerSupervisor(workers, args.queue_size)
+    supervisor.start()
+    ingress = create_ingress(supervisor)
+    logger.info(f"Ingress berjalan di {args.host}:{args.port} dengan {workers} worker")
+    install_signal_handlers()
+    try:
+        ingress.run(host=args.host, port=args.port, threaded=True)
+    finally:
+        logger.info("Menghentikan worker...")
+        supervisor.stop()
+        recorder = ingress.config.get("TRAFFIC_RECORDER")
+        if recorder is not None:
+            recorder.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
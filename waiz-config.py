@@ -0,0 +1,398 @@
+# Modul konfigurasi terpusat: config.json + .env + environment
+#
+# Settings dibangun sekali per proses dan tidak bisa diubah. Kode lama yang
+# memakai `config.NAMA_KUNCI` tetap bekerja lewat __getattr__ modul; kode baru
+# sebaiknya memakai get_settings() dan atribut huruf kecil.
+import os
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+try:
+    from dotenv import dotenv_values
+    DOTENV_AVAILABLE = True
+except ImportError:
+    dotenv_values = None
+    DOTENV_AVAILABLE = False
+
+CONFIG_FILE = os.environ.get("WAIZ_CONFIG", "config.json")
+ENV_FILE = os.environ.get("WAIZ_ENV_FILE", ".env")
+
+# (nama, tipe, default). Nilai dibaca dari config.json (kunci = nama), lalu
+# ditimpa .env (kunci = NAMA dalam huruf besar), lalu environment proses
+# (WAIZ_NAMA, atau NAMA tanpa awalan untuk ENVIRON_FIELDS).
+FIELDS = (
+    # Asisten suara (config.json)
+    ("openai_api_key", str, ""),
+    ("openai_base_url", str, ""),
+    ("language", str, "id"),
+    ("voice_id", int, 0),
+    ("hotword", str, "waiz"),
+    ("model", str, "gpt-3.5-turbo"),
+    ("max_tokens", int, 150),
+    ("temperature", float, 0.7),
+    ("speech_rate", int, 150),
+    ("listening_timeout", float, 5),
+    ("barge_in", bool, True),
+
+    # WhatsApp API
+    ("whatsapp_api_token", str, ""),
+    ("whatsapp_phone_number_id", str, ""),
+    ("whatsapp_api_version", str, "v17.0"),
+    ("whatsapp_api_base", str, "https://graph.facebook.com"),
+    ("webhook_verify_token", str, ""),
+
+    # Server
+    ("debug_mode", bool, False),
+    ("port", int, 5000),
+    ("host", str, "0.0.0.0"),
+
+    # Penyimpanan
+    ("temp_storage_path", str, "./temp_storage"),
+    ("upload_folder", str, "./uploads"),
+    ("processed_folder", str, "./processed"),
+    ("document_ttl", int, 3600),
+    ("session_ttl", int, 3600),
+    ("session_store_mode", str, "atomic"),
+    ("session_cache_size", int, 10000),
+    ("session_flush_interval", float, 1.0),
+    ("storage_shard_levels", int, 2),
+    ("export_pdf_workers", int, 2),
+    ("export_pdf_timeout", float, 120),
+    ("media_connect_timeout", float, 10),
+    ("media_read_timeout", float, 60),
+    ("revision_max_count", int, 50),
+    ("revision_max_age", int, 604800),
+    ("expiry_scheduler", bool, True),
+
+    # Eksekusi per pengguna: jumlah thread, kapasitas mailbox, dan umur actor menganggur
+    ("actor_workers", int, 8),
+    ("actor_mailbox_size", int, 50),
+    ("actor_idle_timeout", float, 300),
+
+    # Admission control webhook: pesan per detik dan burst per pengirim, batas
+    # global pesan yang sedang diproses, jeda balasan "mohon pelan-pelan", dan
+    # jumlah ID pesan yang diingat untuk membuang kiriman ulang
+    ("admission_rate", float, 1.0),
+    ("admission_burst", int, 10),
+    ("admission_max_inflight", int, 500),
+    ("admission_notice_interval", float, 60),
+    ("admission_dedup_size", int, 10000),
+
+    # Lane kerja: deadline lane interaktif (actor), serta pool, antrean, dan
+    # deadline lane media (download/transkripsi) dan ekspor
+    ("lane_interactive_deadline", float, 60),
+    ("lane_media_workers", int, 2),
+    ("lane_media_queue_size", int, 100),
+    ("lane_media_deadline", float, 300),
+    ("lane_export_workers", int, 2),
+    ("lane_export_queue_size", int, 50),
+    ("lane_export_deadline", float, 600),
+
+    # Shutdown dan restart hangat: direktori snapshot, umur maksimum snapshot
+    # yang masih dimuat, dan batas waktu menguras antrean saat shutdown
+    ("snapshot_dir", str, "./snapshots"),
+    ("snapshot_max_age", float, 3600),
+    ("shutdown_drain_timeout", float, 30),
+
+    # Mode multi-proses (waiz-cluster.py)
+    ("cluster_workers", int, 0),
+    ("cluster_queue_size", int, 1000),
+    ("cluster_worker_id", int, -1),  # diisi supervisor untuk proses worker (-1 = bukan worker)
+
+    # Observabilitas
+    ("log_level", str, "INFO"),
+    ("log_format", str, "text"),
+    ("log_queue", bool, True),
+    ("log_sample_rate", float, 1.0),
+    ("log_max_field_length", int, 512),
+    ("trace_sample_rate", float, 0.1),
+    ("trace_buffer_size", int, 200),
+    ("trace_slow_ms", float, 2000),
+    ("webhook_record_path", str, ""),
+    ("webhook_record_salt", str, ""),
+    ("webhook_record_sample_rate", float, 1.0),
+    ("debug_token", str, ""),
+    ("memory_sampler_interval", float, 0),
+    ("memory_sampler_top", int, 10),
+    ("profile_dir", str, "./profiles"),
+
+    # Redis dan NLP
+    ("redis_host", str, "localhost"),
+    ("redis_port", int, 6379),
+    ("redis_db", int, 0),
+    ("redis_password", str, ""),
+    ("nlp_engine", str, "rule_based"),
+)
+
+# Kunci yang tidak boleh ditampilkan ke klien
+SECRET_FIELDS = frozenset({"openai_api_key", "whatsapp_api_token", "webhook_verify_token", "redis_password",
+                           "webhook_record_salt", "debug_token"})
+
+# Kunci milik asisten suara (isi config.json)
+ASSISTANT_FIELDS = ("language", "voice_id", "hotword", "model", "max_tokens", "temperature",
+                    "speech_rate", "listening_timeout", "barge_in")
+
+# Environment proses hanya dibaca dengan awalan ini: nama umum seperti
+# LANGUAGE, HOST, atau PORT sering sudah diset oleh sistem untuk hal lain
+ENV_PREFIX = "WAIZ_"
+
+# Kunci yang juga dibaca dari environment tanpa awalan (rahasia dan akses API
+# yang biasa disuntikkan oleh platform deploy)
+ENVIRON_FIELDS = frozenset({"openai_api_key", "whatsapp_api_token", "whatsapp_phone_number_id",
+                            "webhook_verify_token", "redis_password", "webhook_record_salt", "debug_token"})
+
+_TRUE_VALUES = {"1", "true", "yes", "on", "ya"}
+
+
+def _coerce(value, kind):
+    if kind is bool and isinstance(value, str):
+        return value.strip().lower() in _TRUE_VALUES
+    return kind(value)
+
+
+class Settings:
+    __slots__ = tuple(name for name, _, _ in FIELDS) + ("whatsapp_api_url",)
+
+    def __init__(self, **values):
+        """
+        Konfigurasi yang sudah diketik dan tidak bisa diubah
+
+        Args:
+            **values: Nilai per kunci di FIELDS (yang tidak ada memakai default)
+        """
+        for name, kind, default in FIELDS:
+            object.__setattr__(self, name, _coerce(values.get(name, default), kind))
+        object.__setattr__(self, "whatsapp_api_url",
+                           f"{self.whatsapp_api_base.rstrip('/')}/{self.whatsapp_api_version}/"
+                           f"{self.whatsapp_phone_number_id}/messages")
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Settings tidak bisa diubah; gunakan replace() atau reload()")
+
+    def __delattr__(self, name):
+        raise AttributeError("Settings tidak bisa diubah")
+
+    def __eq__(self, other):
+        return isinstance(other, Settings) and self.as_dict() == other.as_dict()
+
+    def __repr__(self):
+        return f"Settings({self.as_dict(redact=True)})"
+
+    def replace(self, **changes):
+        """
+        Returns:
+            Settings: Salinan dengan nilai yang diganti
+        """
+        values = self.as_dict()
+        values.update(changes)
+        return Settings(**values)
+
+    def as_dict(self, keys=None, redact=False):
+        """
+        Args:
+            keys (iterable, optional): Hanya kunci ini
+            redact (bool): Sembunyikan kunci rahasia
+
+        Returns:
+            dict: Nilai konfigurasi
+        """
+        names = keys if keys is not None else [name for name, _, _ in FIELDS]
+        return {
+            name: ("***" if redact and name in SECRET_FIELDS and getattr(self, name) else getattr(self, name))
+            for name in names
+        }
+
+    def diff(self, other):
+        """
+        Returns:
+            set: Kunci yang nilainya berbeda dengan other
+        """
+        return {name for name, _, _ in FIELDS if getattr(self, name) != getattr(other, name)}
+
+
+def load_settings(config_file=None, env_file=None, environ=None):
+    """
+    Bangun Settings dari default, config.json, .env, lalu environment
+
+    Dari environment proses hanya WAIZ_<NAMA> yang dibaca, ditambah <NAMA>
+    tanpa awalan untuk kunci di ENVIRON_FIELDS. Nilai kosong diabaikan,
+    kecuali WAIZ_<NAMA> untuk kunci bertipe teks.
+
+    Args:
+        config_file (str, optional): Path config.json
+        env_file (str, optional): Path .env
+        environ (dict, optional): Environment (default os.environ)
+
+    Returns:
+        Settings: Konfigurasi baru
+
+    Raises:
+        ValueError: Jika config.json tidak valid atau ada nilai dengan tipe salah
+    """
+    config_file = config_file or CONFIG_FILE
+    env_file = env_file or ENV_FILE
+    environ = os.environ if environ is None else environ
+
+    values = {}
+    if os.path.exists(config_file):
+        with open(config_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError(f"{config_file} harus berisi objek JSON")
+        values.update(data)
+
+    env = {}
+    if DOTENV_AVAILABLE and os.path.exists(env_file):
+        env.update({k: v for k, v in dotenv_values(env_file).items() if v is not None})
+
+    for name, kind, _ in FIELDS:
+        key = name.upper()
+        candidates = [env.get(key)]
+        if name in ENVIRON_FIELDS:
+            candidates.append(environ.get(key))
+        for value in candidates:
+            if value:
+                values[name] = value
+        # WAIZ_<NAMA> kosong untuk kunci teks berarti sengaja dikosongkan
+        # (mis. WAIZ_WEBHOOK_RECORD_PATH= mematikan rekaman trafik)
+        value = environ.get(ENV_PREFIX + key)
+        if value is not None and (value != "" or kind is str):
+            values[name] = value
+
+    known = {name for name, _, _ in FIELDS}
+    return Settings(**{k: v for k, v in values.items() if k in known})
+
+
+_settings = None
+_lock = threading.Lock()
+_subscribers = []
+_watcher = None
+_watcher_stop = threading.Event()
+
+
+def get_settings():
+    """
+    Returns:
+        Settings: Konfigurasi aktif (dibangun saat pertama dipanggil)
+    """
+    settings = _settings
+    if settings is None:
+        with _lock:
+            if _settings is None:
+                _set(load_settings())
+            settings = _settings
+    return settings
+
+
+def _set(settings):
+    global _settings
+    _settings = settings
+
+
+def subscribe(callback):
+    """
+    Daftarkan callback perubahan konfigurasi
+
+    Args:
+        callback (callable): callback(old, new, changed) dengan changed berupa
+            set nama kunci yang berubah
+    """
+    with _lock:
+        _subscribers.append(callback)
+
+
+def unsubscribe(callback):
+    with _lock:
+        if callback in _subscribers:
+            _subscribers.remove(callback)
+
+
+def reload():
+    """
+    Muat ulang konfigurasi dan beri tahu subscriber jika ada perubahan
+
+    Konfigurasi yang tidak valid diabaikan; konfigurasi lama tetap dipakai.
+
+    Returns:
+        set: Kunci yang berubah
+    """
+    try:
+        new = load_settings()
+    except (OSError, ValueError, TypeError) as e:
+        logger.error(f"Konfigurasi baru tidak valid, tetap memakai yang lama: {str(e)}")
+        return set()
+
+    with _lock:
+        old = _settings
+        if old is not None and old == new:
+            return set()
+        _set(new)
+        subscribers = list(_subscribers)
+
+    changed = new.diff(old) if old is not None else {name for name, _, _ in FIELDS}
+    if old is not None:
+        logger.info(f"Konfigurasi dimuat ulang, berubah: {', '.join(sorted(changed))}")
+        for callback in subscribers:
+            try:
+                callback(old, new, changed)
+            except Exception as e:
+                logger.error(f"Error pada subscriber konfigurasi: {str(e)}")
+    return changed
+
+
+def _mtimes():
+    stamps = []
+    for path in (CONFIG_FILE, ENV_FILE):
+        try:
+            stat = os.stat(path)
+            stamps.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            stamps.append(None)
+    return stamps
+
+
+def start_watcher(interval=2.0):
+    """
+    Pantau config.json dan .env, muat ulang saat berubah (tanpa restart)
+
+    Args:
+        interval (float): Jeda pemeriksaan (detik)
+    """
+    global _watcher
+    if _watcher is not None:
+        return
+    get_settings()
+    _watcher_stop.clear()
+
+    def watch():
+        last = _mtimes()
+        while not _watcher_stop.wait(interval):
+            current = _mtimes()
+            if current != last:
+                last = current
+                reload()
+
+    _watcher = threading.Thread(target=watch, name="waiz-config-watch", daemon=True)
+    _watcher.start()
+    logger.info(f"Memantau perubahan {CONFIG_FILE} dan {ENV_FILE}")
+
+
+def stop_watcher():
+    global _watcher
+    _watcher_stop.set()
+    if _watcher is not None:
+        _watcher.join()
+        _watcher = None
+
+
+def __getattr__(name):
+    # Kompatibilitas: config.UPLOAD_FOLDER -> get_settings().upload_folder
+    if name.isupper():
+        try:
+            return getattr(get_settings(), name.lower())
+        except AttributeError:
+            pass
+    raise AttributeError(f"module 'config' has no attribute '{name}'")
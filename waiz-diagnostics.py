@@ -0,0 +1,306 @@
+# Modul diagnostik memori: estimasi per subsistem dan profil tracemalloc
+#
+# Tidak ada biaya saat tidak dipakai: estimasi hanya dihitung saat
+# /debug/memory diminta, dan tracemalloc (yang memperlambat alokasi) hanya
+# aktif setelah dinyalakan lewat endpoint atau sampler periodik.
+import os
+import sys
+import hmac
+import time
+import logging
+import threading
+import tracemalloc
+from itertools import islice
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+_SOURCES = {}
+_baseline = None
+_baseline_lock = threading.Lock()
+
+
+def approx_size(obj, sample=50, depth=4, _seen=None):
+    """
+    Perkiraan ukuran objek beserta isinya (byte)
+
+    Container besar diukur dari sampel sejumlah `sample` elemen lalu
+    diekstrapolasi, sehingga biaya tetap kecil untuk jutaan entri.
+
+    Args:
+        obj: Objek yang diukur
+        sample (int): Jumlah elemen sampel per container
+        depth (int): Kedalaman rekursi maksimum
+
+    Returns:
+        int: Perkiraan ukuran dalam byte
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if depth <= 0 or isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+        return size
+
+    if isinstance(obj, dict):
+        items = obj.items()
+        count = len(obj)
+        measure = lambda item: (approx_size(item[0], sample, depth - 1, _seen)  # noqa: E731
+                                + approx_size(item[1], sample, depth - 1, _seen))
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        items = obj
+        count = len(obj)
+        measure = lambda item: approx_size(item, sample, depth - 1, _seen)  # noqa: E731
+    else:
+        attributes = getattr(obj, "__dict__", None)
+        if attributes is not None:
+            return size + approx_size(attributes, sample, depth - 1, _seen)
+        slots = getattr(type(obj), "__slots__", ())
+        return size + sum(approx_size(getattr(obj, name, None), sample, depth - 1, _seen)
+                          for name in slots if name != "__weakref__")
+
+    if count:
+        sampled = list(islice(items, sample))
+        size += int(sum(measure(item) for item in sampled) * count / len(sampled))
+    return size
+
+
+def register_source(name, fn):
+    """
+    Daftarkan subsistem yang memakai memori
+
+    Args:
+        name (str): Nama subsistem
+        fn (callable): fn() -> dict, mis. {"entries": n, "bytes": perkiraan}
+    """
+    _SOURCES[name] = fn
+
+
+def collection_source(collection, sample=50, depth=4):
+    """
+    Returns:
+        callable: Sumber untuk register_source() dari dict/list/deque
+    """
+    return lambda: {"entries": len(collection), "bytes": approx_size(collection, sample, depth)}
+
+
+def object_source(obj, entries=None, sample=50, depth=6):
+    """
+    Args:
+        obj: Objek (cache, store) yang diukur beserta atributnya
+        entries (callable, optional): entries() -> jumlah entri
+
+    Returns:
+        callable: Sumber untuk register_source()
+    """
+    return lambda: {"entries": entries() if entries is not None else None,
+                    "bytes": approx_size(obj, sample, depth)}
+
+
+def rss_bytes():
+    """
+    Returns:
+        int: Resident set size proses saat ini (atau puncak jika /proc tidak ada)
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def memory_report():
+    """
+    Returns:
+        dict: RSS proses, estimasi per subsistem, dan status tracemalloc
+    """
+    sources = {}
+    for name, fn in list(_SOURCES.items()):
+        start = time.perf_counter()
+        try:
+            sources[name] = fn()
+        except Exception as e:
+            sources[name] = {"error": str(e)}
+        sources[name]["measure_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    report = {"rss_bytes": rss_bytes(), "sources": sources, "tracemalloc": tracemalloc.is_tracing()}
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        report["traced_bytes"] = current
+        report["traced_peak_bytes"] = peak
+    return report
+
+
+def _format_stats(stats, limit):
+    return [
+        {
+            "site": str(stat.traceback[0]) if stat.traceback else "?",
+            "size_bytes": stat.size,
+            "count": stat.count,
+            "size_diff_bytes": getattr(stat, "size_diff", None),
+            "count_diff": getattr(stat, "count_diff", None),
+        }
+        for stat in stats[:limit]
+    ]
+
+
+def _snapshot():
+    # Alokasi tracemalloc sendiri dan modul importlib tidak menarik
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+
+
+def tracemalloc_start(frames=1):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+        logger.info(f"tracemalloc dinyalakan ({frames} frame)")
+
+
+def tracemalloc_stop():
+    global _baseline
+    with _baseline_lock:
+        _baseline = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+        logger.info("tracemalloc dimatikan")
+
+
+def tracemalloc_snapshot(limit=20, group_by="lineno"):
+    """
+    Ambil snapshot sebagai baseline untuk diff berikutnya
+
+    Returns:
+        list: Lokasi alokasi terbesar
+    """
+    global _baseline
+    snapshot = _snapshot()
+    with _baseline_lock:
+        _baseline = snapshot
+    return _format_stats(snapshot.statistics(group_by), limit)
+
+
+def tracemalloc_diff(limit=20, group_by="lineno"):
+    """
+    Bandingkan kondisi sekarang dengan baseline (baseline tidak berubah)
+
+    Returns:
+        list: Lokasi dengan pertumbuhan terbesar, atau None jika belum ada baseline
+    """
+    with _baseline_lock:
+        baseline = _baseline
+    if baseline is None:
+        return None
+    return _format_stats(_snapshot().compare_to(baseline, group_by), limit)
+
+
+class AllocationSampler:
+    def __init__(self, interval=300, top=10, frames=1):
+        """
+        Catat lokasi alokasi yang paling bertambah secara berkala ke log
+
+        Args:
+            interval (float): Jeda antar sampel (detik)
+            top (int): Jumlah lokasi per sampel
+            frames (int): Kedalaman traceback tracemalloc
+        """
+        self.interval = interval
+        self.top = top
+        self.frames = frames
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        tracemalloc_start(self.frames)
+        self._thread = threading.Thread(target=self._run, name="waiz-memory-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        previous = _snapshot()
+        while not self._stop.wait(self.interval):
+            if not tracemalloc.is_tracing():
+                return
+            current = _snapshot()
+            for stat in current.compare_to(previous, "lineno")[:self.top]:
+                logger.info("Alokasi %s: %+d byte (total %d byte, %d blok)",
+                            stat.traceback[0] if stat.traceback else "?", stat.size_diff, stat.size, stat.count,
+                            extra={"event": "memory_sample", "size_diff": stat.size_diff})
+            previous = current
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def debug_authorized(request, expected):
+    """
+    Returns:
+        bool: True jika request membawa token debug yang benar (X-Debug-Token
+            atau ?token=); selalu False jika token belum dikonfigurasi
+    """
+    provided = request.headers.get("X-Debug-Token") or request.args.get("token") or ""
+    return bool(expected) and hmac.compare_digest(provided.encode("utf-8"), expected.encode("utf-8"))
+
+
+def register_flask(app, token, path="/debug/memory"):
+    """
+    Tambahkan endpoint diagnostik memori ke aplikasi Flask
+
+    Endpoint hanya aktif jika token diisi dan harus dipanggil dengan header
+    X-Debug-Token (atau ?token=) yang cocok.
+
+    GET  {path}                      -> memory_report()
+    POST {path}/tracemalloc?action=  -> start | snapshot | diff | stop
+         (&limit=20&group_by=lineno|traceback|filename&frames=1)
+
+    Args:
+        token (callable): token() -> token debug yang berlaku saat ini
+    """
+    from flask import request, jsonify
+
+    def authorized():
+        return debug_authorized(request, token())
+
+    def memory_endpoint():
+        if not authorized():
+            return jsonify({"status": "error", "message": "Tidak diizinkan"}), 403
+        return jsonify(memory_report())
+
+    def tracemalloc_endpoint():
+        if not authorized():
+            return jsonify({"status": "error", "message": "Tidak diizinkan"}), 403
+        action = request.args.get("action", "diff")
+        group_by = request.args.get("group_by", "lineno")
+        try:
+            limit = int(request.args.get("limit", 20))
+            frames = int(request.args.get("frames", 1))
+        except ValueError:
+            return jsonify({"status": "error", "message": "Parameter tidak valid"}), 400
+        if group_by not in ("lineno", "traceback", "filename"):
+            return jsonify({"status": "error", "message": "Parameter tidak valid"}), 400
+
+        if action == "start":
+            tracemalloc_start(frames)
+            return jsonify({"status": "ok", "tracing": True})
+        if action == "stop":
+            tracemalloc_stop()
+            return jsonify({"status": "ok", "tracing": False})
+        if not tracemalloc.is_tracing():
+            return jsonify({"status": "error", "message": "tracemalloc belum dinyalakan (action=start)"}), 409
+        if action == "snapshot":
+            return jsonify({"status": "ok", "top": tracemalloc_snapshot(limit, group_by)})
+        if action == "diff":
+            stats = tracemalloc_diff(limit, group_by)
+            if stats is None:
+                return jsonify({"status": "error", "message": "Belum ada baseline (action=snapshot)"}), 409
+            return jsonify({"status": "ok", "diff": stats})
+        return jsonify({"status": "error", "message": "Action tidak dikenal"}), 400
+
+    app.add_url_rule(path, "debug_memory", memory_endpoint, methods=["GET"])
+    app.add_url_rule(f"{path}/tracemalloc", "debug_tracemalloc", tracemalloc_endpoint, methods=["POST"])
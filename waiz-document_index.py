@@ -0,0 +1,410 @@
+# Modul indeks teks (inverted index) per pengguna untuk pencarian dokumen
+import os
+import re
+import json
+import zlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict, defaultdict
+
+from session_store import write_atomic
+from sharding import ShardedLayout
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+
+# Partikel dan kata ganti milik yang dilekatkan di akhir kata bahasa Indonesia
+_PARTICLES = ("lah", "kah", "tah", "pun")
+_POSSESSIVES = ("nya", "ku", "mu")
+_MIN_STEM = 4
+
+# Kata yang diabaikan saat mencocokkan judul
+STOPWORDS = {
+    "dan", "di", "ke", "dari", "yang", "untuk", "dengan", "pada", "ini", "itu",
+    "tentang", "dokumen", "file", "berjudul", "judul", "the", "a", "of", "document",
+}
+
+
+def normalize_token(word):
+    """
+    Normalisasi satu kata (sudah huruf kecil): buang partikel (-lah, -kah,
+    -tah, -pun) lalu kata ganti milik (-nya, -ku, -mu) selama sisa kata
+    masih cukup panjang.
+    """
+    for suffixes in (_PARTICLES, _POSSESSIVES):
+        for suffix in suffixes:
+            if word.endswith(suffix) and len(word) - len(suffix) >= _MIN_STEM:
+                word = word[:-len(suffix)]
+                break
+    return word
+
+
+def _fold(text):
+    # Huruf kecil dan tanpa diakritik ("café" -> "cafe")
+    text = unicodedata.normalize('NFKD', text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    """
+    Pecah teks menjadi token ternormalisasi
+
+    Returns:
+        list: Token berurutan
+    """
+    return [normalize_token(word) for word in _WORD_RE.findall(_fold(text))]
+
+
+def complete_tokens(text):
+    """
+    Token yang pasti merupakan kata utuh di teks mana pun yang memuat text
+
+    Kata di tepi potongan teks bisa saja bagian dari kata yang lebih panjang
+    ("baik" di dalam "kebaikan"), jadi hanya kata yang diapit karakter
+    non-kata di dalam text yang dipakai.
+    """
+    folded = _fold(text)
+    tokens = []
+    for match in _WORD_RE.finditer(folded):
+        start, end = match.span()
+        if start > 0 and end < len(folded):
+            tokens.append(normalize_token(match.group()))
+    return tokens
+
+
+class UserIndex:
+    def __init__(self, user_id):
+        """
+        Indeks satu pengguna: token judul -> dokumen dan token paragraf ->
+        (doc_id, bagian, indeks paragraf)
+
+        Args:
+            user_id (str): ID pengguna
+        """
+        self.user_id = user_id
+        self.titles = {}  # doc_id -> judul
+        self.versions = {}  # doc_id -> versi dokumen yang sudah diindeks
+        self.title_postings = defaultdict(set)  # token -> {doc_id}
+        self.postings = defaultdict(set)  # token -> {(doc_id, bagian, indeks)}
+        self.paragraphs = {}  # (doc_id, bagian, indeks) -> tuple token
+        self.dirty = False
+        self.lock = threading.RLock()
+
+    def add_document(self, doc_id, title, version=0):
+        """Daftarkan dokumen dan token judulnya"""
+        with self.lock:
+            self.remove_document(doc_id)
+            self.titles[doc_id] = title
+            self.versions[doc_id] = version
+            for token in set(tokenize(title)):
+                self.title_postings[token].add(doc_id)
+            self.dirty = True
+
+    def remove_document(self, doc_id):
+        """Hapus dokumen beserta semua paragrafnya dari indeks"""
+        with self.lock:
+            title = self.titles.pop(doc_id, None)
+            if title is None:
+                return
+            self.versions.pop(doc_id, None)
+            for token in set(tokenize(title)):
+                self._discard(self.title_postings, token, doc_id)
+            for key in [k for k in self.paragraphs if k[0] == doc_id]:
+                self._unindex(key)
+            self.dirty = True
+
+    def index_paragraph(self, doc_id, section, index, text, version):
+        """Indeks (atau indeks ulang) satu paragraf"""
+        key = (doc_id, section, index)
+        tokens = tuple(tokenize(text))
+        with self.lock:
+            self._unindex(key)
+            self.paragraphs[key] = tokens
+            for token in set(tokens):
+                self.postings[token].add(key)
+            self.versions[doc_id] = version
+            self.dirty = True
+
+    def remove_paragraph(self, doc_id, section, index, version):
+        """Hapus satu paragraf dari indeks (mis. setelah undo penambahan)"""
+        with self.lock:
+            self._unindex((doc_id, section, index))
+            self.versions[doc_id] = version
+            self.dirty = True
+
+    def find_titles(self, query):
+        """
+        Cari dokumen berdasarkan judul
+
+        Returns:
+            list: doc_id berurutan dari kecocokan terbaik
+        """
+        tokens = [t for t in set(tokenize(query)) if t not in STOPWORDS]
+        if not tokens:
+            return []
+        with self.lock:
+            scores = defaultdict(int)
+            for token in tokens:
+                for doc_id in self.title_postings.get(token, ()):
+                    scores[doc_id] += 1
+        return sorted(scores, key=lambda doc_id: (-scores[doc_id], len(self.titles.get(doc_id, ""))))
+
+    def search_phrase(self, phrase, doc_id=None):
+        """
+        Cari paragraf yang memuat frasa (token berurutan)
+
+        Args:
+            phrase (str): Frasa yang dicari
+            doc_id (str, optional): Batasi ke satu dokumen
+
+        Returns:
+            list: Key (doc_id, bagian, indeks) yang cocok
+        """
+        tokens = tokenize(phrase)
+        if not tokens:
+            return []
+        with self.lock:
+            keys = self._intersect(tokens, lambda key: doc_id is None or key[0] == doc_id)
+            return sorted(key for key in keys if self._contains(self.paragraphs[key], tokens))
+
+    def candidates(self, doc_id, section, text):
+        """
+        Paragraf di sebuah bagian yang mungkin memuat text
+
+        Returns:
+            list: Indeks paragraf kandidat, atau None jika indeks tidak bisa
+                mempersempit pencarian (text tidak memuat kata utuh)
+        """
+        tokens = complete_tokens(text)
+        if not tokens:
+            return None
+        with self.lock:
+            keys = self._intersect(tokens, lambda key: key[0] == doc_id and key[1] == section)
+        return sorted(key[2] for key in keys)
+
+    def _intersect(self, tokens, accept):
+        # Mulai dari posting list terpendek
+        postings = sorted((self.postings.get(token, set()) for token in set(tokens)), key=len)
+        result = {key for key in postings[0] if accept(key)}
+        for keys in postings[1:]:
+            if not result:
+                break
+            result &= keys
+        return result
+
+    @staticmethod
+    def _contains(haystack, needle):
+        needle = tuple(needle)
+        n = len(needle)
+        first = needle[0]
+        for i in range(len(haystack) - n + 1):
+            if haystack[i] == first and haystack[i:i + n] == needle:
+                return True
+        return False
+
+    def _unindex(self, key):
+        tokens = self.paragraphs.pop(key, None)
+        if tokens:
+            for token in set(tokens):
+                self._discard(self.postings, token, key)
+
+    @staticmethod
+    def _discard(postings, token, value):
+        values = postings.get(token)
+        if values is not None:
+            values.discard(value)
+            if not values:
+                del postings[token]
+
+    def to_bytes(self):
+        """
+        Serialisasi ringkas: judul, versi, dan token paragraf (posting list
+        dibangun ulang saat dimuat)
+        """
+        with self.lock:
+            docs = {doc_id: {"t": title, "v": self.versions.get(doc_id, 0), "s": {}}
+                    for doc_id, title in self.titles.items()}
+            for (doc_id, section, index), tokens in self.paragraphs.items():
+                if doc_id in docs:
+                    docs[doc_id]["s"].setdefault(section, {})[str(index)] = " ".join(tokens)
+        payload = json.dumps({"u": self.user_id, "d": docs}, ensure_ascii=False, separators=(',', ':'))
+        return zlib.compress(payload.encode('utf-8'))
+
+    @classmethod
+    def from_bytes(cls, data):
+        payload = json.loads(zlib.decompress(data).decode('utf-8'))
+        index = cls(payload["u"])
+        for doc_id, doc in payload["d"].items():
+            index.titles[doc_id] = doc["t"]
+            index.versions[doc_id] = doc["v"]
+            for token in set(tokenize(doc["t"])):
+                index.title_postings[token].add(doc_id)
+            for section, paragraphs in doc["s"].items():
+                for position, joined in paragraphs.items():
+                    key = (doc_id, section, int(position))
+                    tokens = tuple(joined.split())
+                    index.paragraphs[key] = tokens
+                    for token in set(tokens):
+                        index.postings[token].add(key)
+        return index
+
+
+class DocumentIndex:
+    def __init__(self, storage_manager, load_document, document_version, max_users=1000):
+        """
+        Inisialisasi indeks dokumen per pengguna
+
+        Indeks diperbarui di memori pada setiap penambahan/edit dan disimpan
+        sebagai snapshot terkompresi di <storage>/indexes. Log delta dokumen
+        tetap menjadi sumber kebenaran: saat snapshot dimuat, dokumen yang
+        versinya tidak cocok diindeks ulang dari log.
+
+        Args:
+            storage_manager: Instance dari StorageManager
+            load_document (callable): load_document(doc_id) -> DocumentModel atau None
+            document_version (callable): document_version(doc_id) -> versi
+                dokumen saat ini tanpa memuat isinya (None jika tidak ada)
+            max_users (int): Jumlah maksimum indeks pengguna di memori (LRU)
+        """
+        self.storage_manager = storage_manager
+        self.load_document = load_document
+        self.document_version = document_version
+        self.max_users = max_users
+        self.layout = ShardedLayout(os.path.join(storage_manager.storage_path, "indexes"),
+                                    storage_manager.document_layout.levels)
+        self._indexes = OrderedDict()  # user_id -> UserIndex
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """
+        Dapatkan indeks pengguna (dimuat dari snapshot atau dibangun ulang)
+
+        Args:
+            user_id (str): ID pengguna
+
+        Returns:
+            UserIndex: Indeks pengguna
+        """
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                self._indexes.move_to_end(user_id)
+                return index
+
+        index = self._load(user_id)
+        with self._lock:
+            # Pemanggil lain mungkin sudah memuat lebih dulu
+            existing = self._indexes.get(user_id)
+            if existing is not None:
+                return existing
+            self._indexes[user_id] = index
+            evicted = []
+            while len(self._indexes) > self.max_users:
+                evicted.append(self._indexes.popitem(last=False)[1])
+        for old in evicted:
+            self._save(old)
+        return index
+
+    def peek(self, user_id):
+        """Indeks pengguna jika sudah ada di memori (tanpa memuat)"""
+        with self._lock:
+            return self._indexes.get(user_id)
+
+    def index_document(self, index, model):
+        """Indeks ulang seluruh isi satu dokumen"""
+        with model.lock:
+            index.add_document(model.doc_id, model.title, model.version)
+            for section in model.sections.values():
+                for position, text in enumerate(section.paragraphs):
+                    index.index_paragraph(model.doc_id, section.name, position, text, model.version)
+
+    def rebuild(self, user_id):
+        """
+        Bangun ulang indeks pengguna dari lapisan penyimpanan
+
+        Returns:
+            UserIndex: Indeks baru
+        """
+        index = UserIndex(user_id)
+        for doc_id in self._user_documents(user_id):
+            model = self.load_document(doc_id)
+            if model is not None and model.user_id == user_id:
+                self.index_document(index, model)
+        with self._lock:
+            self._indexes[user_id] = index
+        self._save(index)
+        logger.info(f"Indeks dokumen {user_id} dibangun ulang: {len(index.titles)} dokumen")
+        return index
+
+    def flush(self):
+        """
+        Simpan snapshot semua indeks yang berubah
+
+        Returns:
+            int: Jumlah indeks yang ditulis
+        """
+        with self._lock:
+            indexes = list(self._indexes.values())
+        return sum(1 for index in indexes if self._save(index))
+
+    def _load(self, user_id):
+        path = self.layout.resolve(user_id, ".idx")
+        try:
+            with open(path, 'rb') as f:
+                index = UserIndex.from_bytes(f.read())
+        except FileNotFoundError:
+            return self.rebuild(user_id)
+        except (ValueError, KeyError, zlib.error) as e:
+            logger.warning(f"Snapshot indeks {user_id} rusak, dibangun ulang: {str(e)}")
+            return self.rebuild(user_id)
+
+        # Sinkronkan dengan log delta: dokumen baru, berubah, atau sudah dihapus.
+        # Hanya dokumen yang versinya berbeda yang dimuat dan diindeks ulang.
+        stale = 0
+        owned = set(self._user_documents(user_id))
+        for doc_id in owned | set(index.titles):
+            version = self.document_version(doc_id) if doc_id in owned else None
+            if version is None:
+                if doc_id in index.titles:
+                    index.remove_document(doc_id)
+                    stale += 1
+            elif index.versions.get(doc_id) != version:
+                model = self.load_document(doc_id)
+                if model is not None:
+                    self.index_document(index, model)
+                    stale += 1
+        if stale:
+            logger.info(f"Indeks dokumen {user_id}: {stale} dokumen disinkronkan dari log")
+        return index
+
+    def _save(self, index):
+        if not index.dirty:
+            return False
+        try:
+            with index.lock:
+                data = index.to_bytes()
+                index.dirty = False
+            self.layout.ensure_dir(index.user_id)
+            write_atomic(self.layout.path(index.user_id, ".idx"), data, fsync=False)
+            return True
+        except OSError as e:
+            logger.error(f"Error menyimpan indeks {index.user_id}: {str(e)}")
+            index.dirty = True
+            return False
+
+    def _user_documents(self, user_id):
+        catalog = self.storage_manager.catalog
+        if catalog:
+            return [entry["doc_id"] for entry in catalog.documents_for_user(user_id)]
+        # Tanpa katalog: pindai metadata semua dokumen
+        doc_ids = []
+        for doc_id, doc_dir in self.storage_manager.document_layout.iter_entries(dirs=True):
+            try:
+                with open(os.path.join(doc_dir, "metadata.json"), 'r', encoding='utf-8') as f:
+                    if json.load(f).get("user_id") == user_id:
+                        doc_ids.append(doc_id)
+            except (FileNotFoundError, ValueError):
+                continue
+        return doc_ids
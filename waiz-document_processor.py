@@ -0,0 +1,633 @@
+# Modul untuk logika pembuatan, pengeditan, dan konversi dokumen
+import os
+import copy
+import uuid
+import logging
+import threading
+from datetime import datetime
+from collections import OrderedDict
+
+from document_index import DocumentIndex
+from export_cache import ExportCache
+from revision_store import RevisionStore, DeltaLog, DELTA_LOG_FILENAME, MARK_UNDO, MARK_REDO
+
+logger = logging.getLogger(__name__)
+
+# Dependensi opsional untuk materialisasi file (hanya dibutuhkan saat ekspor)
+try:
+    from docx import Document as DocxDocument
+    DOCX_AVAILABLE = True
+except ImportError:
+    DocxDocument = None
+    DOCX_AVAILABLE = False
+
+try:
+    from docx2pdf import convert as docx2pdf_convert
+    PDF_AVAILABLE = True
+except ImportError:
+    docx2pdf_convert = None
+    PDF_AVAILABLE = False
+
+DEFAULT_SECTION = "body"
+
+
+class Section:
+    __slots__ = ("name", "paragraphs", "version")
+
+    def __init__(self, name, paragraphs=None):
+        self.name = name
+        self.paragraphs = paragraphs if paragraphs is not None else []
+        self.version = 0  # versi dokumen saat bagian ini terakhir berubah
+
+
+class DocumentModel:
+    def __init__(self, doc_id, title, doc_type="docx", user_id=None, created_at=None):
+        """
+        Model dokumen di memori: bagian (section) berurutan, tiap bagian
+        berisi daftar paragraf. Setiap operasi hanya menyentuh satu bagian
+        dan satu paragraf sehingga biayanya tidak bergantung pada panjang
+        dokumen.
+
+        Args:
+            doc_id (str): ID dokumen
+            title (str): Judul dokumen
+            doc_type (str): Format tujuan default ('docx' atau 'pdf')
+            user_id (str, optional): Pemilik dokumen
+            created_at (float, optional): Timestamp pembuatan
+        """
+        self.doc_id = doc_id
+        self.title = title
+        self.doc_type = doc_type
+        self.user_id = user_id
+        self.created_at = created_at or datetime.now().timestamp()
+        self.sections = OrderedDict()
+        self.version = 0  # bertambah setiap operasi yang mengubah isi
+        self.lock = threading.RLock()
+        self.export_lock = threading.Lock()  # serialisasi ekspor tanpa menahan edit
+        self.history = None  # RevisionHistory, diisi oleh RevisionStore
+
+    def section(self, name, create=False):
+        """Dapatkan bagian berdasarkan nama (opsional: buat jika belum ada)"""
+        section = self.sections.get(name)
+        if section is None and create:
+            section = self.sections[name] = Section(name)
+        return section
+
+    def append(self, section_name, text):
+        """
+        Tambahkan paragraf di akhir bagian
+
+        Returns:
+            int: Indeks paragraf baru
+        """
+        section = self.section(section_name, create=True)
+        section.paragraphs.append(text)
+        self.version += 1
+        section.version = self.version
+        return len(section.paragraphs) - 1
+
+    def find(self, section_name, old_text, candidates=None):
+        """
+        Cari teks di dalam satu bagian
+
+        Args:
+            section_name (str): Nama bagian
+            old_text (str): Teks yang dicari
+            candidates (list, optional): Indeks paragraf yang perlu diperiksa
+                (dari indeks teks); None berarti periksa semua paragraf
+
+        Returns:
+            tuple: (indeks paragraf, offset) atau None jika tidak ditemukan
+        """
+        section = self.section(section_name)
+        if section is None:
+            return None
+        if candidates is None:
+            candidates = range(len(section.paragraphs))
+        for index in candidates:
+            if index >= len(section.paragraphs):
+                continue
+            offset = section.paragraphs[index].find(old_text)
+            if offset >= 0:
+                return (index, offset)
+        return None
+
+    def remove(self, section_name, index=None, text=None):
+        """
+        Hapus satu paragraf (default: paragraf terakhir bagian)
+
+        Returns:
+            int: Indeks paragraf yang dihapus
+        """
+        section = self.sections[section_name]
+        if index is None:
+            index = len(section.paragraphs) - 1
+        if text is not None and section.paragraphs[index] != text:
+            raise ValueError("Paragraf yang dihapus tidak cocok")
+        del section.paragraphs[index]
+        self.version += 1
+        section.version = self.version
+        if not section.paragraphs:
+            del self.sections[section_name]
+        return index
+
+    def restore(self, version, sections):
+        """Pulihkan state dari checkpoint: list [nama, versi bagian, paragraf]"""
+        self.sections = OrderedDict()
+        for name, section_version, paragraphs in sections:
+            section = self.sections[name] = Section(name, list(paragraphs))
+            section.version = section_version
+        self.version = version
+
+    def replace(self, section_name, index, offset, old_text, new_text):
+        """Ganti old_text di posisi tertentu dengan new_text"""
+        section = self.sections[section_name]
+        paragraph = section.paragraphs[index]
+        if paragraph[offset:offset + len(old_text)] != old_text:
+            raise ValueError("Teks di posisi edit tidak cocok")
+        section.paragraphs[index] = paragraph[:offset] + new_text + paragraph[offset + len(old_text):]
+        self.version += 1
+        section.version = self.version
+
+    def apply(self, op):
+        """Terapkan satu record delta log ke model"""
+        kind = op.get("op")
+        if kind == "add":
+            self.append(op["s"], op["t"])
+        elif kind == "del":
+            self.remove(op["s"], op.get("p"), op["t"])
+        elif kind == "edit":
+            self.replace(op["s"], op["p"], op["o"], op["old"], op["new"])
+        else:
+            raise ValueError(f"Operasi dokumen tidak dikenal: {kind}")
+
+    def text(self):
+        """Isi dokumen sebagai teks biasa"""
+        parts = [self.title]
+        for section in self.sections.values():
+            parts.append(section.name.title())
+            parts.extend(section.paragraphs)
+        return "\n\n".join(parts)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Jumlah bagian, paragraf, kata, dan karakter
+        """
+        paragraphs = [p for section in self.sections.values() for p in section.paragraphs]
+        return {
+            "sections": len(self.sections),
+            "paragraphs": len(paragraphs),
+            "words": sum(len(p.split()) for p in paragraphs),
+            "characters": sum(len(p) for p in paragraphs),
+        }
+
+
+class DocumentProcessor:
+    def __init__(self, storage_manager, max_loaded=1000, export_cache=None, max_indexed_users=1000,
+                 revisions=None):
+        """
+        Inisialisasi Document Processor
+
+        Dokumen disimpan sebagai model di memori dan dipersistenkan sebagai
+        log delta ringkas; file DOCX/PDF hanya dibuat saat ekspor.
+
+        Args:
+            storage_manager: Instance dari StorageManager
+            max_loaded (int): Jumlah maksimum dokumen yang disimpan di memori (LRU)
+            export_cache (ExportCache, optional): Cache hasil ekspor
+            max_indexed_users (int): Jumlah maksimum indeks teks pengguna di memori
+            revisions (RevisionStore, optional): Penyimpanan riwayat revisi
+        """
+        self.storage_manager = storage_manager
+        self.max_loaded = max_loaded
+        self.export_cache = export_cache if export_cache is not None else ExportCache()
+        self.revisions = revisions if revisions is not None else RevisionStore()
+        self.index = DocumentIndex(storage_manager, self.get_document, self.document_version,
+                                   max_users=max_indexed_users)
+        self.documents = OrderedDict()  # doc_id -> DocumentModel
+        self._lock = threading.Lock()
+        # Dokumen yang dihapus karena kadaluarsa juga dibuang dari memori
+        storage_manager.subscribe_document_deleted(self.forget)
+
+        if not DOCX_AVAILABLE:
+            logger.warning("python-docx tidak terinstall, ekspor DOCX/PDF tidak tersedia")
+
+        logger.info("Document Processor diinisialisasi")
+
+    def create_document(self, title, doc_type="docx", user_id=None):
+        """
+        Buat dokumen baru
+
+        Args:
+            title (str): Judul dokumen
+            doc_type (str): Format tujuan ('docx' atau 'pdf')
+            user_id (str, optional): Pemilik dokumen
+
+        Returns:
+            str: ID dokumen baru
+        """
+        doc_id = str(uuid.uuid4())
+        model = DocumentModel(doc_id, title, doc_type, user_id)
+        model.history = self.revisions.new_history()
+
+        metadata = {
+            "title": title,
+            "doc_type": doc_type,
+            "user_id": user_id,
+            "created_at": model.created_at,
+        }
+        doc_dir = self.storage_manager.register_document(doc_id, DELTA_LOG_FILENAME, metadata)
+        self.revisions.create(doc_dir, {
+            "op": "create", "title": title, "type": doc_type, "user": user_id, "ts": model.created_at
+        })
+
+        self._remember(model)
+        if user_id:
+            self.index.get(user_id).add_document(doc_id, title, model.version)
+        logger.info(f"Dokumen {doc_id} dibuat: {title}")
+        return doc_id
+
+    def get_document(self, doc_id):
+        """
+        Dapatkan model dokumen (dimuat dari log jika belum ada di memori)
+
+        Setiap akses (termasuk edit, undo/redo, dan ekspor) memperpanjang
+        masa hidup dokumen di penjadwal kadaluarsa.
+
+        Returns:
+            DocumentModel: Model dokumen atau None jika tidak ditemukan
+        """
+        self.storage_manager.touch_document(doc_id)
+        with self._lock:
+            model = self.documents.get(doc_id)
+            if model is not None:
+                self.documents.move_to_end(doc_id)
+                return model
+
+        model = self._load(doc_id)
+        if model is not None:
+            self._remember(model)
+        return model
+
+    def add_text(self, doc_id, section, content):
+        """
+        Tambahkan teks sebagai paragraf baru di akhir bagian
+
+        Args:
+            doc_id (str): ID dokumen
+            section (str): Nama bagian
+            content (str): Teks yang ditambahkan
+
+        Returns:
+            bool: True jika berhasil
+        """
+        model = self.get_document(doc_id)
+        if model is None or not content:
+            return False
+
+        section = section or DEFAULT_SECTION
+        # Indeks diambil sebelum model.lock: memuat indeks bisa mengunci dokumen lain
+        user_index = self.index.get(model.user_id) if model.user_id else None
+        with model.lock:
+            position = model.append(section, content)
+            self._commit(model, {"op": "add", "s": section, "p": position, "t": content})
+            if user_index is not None:
+                user_index.index_paragraph(doc_id, section, position, content, model.version)
+        return True
+
+    def edit_text(self, doc_id, section, old_text, new_text):
+        """
+        Ganti kemunculan pertama old_text di sebuah bagian
+
+        Args:
+            doc_id (str): ID dokumen
+            section (str): Nama bagian
+            old_text (str): Teks yang dicari
+            new_text (str): Teks pengganti
+
+        Returns:
+            bool: True jika teks ditemukan dan diganti
+        """
+        model = self.get_document(doc_id)
+        if model is None or not old_text:
+            return False
+
+        section = section or DEFAULT_SECTION
+        user_index = self.index.get(model.user_id) if model.user_id else None
+        with model.lock:
+            # Indeks teks mempersempit paragraf yang perlu diperiksa
+            candidates = user_index.candidates(doc_id, section, old_text) if user_index is not None else None
+            position = model.find(section, old_text, candidates)
+            if position is None:
+                return False
+            index, offset = position
+            model.replace(section, index, offset, old_text, new_text)
+            self._commit(model, {"op": "edit", "s": section, "p": index, "o": offset, "old": old_text, "new": new_text})
+            if user_index is not None:
+                user_index.index_paragraph(doc_id, section, index, model.sections[section].paragraphs[index],
+                                           model.version)
+        return True
+
+    def undo(self, doc_id):
+        """
+        Batalkan revisi terakhir dokumen
+
+        Args:
+            doc_id (str): ID dokumen
+
+        Returns:
+            dict: Delta yang diterapkan, atau None jika tidak ada yang bisa dibatalkan
+        """
+        return self._step(doc_id, self.revisions.undo, MARK_UNDO)
+
+    def redo(self, doc_id):
+        """
+        Ulangi revisi yang terakhir dibatalkan
+
+        Args:
+            doc_id (str): ID dokumen
+
+        Returns:
+            dict: Delta yang diterapkan, atau None jika tidak ada yang bisa diulang
+        """
+        return self._step(doc_id, self.revisions.redo, MARK_REDO)
+
+    def get_history(self, doc_id, limit=10):
+        """
+        Dapatkan revisi terakhir yang masih bisa dibatalkan
+
+        Args:
+            doc_id (str): ID dokumen
+            limit (int): Jumlah revisi maksimum
+
+        Returns:
+            list: Delta revisi, terbaru lebih dulu
+        """
+        model = self.get_document(doc_id)
+        if model is None:
+            return []
+        with model.lock:
+            return list(model.history.undo_stack)[-limit:][::-1]
+
+    def _step(self, doc_id, prepare, mark):
+        model = self.get_document(doc_id)
+        if model is None:
+            return None
+        user_index = self.index.get(model.user_id) if model.user_id else None
+        with model.lock:
+            op = prepare(model)
+            if op is None:
+                return None
+            model.apply(op)
+            self._commit(model, op, mark)
+            if user_index is not None:
+                section = op["s"]
+                if op["op"] == "del":
+                    position = op["p"] if op.get("p") is not None else len(
+                        model.sections[section].paragraphs if section in model.sections else [])
+                    user_index.remove_paragraph(doc_id, section, position, model.version)
+                else:
+                    position = op["p"] if op["op"] == "edit" else len(model.sections[section].paragraphs) - 1
+                    user_index.index_paragraph(doc_id, section, position, model.sections[section].paragraphs[position],
+                                               model.version)
+        logger.info(f"Dokumen {doc_id}: {'undo' if mark == MARK_UNDO else 'redo'} {op['op']} di bagian {op['s']}")
+        return op
+
+    def find_documents(self, user_id, title):
+        """
+        Cari dokumen milik pengguna berdasarkan judul
+
+        Args:
+            user_id (str): ID pengguna
+            title (str): Judul atau potongan judul
+
+        Returns:
+            list: Tuple (doc_id, judul), kecocokan terbaik lebih dulu
+        """
+        user_index = self.index.get(user_id)
+        return [(doc_id, user_index.titles.get(doc_id, "")) for doc_id in user_index.find_titles(title)]
+
+    def search(self, user_id, phrase, doc_id=None, limit=10):
+        """
+        Cari paragraf yang memuat frasa di dokumen milik pengguna
+
+        Args:
+            user_id (str): ID pengguna
+            phrase (str): Frasa yang dicari
+            doc_id (str, optional): Batasi ke satu dokumen
+            limit (int): Jumlah hasil maksimum
+
+        Returns:
+            list: Dict berisi doc_id, title, section, paragraph, dan text
+        """
+        user_index = self.index.get(user_id)
+        results = []
+        for key_doc_id, section, position in user_index.search_phrase(phrase, doc_id):
+            model = self.get_document(key_doc_id)
+            if model is None:
+                user_index.remove_document(key_doc_id)
+                continue
+            paragraphs = model.sections[section].paragraphs if section in model.sections else []
+            if position >= len(paragraphs):
+                continue
+            results.append({
+                "doc_id": key_doc_id,
+                "title": model.title,
+                "section": section,
+                "paragraph": position,
+                "text": paragraphs[position],
+            })
+            if len(results) >= limit:
+                break
+        return results
+
+    def document_version(self, doc_id):
+        """
+        Versi dokumen saat ini tanpa memuat isinya jika belum ada di memori
+
+        Returns:
+            int: Versi dokumen atau None jika tidak ditemukan
+        """
+        with self._lock:
+            model = self.documents.get(doc_id)
+        if model is not None:
+            return model.version
+        return DeltaLog(os.path.join(self.storage_manager.document_dir(doc_id), DELTA_LOG_FILENAME)).last_version()
+
+    def export_document(self, doc_id, format_type="docx"):
+        """
+        Materialisasi dokumen sebagai file DOCX atau PDF
+
+        Jika versi dokumen belum berubah sejak ekspor terakhir, file yang
+        sudah ada langsung dikembalikan.
+
+        Args:
+            doc_id (str): ID dokumen
+            format_type (str): 'docx' atau 'pdf'
+
+        Returns:
+            str: Path file hasil ekspor
+        """
+        model = self.get_document(doc_id)
+        if model is None:
+            raise ValueError(f"Dokumen {doc_id} tidak ditemukan")
+        if format_type not in ("docx", "pdf"):
+            raise ValueError(f"Format tidak didukung: {format_type}")
+
+        doc_dir = self.storage_manager.document_dir(doc_id)
+        with model.export_lock:
+            with model.lock:
+                version = model.version
+                output_path = self.export_cache.lookup(doc_dir, format_type, version)
+                if output_path is not None:
+                    logger.info(f"Dokumen {doc_id} versi {version} diambil dari cache ekspor")
+                    return output_path
+
+                docx_path = self.export_cache.lookup(doc_dir, "docx", version)
+                if docx_path is None:
+                    if not DOCX_AVAILABLE:
+                        raise RuntimeError("python-docx tidak terinstall")
+                    docx_path = os.path.join(doc_dir, self._export_filename(model, "docx"))
+                    self._render_docx(model, docx_path)
+                    self.export_cache.store(doc_dir, "docx", version, docx_path)
+                    self.storage_manager.register_document(doc_id, os.path.basename(docx_path))
+
+            # Konversi PDF di luar model.lock agar edit tetap bisa berjalan
+            output_path = docx_path
+            if format_type == "pdf":
+                if not PDF_AVAILABLE:
+                    raise RuntimeError("docx2pdf tidak terinstall")
+                output_path = os.path.join(doc_dir, self._export_filename(model, "pdf"))
+                self.export_cache.convert_pdf(docx_path, output_path)
+                self.export_cache.store(doc_dir, "pdf", version, output_path)
+                self.storage_manager.register_document(doc_id, os.path.basename(output_path))
+
+        logger.info(f"Dokumen {doc_id} versi {version} diekspor ke {output_path}")
+        return output_path
+
+    def snapshot_documents(self):
+        """
+        State dokumen yang sedang dimuat, urut dari yang paling lama dipakai
+
+        Returns:
+            list: Dict per dokumen (format sama dengan checkpoint + header)
+        """
+        with self._lock:
+            models = list(self.documents.values())
+        states = []
+        for model in models:
+            with model.lock:
+                state = {
+                    "id": model.doc_id,
+                    "title": model.title,
+                    "type": model.doc_type,
+                    "user": model.user_id,
+                    "ts": model.created_at,
+                    "v": model.version,
+                    "sections": [[s.name, s.version, s.paragraphs] for s in model.sections.values()],
+                }
+                if model.history is not None:
+                    state.update(model.history.to_dict())
+                    state["since_checkpoint"] = model.history.since_checkpoint
+            states.append(state)
+        return states
+
+    def warm_documents(self, states):
+        """
+        Muat dokumen dari snapshot tanpa replay log
+
+        Dokumen yang log-nya sudah berubah (atau hilang) sejak snapshot
+        dilewati dan akan dimuat dari log saat dibutuhkan.
+
+        Returns:
+            int: Jumlah dokumen yang dimuat
+        """
+        loaded = 0
+        for state in states:
+            doc_id = state["id"]
+            with self._lock:
+                if doc_id in self.documents:
+                    continue
+            log = DeltaLog(os.path.join(self.storage_manager.document_dir(doc_id), DELTA_LOG_FILENAME))
+            if log.last_version() != state["v"]:
+                continue
+            model = DocumentModel(doc_id, state["title"], state["type"], state["user"], state["ts"])
+            model.restore(state["v"], state["sections"])
+            model.history = self.revisions.new_history()
+            model.history.load_dict(state)
+            model.history.since_checkpoint = state.get("since_checkpoint", 0)
+            self._remember(model)
+            loaded += 1
+        return loaded
+
+    def forget(self, doc_id, doc_dir=None):
+        """
+        Buang dokumen yang sudah dihapus dari memori, indeks teks, dan cache ekspor
+
+        Args:
+            doc_id (str): ID dokumen
+            doc_dir (str, optional): Direktori dokumen sebelum dihapus
+        """
+        with self._lock:
+            model = self.documents.pop(doc_id, None)
+        if model is not None and model.user_id:
+            # Indeks yang belum dimuat akan disinkronkan dari log saat dimuat
+            user_index = self.index.peek(model.user_id)
+            if user_index is not None:
+                user_index.remove_document(doc_id)
+        self.export_cache.invalidate(doc_dir or self.storage_manager.document_dir(doc_id), doc_id)
+
+    def close(self):
+        """Simpan indeks teks dan hentikan konversi PDF yang masih berjalan"""
+        self.index.flush()
+        self.export_cache.close()
+
+    def _render_docx(self, model, path):
+        document = DocxDocument()
+        body = document.element.body
+        document.add_heading(model.title, 0)
+
+        for section in model.sections.values():
+            fragment = self.export_cache.get_fragment(model.doc_id, section.name, section.version)
+            if fragment is None:
+                # Bagian berubah sejak render terakhir: render ulang bagian ini saja
+                elements = []
+                if section.name != DEFAULT_SECTION:
+                    elements.append(document.add_heading(section.name.title(), 1)._p)
+                for paragraph in section.paragraphs:
+                    elements.append(document.add_paragraph(paragraph)._p)
+                self.export_cache.put_fragment(model.doc_id, section.name, section.version,
+                                               [copy.deepcopy(element) for element in elements])
+            else:
+                anchor = body.sectPr
+                for element in fragment:
+                    if anchor is not None:
+                        anchor.addprevious(copy.deepcopy(element))
+                    else:
+                        body.append(copy.deepcopy(element))
+
+        tmp_path = f"{path}.tmp"
+        document.save(tmp_path)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _export_filename(model, extension):
+        safe_title = "".join(c if c.isalnum() or c in " -_" else "_" for c in model.title).strip()
+        return f"{safe_title or 'dokumen'}.{extension}"
+
+    def _commit(self, model, op, mark=None):
+        self.revisions.commit(model, self.storage_manager.document_dir(model.doc_id), op, mark)
+
+    def _load(self, doc_id):
+        doc_dir = self.storage_manager.document_dir(doc_id)
+        return self.revisions.load(doc_dir, lambda header: DocumentModel(
+            doc_id, header.get("title", ""), header.get("type", "docx"), header.get("user"), header.get("ts")
+        ))
+
+    def _remember(self, model):
+        with self._lock:
+            self.documents[model.doc_id] = model
+            self.documents.move_to_end(model.doc_id)
+            while len(self.documents) > self.max_loaded:
+                self.documents.popitem(last=False)
@@ -0,0 +1,152 @@
+# Modul penjadwal kadaluarsa (min-heap) untuk sesi dan dokumen
+import time
+import heapq
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiryScheduler:
+    def __init__(self, on_expire, interval=1.0, batch_size=100):
+        """
+        Inisialisasi penjadwal kadaluarsa berbasis min-heap
+
+        Setiap key punya satu deadline terbaru di dict. Heap hanya berisi
+        satu entri per key: memperpanjang deadline (refresh saat akses) cukup
+        memperbarui dict, dan entri heap yang lama dijadwalkan ulang saat
+        jatuh tempo. Biaya cleanup sebanding dengan jumlah key yang jatuh
+        tempo, bukan jumlah total data tersimpan.
+
+        Args:
+            on_expire (callable): Dipanggil dengan list key yang kadaluarsa
+            interval (float): Jeda maksimum antar pemeriksaan (detik)
+            batch_size (int): Jumlah maksimum key per pemanggilan on_expire
+        """
+        self.on_expire = on_expire
+        self.interval = interval
+        self.batch_size = batch_size
+
+        self._heap = []        # (deadline, key)
+        self._deadlines = {}   # key -> deadline terbaru
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def schedule(self, key, ttl=None, deadline=None):
+        """
+        Daftarkan atau perbarui deadline sebuah key
+
+        Args:
+            key (hashable): Key entri, misalnya ('session', user_id)
+            ttl (float, optional): Time to live dari sekarang (detik)
+            deadline (float, optional): Deadline absolut (time.time())
+        """
+        if deadline is None:
+            deadline = time.time() + ttl
+
+        with self._cond:
+            current = self._deadlines.get(key)
+            self._deadlines[key] = deadline
+            if current is None or deadline < current:
+                # Entri heap lama (jika ada) akan diabaikan saat di-pop
+                heapq.heappush(self._heap, (deadline, key))
+                if self._heap[0][1] == key:
+                    self._cond.notify()
+
+    def touch(self, key, ttl):
+        """Perpanjang deadline key yang sudah terdaftar (refresh saat akses)"""
+        with self._cond:
+            if key not in self._deadlines:
+                return False
+        self.schedule(key, ttl=ttl)
+        return True
+
+    def cancel(self, key):
+        """Hapus key dari jadwal (entri heap dibersihkan secara lazy)"""
+        with self._cond:
+            self._deadlines.pop(key, None)
+
+    def is_scheduled(self, key):
+        """Cek apakah key masih terdaftar"""
+        with self._cond:
+            return key in self._deadlines
+
+    def pop_due(self, now=None, limit=None):
+        """
+        Ambil key yang sudah jatuh tempo
+
+        Args:
+            now (float, optional): Waktu acuan (default: time.time())
+            limit (int, optional): Jumlah maksimum key
+
+        Returns:
+            list: Key yang kadaluarsa (sudah dihapus dari jadwal)
+        """
+        now = now if now is not None else time.time()
+        due = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now:
+                if limit and len(due) >= limit:
+                    break
+                deadline, key = heapq.heappop(self._heap)
+                current = self._deadlines.get(key)
+                if current is None:
+                    # Sudah dibatalkan
+                    continue
+                if current > deadline:
+                    # Deadline diperpanjang sejak entri ini dibuat
+                    heapq.heappush(self._heap, (current, key))
+                    continue
+                if current < deadline:
+                    # Entri duplikat yang lebih lambat; entri yang benar sudah diproses
+                    continue
+                del self._deadlines[key]
+                due.append(key)
+        return due
+
+    def start(self):
+        """Mulai thread latar belakang"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="waiz-expiry", daemon=True)
+        self._thread.start()
+        logger.info(f"Expiry scheduler dimulai dengan {len(self)} entri")
+
+    def stop(self, timeout=5.0):
+        """Hentikan thread latar belakang"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+        logger.info("Expiry scheduler dihentikan")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+                wait = self.interval
+                if self._heap:
+                    wait = min(wait, max(0.0, self._heap[0][0] - time.time()))
+                if wait > 0:
+                    self._cond.wait(wait)
+                if self._stopped:
+                    return
+
+            # Proses per batch agar lock tidak ditahan terlalu lama
+            while True:
+                batch = self.pop_due(limit=self.batch_size)
+                if not batch:
+                    break
+                try:
+                    self.on_expire(batch)
+                except Exception as e:
+                    logger.error(f"Error saat memproses entri kadaluarsa: {str(e)}")
+                if len(batch) < self.batch_size:
+                    break
@@ -0,0 +1,170 @@
+# Modul cache hasil ekspor dokumen (DOCX/PDF)
+import os
+import json
+import time
+import logging
+import threading
+import multiprocessing
+from collections import OrderedDict
+
+from session_store import write_atomic
+
+logger = logging.getLogger(__name__)
+
+EXPORT_MANIFEST = "exports.json"
+
+
+def _convert_pdf(docx_path, pdf_path):
+    # Dijalankan di proses anak; import di sini agar proses induk tidak wajib punya docx2pdf
+    from docx2pdf import convert
+    convert(docx_path, pdf_path)
+
+
+class ExportCache:
+    def __init__(self, pdf_workers=2, pdf_timeout=120, max_fragments=5000, pdf_queue_timeout=None):
+        """
+        Inisialisasi cache ekspor
+
+        Hasil ekspor dicatat per dokumen di exports.json sebagai
+        {format: {"version": v, "file": nama}}. Ekspor ulang dokumen yang
+        versinya sama langsung mengembalikan file yang sudah ada. Fragmen
+        hasil render per bagian disimpan di memori (LRU) sehingga ekspor
+        setelah edit hanya me-render bagian yang berubah.
+
+        Setiap konversi PDF berjalan di proses tersendiri (paling banyak
+        pdf_workers sekaligus) agar konversi besar tidak menahan worker
+        webhook, dan konversi yang macet bisa dihentikan paksa tanpa
+        memakan slot selamanya.
+
+        Args:
+            pdf_workers (int): Jumlah maksimum proses konversi PDF
+            pdf_timeout (float): Batas waktu satu konversi PDF (detik), dihitung
+                sejak proses konversi dimulai
+            max_fragments (int): Jumlah maksimum fragmen bagian di memori
+            pdf_queue_timeout (float, optional): Batas waktu menunggu slot
+                konversi (detik, default sama dengan pdf_timeout)
+        """
+        self.pdf_workers = pdf_workers
+        self.pdf_timeout = pdf_timeout
+        self.pdf_queue_timeout = pdf_timeout if pdf_queue_timeout is None else pdf_queue_timeout
+        self.max_fragments = max_fragments
+
+        self._manifests = {}  # doc_dir -> manifest
+        self._fragments = OrderedDict()  # (doc_id, section, versi bagian) -> fragmen
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(1, pdf_workers))
+        self._processes = set()  # proses konversi yang sedang berjalan
+        self._closed = False
+
+    def lookup(self, doc_dir, format_type, version):
+        """
+        Cari hasil ekspor untuk versi dokumen tertentu
+
+        Returns:
+            str: Path file hasil ekspor atau None jika belum ada / kadaluarsa
+        """
+        entry = self._manifest(doc_dir).get(format_type)
+        if not entry or entry.get("version") != version:
+            return None
+        path = os.path.join(doc_dir, entry["file"])
+        return path if os.path.exists(path) else None
+
+    def store(self, doc_dir, format_type, version, path):
+        """Catat hasil ekspor untuk versi dokumen tertentu"""
+        with self._lock:
+            manifest = dict(self._manifest(doc_dir))
+            manifest[format_type] = {"version": version, "file": os.path.basename(path)}
+            write_atomic(os.path.join(doc_dir, EXPORT_MANIFEST),
+                         json.dumps(manifest, separators=(',', ':')).encode('utf-8'), fsync=False)
+            self._manifests[doc_dir] = manifest
+
+    def invalidate(self, doc_dir, doc_id=None):
+        """Lupakan manifest (dan fragmen) sebuah dokumen, mis. setelah dihapus"""
+        with self._lock:
+            self._manifests.pop(doc_dir, None)
+            if doc_id is not None:
+                for key in [k for k in self._fragments if k[0] == doc_id]:
+                    del self._fragments[key]
+
+    def get_fragment(self, doc_id, section, section_version):
+        """
+        Returns:
+            object: Fragmen hasil render bagian atau None
+        """
+        key = (doc_id, section, section_version)
+        with self._lock:
+            fragment = self._fragments.get(key)
+            if fragment is not None:
+                self._fragments.move_to_end(key)
+            return fragment
+
+    def put_fragment(self, doc_id, section, section_version, fragment):
+        """Simpan fragmen hasil render bagian"""
+        with self._lock:
+            self._fragments[(doc_id, section, section_version)] = fragment
+            while len(self._fragments) > self.max_fragments:
+                self._fragments.popitem(last=False)
+
+    def convert_pdf(self, docx_path, pdf_path):
+        """
+        Konversi DOCX ke PDF di proses terpisah
+
+        Returns:
+            str: Path file PDF
+
+        Menunggu slot dan menjalankan konversi punya batas waktu sendiri,
+        sehingga pekerjaan yang lama mengantre tetap mendapat pdf_timeout
+        penuh. Paling lama pdf_queue_timeout + pdf_timeout; deadline lane
+        ekspor sebaiknya lebih besar dari jumlah keduanya.
+
+        Raises:
+            TimeoutError: Jika menunggu slot melebihi pdf_queue_timeout atau
+                konversi melebihi pdf_timeout; proses yang macet dihentikan paksa
+            RuntimeError: Jika konversi gagal atau cache sudah ditutup
+        """
+        if not self._slots.acquire(timeout=self.pdf_queue_timeout):
+            raise TimeoutError(f"Konversi PDF menunggu slot lebih dari {self.pdf_queue_timeout} detik")
+        try:
+            process = multiprocessing.Process(target=_convert_pdf, args=(docx_path, pdf_path),
+                                              name="waiz-pdf", daemon=True)
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("Export cache sudah ditutup")
+                process.start()
+                self._processes.add(process)
+            deadline = time.monotonic() + self.pdf_timeout
+            try:
+                process.join(max(0.0, deadline - time.monotonic()))
+                if process.is_alive():
+                    process.kill()
+                    process.join()
+                    raise TimeoutError(f"Konversi PDF melebihi {self.pdf_timeout} detik")
+            finally:
+                with self._lock:
+                    self._processes.discard(process)
+            if process.exitcode != 0:
+                raise RuntimeError(f"Konversi PDF gagal (exit code {process.exitcode})")
+            return pdf_path
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Hentikan paksa konversi PDF yang masih berjalan"""
+        with self._lock:
+            self._closed = True
+            processes = list(self._processes)
+        for process in processes:
+            process.kill()
+        for process in processes:
+            process.join()
+
+    def _manifest(self, doc_dir):
+        manifest = self._manifests.get(doc_dir)
+        if manifest is None:
+            try:
+                with open(os.path.join(doc_dir, EXPORT_MANIFEST), 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+            except (FileNotFoundError, ValueError):
+                manifest = {}
+            self._manifests[doc_dir] = manifest
+        return manifest
@@ -0,0 +1,159 @@
+# Modul jalur kerja (lane): pool thread terpisah per jenis beban
+#
+# Perintah teks yang murah tidak boleh menunggu di belakang ekspor PDF atau
+# transkripsi pesan suara. Setiap lane punya jumlah worker, kapasitas
+# antrean, dan deadline sendiri: pekerjaan yang menunggu di antrean melewati
+# deadline tidak dijalankan (pengguna diberi tahu lewat on_expired), dan
+# pekerjaan yang selesai melewati deadline dihitung sebagai "late".
+import time
+import queue
+import logging
+import threading
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+LANE_JOBS = metrics.counter("waiz_lane_jobs_total", "Pekerjaan per lane dan status", ("lane", "status"))
+LANE_WAIT_SECONDS = metrics.histogram("waiz_lane_wait_seconds", "Waktu tunggu pekerjaan di antrean lane", ("lane",))
+LANE_RUN_SECONDS = metrics.histogram("waiz_lane_run_seconds", "Durasi pekerjaan per lane", ("lane",))
+LANE_QUEUE = metrics.gauge("waiz_lane_queue_depth", "Pekerjaan menunggu per lane", ("lane",))
+LANE_BUSY = metrics.gauge("waiz_lane_busy_workers", "Worker lane yang sedang bekerja", ("lane",))
+
+
+class Lane:
+    def __init__(self, name, workers=2, max_queue=100, deadline=300):
+        """
+        Pool thread dengan antrean terbatas dan deadline
+
+        Args:
+            name (str): Nama lane (label metrik dan nama thread)
+            workers (int): Jumlah thread
+            max_queue (int): Kapasitas antrean; submit() ditolak jika penuh
+            deadline (float): Batas waktu sejak submit hingga selesai (detik, 0 = tanpa batas)
+        """
+        self.name = name
+        self.deadline = deadline
+        self.busy = 0
+        self._busy_lock = threading.Lock()
+        self._queue = queue.Queue(max_queue)
+        self._stopping = False
+        self._threads = [
+            threading.Thread(target=self._work, name=f"waiz-lane-{name}-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+        LANE_QUEUE.labels(name).set_function(self._queue.qsize)
+        LANE_BUSY.labels(name).set_function(lambda: self.busy)
+
+    def submit(self, fn, *args, on_expired=None, **kwargs):
+        """
+        Jadwalkan fn(*args, **kwargs)
+
+        Args:
+            on_expired (callable, optional): Dipanggil dengan (*args, **kwargs)
+                jika pekerjaan kadaluarsa sebelum sempat dijalankan
+
+        Returns:
+            bool: False jika antrean penuh atau lane sudah dihentikan
+        """
+        if self._stopping:
+            LANE_JOBS.labels(self.name, "rejected").inc()
+            return False
+        try:
+            self._queue.put_nowait((time.monotonic(), fn, args, kwargs, on_expired))
+        except queue.Full:
+            LANE_JOBS.labels(self.name, "rejected").inc()
+            return False
+        return True
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            submitted, fn, args, kwargs, on_expired = item
+            started = time.monotonic()
+            LANE_WAIT_SECONDS.labels(self.name).observe(started - submitted)
+            if self.deadline and started - submitted > self.deadline:
+                LANE_JOBS.labels(self.name, "expired").inc()
+                logger.warning(f"Pekerjaan lane {self.name} kadaluarsa setelah menunggu "
+                               f"{started - submitted:.1f} detik")
+                if on_expired is not None:
+                    try:
+                        on_expired(*args, **kwargs)
+                    except Exception as e:
+                        logger.error(f"Error pada on_expired lane {self.name}: {str(e)}")
+                continue
+
+            with self._busy_lock:
+                self.busy += 1
+            status = "ok"
+            try:
+                fn(*args, **kwargs)
+            except Exception as e:
+                status = "error"
+                logger.error(f"Error pada lane {self.name}: {str(e)}")
+            finally:
+                with self._busy_lock:
+                    self.busy -= 1
+            finished = time.monotonic()
+            LANE_RUN_SECONDS.labels(self.name).observe(finished - started)
+            if status == "ok" and self.deadline and finished - submitted > self.deadline:
+                status = "late"
+            LANE_JOBS.labels(self.name, status).inc()
+
+    def stats(self):
+        return {
+            "workers": len(self._threads),
+            "busy": self.busy,
+            "queued": self._queue.qsize(),
+            "deadline": self.deadline,
+        }
+
+    def shutdown(self, wait=True, timeout=None):
+        """
+        Tolak pekerjaan baru, selesaikan antrean, lalu hentikan thread
+
+        Args:
+            wait (bool): Tunggu thread selesai
+            timeout (float, optional): Batas waktu menunggu (detik)
+        """
+        if self._stopping:
+            return
+        self._stopping = True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for _ in self._threads:
+            # Sentinel masuk setelah semua pekerjaan yang sudah diterima; antrean
+            # yang penuh hanya ditunggu sampai batas waktu (thread lane daemon)
+            try:
+                self._queue.put(None, timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                logger.warning(f"Lane {self.name} belum kosong saat batas waktu shutdown; "
+                               f"{self._queue.qsize()} pekerjaan ditinggalkan")
+                break
+        if wait:
+            for thread in self._threads:
+                thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+
+def register_flask(app, lanes, token, path="/debug/lanes"):
+    """
+    Tambahkan endpoint status lane ke aplikasi Flask
+
+    Dilindungi token debug yang sama dengan /debug/memory.
+
+    Args:
+        lanes (dict): Nama lane -> objek dengan method stats()
+        token (callable): token() -> token debug yang berlaku saat ini
+    """
+    from flask import request, jsonify
+    from diagnostics import debug_authorized
+
+    def lanes_endpoint():
+        if not debug_authorized(request, token()):
+            return jsonify({"status": "error", "message": "Tidak diizinkan"}), 403
+        return jsonify({name: lane.stats() for name, lane in lanes.items()})
+
+    app.add_url_rule(path, "debug_lanes", lanes_endpoint, methods=["GET"])
@@ -0,0 +1,243 @@
+# Modul logging terstruktur untuk jalur pesan
+#
+# - Pesan ditulis dengan format %-style (logger.info("x %s", y)) sehingga
+#   argumen baru diformat jika record benar-benar dikeluarkan.
+# - Payload besar dibungkus Payload(...) agar diserialisasi dan dipotong
+#   secara malas.
+# - Event bervolume tinggi diberi extra={"event": "..."} dan bisa disampel.
+# - QueueHandler memindahkan format dan I/O ke thread listener.
+import sys
+import json
+import atexit
+import random
+import logging
+import logging.handlers
+import queue
+
+import metrics
+import tracing
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Event bervolume tinggi (satu atau lebih per pesan) yang boleh disampel
+HIGH_VOLUME_EVENTS = ("webhook_received", "message_received", "intent_detected",
+                      "intent_handled", "whatsapp_response", "context_updated")
+
+LOG_SAMPLED_OUT = metrics.counter("waiz_log_sampled_out_total", "Record log yang dibuang oleh sampling", ("event",))
+LOG_DROPPED = metrics.counter("waiz_log_dropped_total", "Record log yang dibuang karena antrean penuh")
+
+# Atribut bawaan LogRecord; sisanya dianggap field terstruktur dari extra=
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+
+
+def truncate(text, limit):
+    """
+    Potong teks panjang
+
+    Args:
+        text (str): Teks
+        limit (int): Panjang maksimum (0 = tanpa batas)
+
+    Returns:
+        str: Teks yang sudah dipotong beserta penanda jumlah karakter
+    """
+    if limit and len(text) > limit:
+        return f"{text[:limit]}…(+{len(text) - limit} karakter)"
+    return text
+
+
+class Payload:
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value, limit=512):
+        """
+        Bungkus payload (dict/list/str) yang baru diserialisasi saat dicetak
+
+        Args:
+            value: Payload
+            limit (int): Panjang maksimum hasil serialisasi
+        """
+        self.value = value
+        self.limit = limit
+
+    def __str__(self):
+        value = self.value
+        if not isinstance(value, str):
+            try:
+                value = json.dumps(value, ensure_ascii=False, default=str, separators=(",", ":"))
+            except (TypeError, ValueError):
+                value = repr(value)
+        return truncate(value, self.limit)
+
+    __repr__ = __str__
+
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, rate=1.0, events=HIGH_VOLUME_EVENTS):
+        """
+        Filter yang menyampel record dengan extra={"event": ...} tertentu
+
+        Record WARNING ke atas tidak pernah disampel.
+
+        Args:
+            rate (float): Peluang record event bervolume tinggi dipertahankan
+            events (iterable): Nama event yang boleh disampel
+        """
+        super().__init__()
+        self.rate = rate
+        self.events = frozenset(events)
+
+    def filter(self, record):
+        if self.rate >= 1 or record.levelno >= logging.WARNING:
+            return True
+        event = getattr(record, "event", None)
+        if event is None or event not in self.events:
+            return True
+        if random.random() < self.rate:
+            return True
+        LOG_SAMPLED_OUT.labels(event).inc()
+        return False
+
+
+class TraceFilter(logging.Filter):
+    """Tambahkan trace_id aktif ke record (dipanggil di thread pemanggil)"""
+
+    def filter(self, record):
+        if not hasattr(record, "trace_id"):
+            trace_id = tracing.current_trace_id()
+            if trace_id is not None:
+                record.trace_id = trace_id
+        return True
+
+
+class StructuredFormatter(logging.Formatter):
+    def __init__(self, max_field_length=512):
+        """
+        Formatter JSON satu baris per record
+
+        Args:
+            max_field_length (int): Panjang maksimum pesan dan tiap field
+        """
+        super().__init__()
+        self.max_field_length = max_field_length
+
+    def format(self, record):
+        limit = self.max_field_length
+        data = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": truncate(record.getMessage(), limit),
+        }
+        for key, value in record.__dict__.items():
+            if key in _RECORD_ATTRS or key.startswith("_"):
+                continue
+            if not isinstance(value, (int, float, bool)) and value is not None:
+                value = truncate(str(value), limit)
+            data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler yang tidak memblokir thread request saat antrean penuh"""
+
+    def prepare(self, record):
+        # Pesan diformat di thread listener; args disimpan apa adanya
+        # (lazy), exc_info diubah menjadi teks agar aman dipindah thread.
+        # Argumen yang diubah setelah pemanggilan log ikut terlihat berubah,
+        # jadi kirim salinan untuk objek yang masih akan dimutasi.
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_DROPPED.inc()
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # Sentinel harus masuk walau antrean penuh, kalau tidak stop() macet
+        self.queue.put(self._sentinel)
+
+
+def setup_logging(level="INFO", fmt="text", use_queue=True, sample_rate=1.0,
+                  max_field_length=512, queue_size=10000, stream=None, callsite=False):
+    """
+    Konfigurasi root logger
+
+    Args:
+        level (str): Level log
+        fmt (str): 'text' (format lama) atau 'json' (terstruktur)
+        use_queue (bool): Pindahkan format dan I/O ke thread terpisah
+        sample_rate (float): Peluang event bervolume tinggi dicatat
+        max_field_length (int): Panjang maksimum pesan/field (format json)
+        queue_size (int): Kapasitas antrean; record dibuang jika penuh
+        stream: Tujuan output (default sys.stderr)
+        callsite (bool): Catat file/baris/fungsi pemanggil dan info proses.
+            Format bawaan tidak memakainya, padahal pencarian frame
+            pemanggil adalah bagian termahal pembuatan LogRecord.
+
+    Returns:
+        QueueListener: Listener aktif (None jika use_queue=False)
+    """
+    global _listener
+    stop_logging()
+
+    # Lihat bagian "Optimization" di Logging HOWTO
+    logging._srcfile = logging.__file__ if callsite else None
+    logging.logProcesses = callsite
+    logging.logMultiprocessing = callsite
+
+    handler = logging.StreamHandler(stream or sys.stderr)
+    if fmt == "json":
+        handler.setFormatter(StructuredFormatter(max_field_length))
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+    if use_queue:
+        front = _QueueHandler(queue.Queue(queue_size))
+        _listener = _QueueListener(front.queue, handler, respect_handler_level=True)
+        _listener.start()
+    else:
+        front = handler
+    front.addFilter(SamplingFilter(sample_rate))
+    front.addFilter(TraceFilter())
+    root.addHandler(front)
+    return _listener
+
+
+def setup_from_settings(settings):
+    """Konfigurasi logging dari Settings (config.get_settings())"""
+    return setup_logging(
+        level=settings.log_level,
+        fmt=settings.log_format,
+        use_queue=settings.log_queue,
+        sample_rate=settings.log_sample_rate,
+        max_field_length=settings.log_max_field_length
+    )
+
+
+def stop_logging():
+    """Hentikan listener dan tulis semua record yang masih di antrean"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -4,11 +4,41 @@ import logging
 import requests
 import json
 import uuid
+import time
 import config
+import metrics
+import tracing
+from log_setup import Payload
 from datetime import datetime
+from sharding import ShardedLayout
 
 logger = logging.getLogger(__name__)
 
+WHATSAPP_REQUESTS = metrics.counter("waiz_whatsapp_api_requests_total", "Jumlah panggilan WhatsApp API",
+                                    ("operation", "status"))
+WHATSAPP_SECONDS = metrics.histogram("waiz_whatsapp_api_seconds", "Durasi panggilan WhatsApp API", ("operation",))
+MEDIA_DOWNLOAD_BYTES = metrics.histogram("waiz_media_download_bytes", "Ukuran media yang didownload",
+                                         buckets=metrics.SIZE_BUCKETS)
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+MEDIA_DOWNLOAD_SECONDS = metrics.histogram("waiz_media_download_seconds", "Durasi download media (termasuk lookup URL)")
+
+
+def _api_request(operation, method, url, **kwargs):
+    """Panggil WhatsApp API sambil mencatat durasi dan status"""
+    start = time.perf_counter()
+    status = "error"
+    try:
+        with tracing.span(f"whatsapp_api.{operation}") as span:
+            response = requests.request(method, url, **kwargs)
+            status = response.status_code
+            if span is not None:
+                span.attributes["status"] = status
+        return response
+    finally:
+        WHATSAPP_SECONDS.labels(operation).observe(time.perf_counter() - start)
+        WHATSAPP_REQUESTS.labels(operation, status).inc()
+
+
 class MediaHandler:
     def __init__(self, storage_manager):
         """
@@ -25,8 +55,12 @@ class MediaHandler:
         os.makedirs(self.upload_folder, exist_ok=True)
         os.makedirs(self.processed_folder, exist_ok=True)
         
+        # Upload disimpan ber-shard berdasarkan media ID
+        self.upload_layout = ShardedLayout(self.upload_folder, config.STORAGE_SHARD_LEVELS)
+        
         logger.info("Media Handler diinisialisasi")
     
+    @tracing.traced("media.download")
     def download_media(self, media_id):
         """
         Download media dari WhatsApp API
@@ -37,17 +71,20 @@ class MediaHandler:
         Returns:
             str: Path ke file yang didownload atau None jika gagal
         """
+        start = time.perf_counter()
         try:
             # Pertama, dapatkan URL media
             url = f"{config.WHATSAPP_API_URL.split('/messages')[0]}/media/{media_id}"
             headers = {
                 "Authorization": f"Bearer {config.WHATSAPP_API_TOKEN}"
             }
+            # Tanpa timeout, server yang berhenti mengirim menahan worker lane media selamanya
+            timeout = (config.MEDIA_CONNECT_TIMEOUT, config.MEDIA_READ_TIMEOUT)
             
-            response = requests.get(url, headers=headers)
+            response = _api_request("media_url", "GET", url, headers=headers, timeout=timeout)
             
             if response.status_code != 200:
-                logger.error(f"Gagal mendapatkan URL media: {response.status_code} - {response.text}")
+                logger.error("Gagal mendapatkan URL media: %s - %s", response.status_code, Payload(response.text, 256))
                 return None
             
             media_url = response.json().get('url')
@@ -56,21 +93,40 @@ class MediaHandler:
                 logger.error("URL media tidak ditemukan dalam respons")
                 return None
             
-            # Download media dari URL
-            media_response = requests.get(media_url, headers=headers)
+            # Download media dari URL; isi ditulis per potongan ke file, bukan
+            # ditampung utuh di memori
+            media_response = _api_request("media_download", "GET", media_url, headers=headers, stream=True,
+                                          timeout=timeout)
             
-            if media_response.status_code != 200:
-                logger.error(f"Gagal mendownload media: {media_response.status_code}")
-                return None
-            
-            # Simpan file
-            file_extension = self._get_file_extension(media_response.headers.get('Content-Type', ''))
-            filename = f"{media_id}{file_extension}"
-            file_path = os.path.join(self.upload_folder, filename)
-            
-            with open(file_path, 'wb') as f:
-                f.write(media_response.content)
+            with media_response:
+                if media_response.status_code != 200:
+                    logger.error(f"Gagal mendownload media: {media_response.status_code}")
+                    return None
+                
+                # Simpan file
+                file_extension = self._get_file_extension(media_response.headers.get('Content-Type', ''))
+                self.upload_layout.ensure_dir(media_id)
+                file_path = self.upload_layout.path(media_id, file_extension)
+                
+                size = 0
+                tmp_path = f"{file_path}.part"
+                try:
+                    with open(tmp_path, 'wb') as f:
+                        for chunk in media_response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                            f.write(chunk)
+                            size += len(chunk)
+                    os.replace(tmp_path, file_path)
+                except BaseException:
+                    # Stream terputus di tengah jalan: jangan tinggalkan file parsial
+                    try:
+                        os.remove(tmp_path)
+                    except OSError:
+                        pass
+                    raise
             
+            MEDIA_DOWNLOAD_BYTES.observe(size)
+            tracing.annotate(bytes=size)
+            MEDIA_DOWNLOAD_SECONDS.observe(time.perf_counter() - start)
             logger.info(f"Media {media_id} berhasil didownload ke {file_path}")
             return file_path
             
@@ -145,6 +201,7 @@ class MediaHandler:
         else:
             return '.bin'
     
+    @tracing.traced("media.process_document")
     def process_document(self, file_path, user_id):
         """
         Proses dokumen yang diterima
@@ -187,6 +244,7 @@ class MediaHandler:
             logger.error(f"Error saat memproses dokumen: {str(e)}")
             return None
     
+    @tracing.traced("media.send_document")
     def send_document(self, file_path, recipient_id):
         """
         Kirim dokumen ke pengguna melalui WhatsApp API
@@ -231,10 +289,10 @@ class MediaHandler:
                 }
                 
                 # Upload file
-                response = requests.post(upload_url, headers=headers, data=data, files=files)
+                response = _api_request("media_upload", "POST", upload_url, headers=headers, data=data, files=files)
             
             if response.status_code != 200:
-                logger.error(f"Gagal mengupload file: {response.status_code} - {response.text}")
+                logger.error("Gagal mengupload file: %s - %s", response.status_code, Payload(response.text, 256))
                 return False
             
             # Dapatkan media ID
@@ -259,8 +317,8 @@ class MediaHandler:
             }
             
             # Kirim pesan dokumen
-            send_response = requests.post(
-                send_url, 
+            send_response = _api_request(
+                "send_document", "POST", send_url,
                 headers={
                     "Authorization": f"Bearer {config.WHATSAPP_API_TOKEN}",
                     "Content-Type": "application/json"
@@ -272,7 +330,7 @@ class MediaHandler:
                 logger.info(f"Dokumen {filename} berhasil dikirim ke {recipient_id}")
                 return True
             else:
-                logger.error(f"Gagal mengirim dokumen: {send_response.status_code} - {send_response.text}")
+                logger.error("Gagal mengirim dokumen: %s - %s", send_response.status_code, Payload(send_response.text, 256))
                 return False
                 
         except Exception as e:
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+"""
+Migrasi online dari layout direktori datar ke layout ber-shard
+
+Entri dipindahkan satu per satu dengan operasi atomik (rename / link+unlink)
+sementara aplikasi tetap berjalan: selama migrasi, lookup memeriksa path
+ber-shard lalu path datar. Setelah semua entri pindah, marker layout ditulis
+sehingga proses yang dimulai berikutnya tidak lagi memeriksa path datar.
+
+Contoh:
+    python migrate_layout.py --storage ./temp_storage --uploads ./uploads --levels 2
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+
+from sharding import ShardedLayout
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler()]
+)
+logger = logging.getLogger("AI-WaiZ-Migrate")
+
+
+def flat_entries(layout, dirs):
+    """Entri di tingkat teratas yang belum berada di direktori shard"""
+    for entry in os.scandir(layout.base_path):
+        if entry.name.startswith('.') or entry.name.endswith('.tmp'):
+            continue
+        is_dir = entry.is_dir()
+        if is_dir and layout._is_shard_name(entry.name):
+            continue
+        if is_dir == dirs:
+            yield entry.name, entry.path
+
+
+def migrate(layout, kind, suffix=None, dirs=False, dry_run=False, pause_every=500, pause=0.05):
+    """
+    Pindahkan semua entri datar dari satu direktori
+
+    Args:
+        layout (ShardedLayout): Layout tujuan
+        kind (str): Nama jenis entri (untuk log)
+        suffix (str, optional): Akhiran file yang dimigrasi (mis. '.json');
+            None berarti akhiran diambil dari ekstensi file
+        dirs (bool): True jika entri berupa direktori
+        dry_run (bool): Hanya hitung tanpa memindahkan
+        pause_every (int): Jeda setiap N entri agar I/O aplikasi tidak terganggu
+        pause (float): Lama jeda (detik)
+
+    Returns:
+        tuple: (jumlah dipindah, jumlah gagal)
+    """
+    moved = 0
+    failed = 0
+    for name, path in list(flat_entries(layout, dirs)):
+        if dirs:
+            key, entry_suffix = name, ""
+        elif suffix is not None:
+            if not name.endswith(suffix):
+                continue
+            key, entry_suffix = name[:-len(suffix)], suffix
+        else:
+            key, entry_suffix = os.path.splitext(name)
+
+        if dry_run:
+            moved += 1
+            continue
+
+        try:
+            if dirs:
+                ok = layout.migrate_dir(key, path)
+            else:
+                layout.migrate_file(key, path, entry_suffix)
+                ok = True
+            if ok:
+                moved += 1
+            else:
+                failed += 1
+        except FileNotFoundError:
+            # Sudah dihapus atau dipindahkan oleh aplikasi
+            continue
+        except OSError as e:
+            logger.error(f"Gagal memindahkan {kind} {name}: {e}")
+            failed += 1
+
+        if pause_every and moved % pause_every == 0:
+            time.sleep(pause)
+
+    logger.info(f"{kind}: {moved} entri {'akan dipindahkan' if dry_run else 'dipindahkan'}, {failed} gagal")
+    return moved, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrasi layout penyimpanan ke direktori ber-shard")
+    parser.add_argument("--storage", required=True, help="Direktori TEMP_STORAGE_PATH")
+    parser.add_argument("--uploads", help="Direktori UPLOAD_FOLDER (opsional)")
+    parser.add_argument("--levels", type=int, default=2, help="Jumlah level shard")
+    parser.add_argument("--width", type=int, default=2, help="Jumlah karakter hex per level")
+    parser.add_argument("--dry-run", action="store_true", help="Hitung entri tanpa memindahkan")
+    parser.add_argument("--pause-every", type=int, default=500, help="Jeda setiap N entri")
+    parser.add_argument("--pause", type=float, default=0.05, help="Lama jeda dalam detik")
+    args = parser.parse_args()
+
+    if args.levels <= 0:
+        logger.error("Jumlah level shard harus lebih dari 0")
+        return 1
+
+    targets = [
+        (os.path.join(args.storage, "documents"), "dokumen", None, True),
+        (os.path.join(args.storage, "sessions"), "sesi", ".json", False),
+    ]
+    if args.uploads:
+        targets.append((args.uploads, "upload", None, False))
+
+    total_failed = 0
+    for base_path, kind, suffix, dirs in targets:
+        if not os.path.isdir(base_path):
+            logger.warning(f"Direktori {base_path} tidak ditemukan, dilewati")
+            continue
+        layout = ShardedLayout(base_path, args.levels, args.width)
+        _, failed = migrate(layout, kind, suffix, dirs, args.dry_run, args.pause_every, args.pause)
+        total_failed += failed
+        if not args.dry_run and not failed:
+            layout.write_marker(migrated=True)
+
+    return 1 if total_failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,10 +2,20 @@
 import re
 import logging
 import json
+import time
 from datetime import datetime
+import metrics
+import tracing
+import profiler
+from log_setup import Payload
 
 logger = logging.getLogger(__name__)
 
+NLP_SECONDS = metrics.histogram(
+    "waiz_nlp_process_seconds", "Durasi deteksi intent per pesan",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1))
+NLP_INTENTS = metrics.counter("waiz_nlp_intents_total", "Jumlah pesan per intent terdeteksi", ("intent",))
+
 class NLPEngine:
     def __init__(self):
         self.user_contexts = {}  # Untuk menyimpan konteks percakapan user
@@ -15,11 +25,19 @@ class NLPEngine:
         # Dialogflow, RASA, atau model ML kustom
         self.intent_patterns = {
             "create_document": [
-                r"(?i)buat(?:\s+sebuah|\s+satu)?\s+dokumen(?:\s+baru)?(?:\s+tentang|\s+dengan\s+judul|\s+berjudul)?(?:\s+['"]?([^'"]*)['"]?)?",
-                r"(?i)bikin(?:\s+sebuah|\s+satu)?\s+dokumen(?:\s+baru)?(?:\s+tentang|\s+dengan\s+judul|\s+berjudul)?(?:\s+['"]?([^'"]*)['"]?)?",
-                r"(?i)tulis(?:\s+sebuah|\s+satu)?\s+(?:paper|makalah|dokumen)(?:\s+tentang|\s+dengan\s+judul|\s+berjudul)?(?:\s+['"]?([^'"]*)['"]?)?",
-                r"(?i)mulai(?:\s+sebuah|\s+satu)?\s+dokumen(?:\s+baru)?(?:\s+tentang|\s+dengan\s+judul|\s+berjudul)?(?:\s+['"]?([^'"]*)['"]?)?",
-                r"(?i)create(?:\s+a|\s+new)?\s+document(?:\s+about|\s+titled|\s+on)?(?:\s+['"]?([^'"]*)['"]?)?"
+                r"(?i)buat(?:\s+sebuah|\s+satu)?\s+dokumen(?:\s+baru)?(?:\s+tentang|\s+dengan\s+judul|\s+berjudul)?(?:\s+['\"]?([^'\"]*)['\"]?)?",
+                r"(?i)bikin(?:\s+sebuah|\s+satu)?\s+dokumen(?:\s+baru)?(?:\s+tentang|\s+dengan\s+judul|\s+berjudul)?(?:\s+['\"]?([^'\"]*)['\"]?)?",
+                r"(?i)tulis(?:\s+sebuah|\s+satu)?\s+(?:paper|makalah|dokumen)(?:\s+tentang|\s+dengan\s+judul|\s+berjudul)?(?:\s+['\"]?([^'\"]*)['\"]?)?",
+                r"(?i)mulai(?:\s+sebuah|\s+satu)?\s+dokumen(?:\s+baru)?(?:\s+tentang|\s+dengan\s+judul|\s+berjudul)?(?:\s+['\"]?([^'\"]*)['\"]?)?",
+                r"(?i)create(?:\s+a|\s+new)?\s+document(?:\s+about|\s+titled|\s+on)?(?:\s+['\"]?([^'\"]*)['\"]?)?"
+            ],
+            "select_document": [
+                r"(?i)^\s*(?:pilih|buka|gunakan|lanjutkan)\s+dokumen(?:\s+berjudul|\s+tentang)?\s+['\"]?([^'\"]+)['\"]?",
+                r"(?i)^\s*(?:select|open|use)\s+(?:the\s+)?document(?:\s+titled|\s+about)?\s+['\"]?([^'\"]+)['\"]?"
+            ],
+            "search_document": [
+                r"(?i)^\s*cari(?:kan)?(?:\s+teks|\s+kalimat|\s+frasa)?\s+['\"]?([^'\"]+)['\"]?",
+                r"(?i)^\s*search(?:\s+for)?\s+['\"]?([^'\"]+)['\"]?"
             ],
             "add_text": [
                 r"(?i)tambah(?:kan)?\s+(?:teks|paragraf|kalimat|konten)(?:\s+ini)?(?:\s+ke(?:\s+bagian|\s+seksi|\s+section)?\s+([^:]*))?(:|$)",
@@ -27,8 +45,8 @@ class NLPEngine:
                 r"(?i)add(?:\s+this)?\s+(?:text|paragraph|sentence|content)(?:\s+to(?:\s+the)?\s+([^:]*)\s+section)?(:|$)"
             ],
             "edit_text": [
-                r"(?i)(?:edit|ubah|ganti)\s+['"]([^'"]*)['"](?:\s+menjadi|\s+dengan|\s+jadi)\s+['"]([^'"]*)['"](?:\s+di(?:\s+bagian|\s+seksi|\s+section)?\s+([^:]*))?",
-                r"(?i)replace\s+['"]([^'"]*)['"](?:\s+with)\s+['"]([^'"]*)['"](?:\s+in(?:\s+the)?\s+([^:]*)\s+section)?"
+                r"(?i)(?:edit|ubah|ganti)\s+['\"]([^'\"]*)['\"](?:\s+menjadi|\s+dengan|\s+jadi)\s+['\"]([^'\"]*)['\"](?:\s+di(?:\s+bagian|\s+seksi|\s+section)?\s+([^:]*))?",
+                r"(?i)replace\s+['\"]([^'\"]*)['\"](?:\s+with)\s+['\"]([^'\"]*)['\"](?:\s+in(?:\s+the)?\s+([^:]*)\s+section)?"
             ],
             "export_document": [
                 r"(?i)export(?:\s+dokumen(?:\s+ini)?|\s+file(?:\s+ini)?)(?:\s+sebagai|\s+ke)?\s+(pdf|docx)",
@@ -37,6 +55,18 @@ class NLPEngine:
                 r"(?i)kirim(?:\s+dokumen(?:\s+ini)?|\s+file(?:\s+ini)?)(?:\s+sebagai|\s+dalam(?:\s+format)?)?\s+(pdf|docx)",
                 r"(?i)download(?:\s+dokumen(?:\s+ini)?|\s+file(?:\s+ini)?)(?:\s+sebagai|\s+dalam(?:\s+format)?)?\s+(pdf|docx)"
             ],
+            "undo": [
+                r"(?i)^\s*(?:batalkan|urungkan)(?:\s+(?:perubahan|edit|revisi))?(?:\s+terakhir)?\s*$",
+                r"(?i)^\s*undo\s*$"
+            ],
+            "redo": [
+                r"(?i)^\s*(?:ulangi|kembalikan)(?:\s+(?:perubahan|edit|revisi))?(?:\s+(?:terakhir|tadi))?\s*$",
+                r"(?i)^\s*redo\s*$"
+            ],
+            "show_history": [
+                r"(?i)^\s*(?:lihat|tampilkan)\s+(?:riwayat|revisi|versi\s+terakhir)",
+                r"(?i)^\s*(?:riwayat|history)(?:\s+revisi)?\s*$"
+            ],
             "help": [
                 r"(?i)bantuan",
                 r"(?i)tolong",
@@ -46,9 +76,13 @@ class NLPEngine:
             ]
         }
     
+    @tracing.traced("nlp.process_message")
+    @profiler.tag("nlp.process_message")
     def process_message(self, message, user_id):
         """Proses pesan dan ekstrak intent, entities, dan context"""
-        logger.info(f"Processing message from {user_id}: {message}")
+        logger.info("Processing message from %s: %s", user_id, Payload(message, 200),
+                    extra={"event": "message_received", "user_id": user_id})
+        start = time.perf_counter()
         
         # Default values
         intent = "unknown"
@@ -71,6 +105,10 @@ class NLPEngine:
                         else:
                             entities["document_type"] = "docx"
                     
+                    elif intent in ("select_document", "search_document"):
+                        key = "document_title" if intent == "select_document" else "query"
+                        entities[key] = match.group(1).strip()
+                    
                     elif intent == "add_text":
                         if match.group(1):
                             entities["section"] = match.group(1).strip().lower()
@@ -109,21 +147,68 @@ class NLPEngine:
         # Update last activity
         self.update_context(user_id, {"last_activity": datetime.now().isoformat()})
         
-        logger.info(f"Detected intent: {intent} with entities: {entities}")
+        NLP_SECONDS.observe(time.perf_counter() - start)
+        NLP_INTENTS.labels(intent).inc()
+        tracing.annotate(intent=intent)
+        logger.info("Detected intent: %s with entities: %s", intent, Payload(entities),
+                    extra={"event": "intent_detected", "intent": intent})
         return intent, entities, context
     
+    def keywords(self):
+        """
+        Kata literal yang dipakai pola intent (mis. untuk anonimisasi yang
+        tetap mempertahankan intent)
+
+        Returns:
+            set: Kata huruf kecil
+        """
+        words = set()
+        for patterns in self.intent_patterns.values():
+            for pattern in patterns:
+                # Buang escape (\s, \w) dan grup non-capture sebelum mengambil kata
+                literal = re.sub(r"\\.|\(\?[:i]*\)?|\[[^\]]*\]", " ", pattern)
+                words.update(word for word in re.findall(r"[a-z]{2,}", literal.lower()))
+                # Akhiran opsional seperti tambah(?:kan)? -> tambahkan
+                words.update(stem + suffix for stem, suffix in re.findall(r"([a-z]+)\(\?:([a-z]+)\)\?", pattern.lower()))
+        return words
+    
     def update_context(self, user_id, context_updates):
         """Update konteks percakapan user"""
         if user_id not in self.user_contexts:
             self.user_contexts[user_id] = {}
         
         self.user_contexts[user_id].update(context_updates)
-        logger.debug(f"Updated context for {user_id}: {self.user_contexts[user_id]}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Updated context for %s: %s", user_id, Payload(dict(self.user_contexts[user_id])),
+                         extra={"event": "context_updated", "user_id": user_id})
     
     def get_context(self, user_id):
         """Dapatkan konteks percakapan user saat ini"""
         return self.user_contexts.get(user_id, {})
     
+    def export_contexts(self):
+        """
+        Salinan semua konteks user (untuk snapshot saat shutdown)
+
+        Returns:
+            dict: user_id -> konteks
+        """
+        return {user_id: dict(context) for user_id, context in list(self.user_contexts.items())}
+    
+    def import_contexts(self, contexts):
+        """
+        Muat konteks dari snapshot; konteks yang sudah ada tidak ditimpa
+        
+        Returns:
+            int: Jumlah konteks yang dimuat
+        """
+        loaded = 0
+        for user_id, context in contexts.items():
+            if user_id not in self.user_contexts:
+                self.user_contexts[user_id] = context
+                loaded += 1
+        return loaded
+    
     def clear_context(self, user_id):
         """Hapus konteks percakapan user"""
         if user_id in self.user_contexts:
@@ -0,0 +1,235 @@
+# Modul profiler CPU berbasis sampling untuk produksi
+#
+# Saat aktif, satu thread membaca stack semua thread (sys._current_frames)
+# setiap interval. Di Linux hanya thread yang benar-benar memakai CPU sejak
+# sampel sebelumnya yang dihitung (jam CPU per thread), dengan bobot
+# mikrodetik CPU; thread yang menunggu antrean/socket tidak mengotori
+# profil. Hasilnya berformat collapsed stack ("a;b;c <nilai>") yang bisa
+# langsung dipakai flamegraph.pl atau speedscope.
+#
+# Fungsi penting ditandai dengan @tag("nama"): code object-nya dicatat di
+# registry sehingga frame-nya tampil sebagai "[nama] fungsi" tanpa biaya
+# apa pun saat fungsi dipanggil.
+import os
+import re
+import sys
+import time
+import logging
+import threading
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+_TAGS = {}  # code object -> nama tag
+_THREAD_NUMBER = re.compile(r"[-_ ]?\d+")
+
+
+def tag(name):
+    """
+    Decorator untuk menandai fungsi di profil
+
+    Args:
+        name (str): Nama tag (mis. 'nlp.process_message')
+    """
+    def decorator(fn):
+        code = getattr(fn, "__code__", None)
+        if code is not None:
+            _TAGS[code] = name
+        return fn
+    return decorator
+
+
+def _label(code):
+    name = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+    tag_name = _TAGS.get(code)
+    return f"[{tag_name}] {name}" if tag_name else name
+
+
+def _thread_group(name):
+    # Thread pool bernomor (waiz-actor-3, Thread-12) dijadikan satu kelompok
+    return _THREAD_NUMBER.sub("", name).replace(";", ",") or "thread"
+
+
+def _cpu_clock(ident):
+    try:
+        return time.pthread_getcpuclockid(ident)
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+class SamplingProfiler:
+    def __init__(self, output_dir="./profiles", max_depth=64):
+        """
+        Args:
+            output_dir (str): Direktori file hasil (.collapsed)
+            max_depth (int): Jumlah frame maksimum per stack
+        """
+        self.output_dir = output_dir
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.last = None  # ringkasan profil terakhir
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds=30, interval=0.01):
+        """
+        Nyalakan profiler selama `seconds` detik
+
+        Returns:
+            bool: False jika profiler sedang berjalan
+        """
+        with self._lock:
+            if self.running:
+                return False
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(seconds, interval),
+                                            name="waiz-profiler", daemon=True)
+            self._thread.start()
+        logger.info(f"Profiler CPU dinyalakan selama {seconds} detik (interval {interval * 1000:.0f} ms)")
+        return True
+
+    def stop(self):
+        """Hentikan lebih awal; hasil sampai saat ini tetap ditulis"""
+        self._stop.set()
+
+    def wait(self, timeout=None):
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.last
+
+    def _run(self, seconds, interval):
+        own = threading.get_ident()
+        stacks = Counter()
+        clocks = {}    # ident -> clock id CPU (None jika tidak tersedia)
+        cpu_seen = {}  # ident -> waktu CPU pada sampel sebelumnya
+        samples = 0
+        started = time.monotonic()
+        deadline = started + seconds
+        per_thread = hasattr(time, "pthread_getcpuclockid")
+
+        while not self._stop.wait(interval) and time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            samples += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                weight = 1
+                if per_thread:
+                    if ident not in clocks:
+                        clocks[ident] = _cpu_clock(ident)
+                    clock = clocks[ident]
+                    if clock is not None:
+                        try:
+                            now = time.clock_gettime(clock)
+                        except OSError:
+                            continue
+                        previous = cpu_seen.get(ident)
+                        cpu_seen[ident] = now
+                        if previous is None:
+                            continue
+                        weight = int((now - previous) * 1_000_000)
+                        if weight <= 0:
+                            # Thread menganggur sejak sampel sebelumnya
+                            continue
+
+                labels = []
+                while frame is not None and len(labels) < self.max_depth:
+                    labels.append(_label(frame.f_code))
+                    frame = frame.f_back
+                labels.append(_thread_group(names.get(ident, str(ident))))
+                stacks[";".join(reversed(labels))] += weight
+
+        elapsed = time.monotonic() - started
+        self.last = self._finish(stacks, samples, elapsed, "cpu_us" if per_thread else "samples")
+
+    def _finish(self, stacks, samples, elapsed, unit):
+        total = sum(stacks.values())
+        tags = Counter()
+        for stack, value in stacks.items():
+            # Satu stack dihitung sekali per tag walaupun tag muncul berulang (rekursi)
+            for tag_name in set(re.findall(r"\[([^\]]+)\]", stack)):
+                tags[tag_name] += value
+
+        path = None
+        if stacks:
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(self.output_dir, time.strftime("profile-%Y%m%d-%H%M%S.collapsed"))
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, value in stacks.most_common():
+                    f.write(f"{stack} {value}\n")
+
+        summary = {
+            "path": path,
+            "unit": unit,
+            "seconds": round(elapsed, 2),
+            "samples": samples,
+            "total": total,
+            "stacks": len(stacks),
+            "tags": {name: {"value": value, "share": round(value / total, 4) if total else 0.0}
+                     for name, value in tags.most_common()},
+        }
+        logger.info(f"Profil CPU selesai: {samples} sampel, {len(stacks)} stack, disimpan di {path}")
+        return summary
+
+    def collapsed(self):
+        """
+        Returns:
+            str: Isi file collapsed profil terakhir, atau None
+        """
+        if not self.last or not self.last["path"]:
+            return None
+        with open(self.last["path"], "r", encoding="utf-8") as f:
+            return f.read()
+
+
+PROFILER = SamplingProfiler()
+
+
+def register_flask(app, token, path="/debug/profile", profiler=None, max_seconds=300):
+    """
+    Tambahkan endpoint admin profiler ke aplikasi Flask
+
+    POST {path}?seconds=30&interval_ms=10[&wait=1] -> nyalakan profiler
+    GET  {path}                                    -> status dan ringkasan tag
+    GET  {path}?format=collapsed                   -> file collapsed terakhir
+
+    Dilindungi token debug yang sama dengan /debug/memory.
+
+    Args:
+        token (callable): token() -> token debug yang berlaku saat ini
+    """
+    from flask import request, jsonify, Response
+    from diagnostics import debug_authorized
+    profiler = profiler or PROFILER
+
+    def profile_endpoint():
+        if not debug_authorized(request, token()):
+            return jsonify({"status": "error", "message": "Tidak diizinkan"}), 403
+
+        if request.method == "GET":
+            if request.args.get("format") == "collapsed":
+                data = profiler.collapsed()
+                if data is None:
+                    return jsonify({"status": "error", "message": "Belum ada profil"}), 404
+                return Response(data, mimetype="text/plain")
+            return jsonify({"running": profiler.running, "last": profiler.last})
+
+        try:
+            seconds = float(request.args.get("seconds", 30))
+            interval = float(request.args.get("interval_ms", 10)) / 1000
+        except ValueError:
+            return jsonify({"status": "error", "message": "Parameter tidak valid"}), 400
+        if not 0 < seconds <= max_seconds or not 0.001 <= interval <= 1:
+            return jsonify({"status": "error", "message": "Parameter tidak valid"}), 400
+        if not profiler.start(seconds, interval):
+            return jsonify({"status": "error", "message": "Profiler sedang berjalan"}), 409
+        if request.args.get("wait") in ("1", "true"):
+            return jsonify({"status": "ok", "last": profiler.wait(seconds + 5)})
+        return jsonify({"status": "ok", "running": True, "seconds": seconds}), 202
+
+    app.add_url_rule(path, "debug_profile", profile_endpoint, methods=["GET", "POST"])
@@ -0,0 +1,343 @@
+# Modul riwayat revisi dokumen: log delta, checkpoint, dan undo/redo
+import os
+import json
+import time
+import logging
+from collections import deque
+
+from session_store import write_atomic
+
+logger = logging.getLogger(__name__)
+
+DELTA_LOG_FILENAME = "document.log"
+CHECKPOINT_FILENAME = "checkpoint.json"
+
+# Kunci header log: versi terakhir yang hanya tersimpan di checkpoint
+COMPACTED_KEY = "c"
+
+# Penanda record log hasil undo / redo
+MARK_UNDO = "u"
+MARK_REDO = "r"
+
+
+def invert(op):
+    """
+    Operasi kebalikan dari sebuah delta
+
+    Args:
+        op (dict): Delta 'add', 'del', atau 'edit'
+
+    Returns:
+        dict: Delta yang membatalkan op
+    """
+    kind = op["op"]
+    if kind == "add":
+        # Record lama tanpa posisi: paragraf terakhir bagian tersebut
+        return {"op": "del", "s": op["s"], "p": op.get("p"), "t": op["t"]}
+    if kind == "del":
+        return {"op": "add", "s": op["s"], "p": op.get("p"), "t": op["t"]}
+    if kind == "edit":
+        return {"op": "edit", "s": op["s"], "p": op["p"], "o": op["o"], "old": op["new"], "new": op["old"]}
+    raise ValueError(f"Operasi dokumen tidak dikenal: {kind}")
+
+
+def _delta(op):
+    # Hanya field yang dibutuhkan untuk menerapkan / membalik operasi
+    return {k: v for k, v in op.items() if k not in ("v", "ts", "m")}
+
+
+class DeltaLog:
+    def __init__(self, path):
+        """
+        Log delta append-only untuk satu dokumen
+
+        Setiap baris adalah satu operasi dalam JSON ringkas. Baris terakhir
+        yang terpotong (crash saat menulis) diabaikan saat replay.
+
+        Args:
+            path (str): Path file log
+        """
+        self.path = path
+
+    def append(self, op):
+        line = json.dumps(op, ensure_ascii=False, separators=(',', ':')) + "\n"
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+    def read(self):
+        """
+        Returns:
+            list: Operasi yang tercatat, berurutan
+        """
+        ops = []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        ops.append(json.loads(line))
+                    except ValueError:
+                        logger.warning(f"Baris log dokumen terpotong diabaikan: {self.path}")
+                        break
+        except FileNotFoundError:
+            pass
+        return ops
+
+    def last_version(self):
+        """
+        Versi dokumen menurut record terakhir (hanya membaca ekor file)
+
+        Returns:
+            int: Versi terakhir, atau None jika log tidak ada
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                f.seek(max(0, size - 65536))
+                tail = f.read()
+        except FileNotFoundError:
+            return None
+
+        lines = tail.split(b"\n")
+        for line in reversed(lines[:-1]):  # bagian setelah newline terakhir belum lengkap
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if "v" in record:
+                return record["v"]
+            break
+        # Log lama tanpa nomor versi: versi = jumlah record setelah 'create'
+        return max(0, len(self.read()) - 1)
+
+    def rewrite(self, ops):
+        """Ganti isi log secara atomik dan tahan crash"""
+        payload = "".join(json.dumps(op, ensure_ascii=False, separators=(',', ':')) + "\n" for op in ops)
+        write_atomic(self.path, payload.encode('utf-8'))
+
+
+class RevisionHistory:
+    def __init__(self, max_revisions=50, max_age=7 * 86400):
+        """
+        Tumpukan undo/redo satu dokumen
+
+        Args:
+            max_revisions (int): Jumlah maksimum revisi yang bisa dibatalkan
+            max_age (float): Umur maksimum revisi yang bisa dibatalkan (detik)
+        """
+        self.max_revisions = max_revisions
+        self.max_age = max_age
+        self.undo_stack = deque()  # delta maju, terlama di kiri
+        self.redo_stack = []
+        self.since_checkpoint = 0
+
+    def record(self, op):
+        """Catat revisi baru (menghapus tumpukan redo)"""
+        self.undo_stack.append(op)
+        self.redo_stack.clear()
+        self.trim(op.get("ts"))
+
+    def trim(self, now=None):
+        """Buang revisi yang melebihi batas jumlah atau umur"""
+        while len(self.undo_stack) > self.max_revisions:
+            self.undo_stack.popleft()
+        if self.max_age and now is not None:
+            cutoff = now - self.max_age
+            while self.undo_stack and self.undo_stack[0].get("ts", now) < cutoff:
+                self.undo_stack.popleft()
+
+    def to_dict(self):
+        return {"undo": list(self.undo_stack), "redo": list(self.redo_stack)}
+
+    def load_dict(self, data):
+        self.undo_stack = deque(data.get("undo", []))
+        self.redo_stack = list(data.get("redo", []))
+
+
+class RevisionStore:
+    def __init__(self, checkpoint_every=100, max_revisions=50, max_age=7 * 86400, compact_bytes=256 * 1024):
+        """
+        Inisialisasi penyimpanan revisi
+
+        Setiap add/edit dicatat sebagai delta yang dapat dibalik di log
+        dokumen. Undo menerapkan kebalikan delta teratas dan redo menerapkan
+        ulang delta tersebut, keduanya O(1) dari state terbaru dan juga
+        dicatat di log. Setiap checkpoint_every operasi, state lengkap dan
+        tumpukan undo/redo disimpan di checkpoint.json sehingga pemuatan
+        hanya me-replay operasi setelah checkpoint; log yang lebih besar dari
+        compact_bytes kemudian dipadatkan.
+
+        Args:
+            checkpoint_every (int): Jumlah operasi di antara checkpoint
+            max_revisions (int): Jumlah maksimum revisi yang bisa dibatalkan
+            max_age (float): Umur maksimum revisi yang bisa dibatalkan (detik)
+            compact_bytes (int): Ukuran log yang memicu pemadatan setelah checkpoint
+        """
+        self.checkpoint_every = checkpoint_every
+        self.max_revisions = max_revisions
+        self.max_age = max_age
+        self.compact_bytes = compact_bytes
+
+    def new_history(self):
+        return RevisionHistory(self.max_revisions, self.max_age)
+
+    def create(self, doc_dir, header):
+        """Tulis record 'create' sebagai awal log dokumen"""
+        DeltaLog(os.path.join(doc_dir, DELTA_LOG_FILENAME)).append(header)
+
+    def commit(self, model, doc_dir, op, mark=None):
+        """
+        Catat operasi yang sudah diterapkan ke model
+
+        Args:
+            model (DocumentModel): Model setelah operasi diterapkan
+            doc_dir (str): Direktori dokumen
+            op (dict): Delta operasi
+            mark (str, optional): MARK_UNDO / MARK_REDO untuk operasi undo/redo
+        """
+        record = dict(op, v=model.version, ts=round(time.time(), 3))
+        if mark:
+            record["m"] = mark
+        DeltaLog(os.path.join(doc_dir, DELTA_LOG_FILENAME)).append(record)
+
+        history = model.history
+        if mark is None:
+            history.record(record)
+        history.since_checkpoint += 1
+        if history.since_checkpoint >= self.checkpoint_every:
+            self.checkpoint(model, doc_dir)
+
+    def undo(self, model):
+        """
+        Siapkan undo revisi terakhir
+
+        Returns:
+            dict: Delta yang harus diterapkan, atau None jika tidak ada revisi
+        """
+        history = model.history
+        history.trim(time.time())
+        if not history.undo_stack:
+            return None
+        op = history.undo_stack.pop()
+        history.redo_stack.append(op)
+        return invert(_delta(op))
+
+    def redo(self, model):
+        """
+        Siapkan redo revisi yang terakhir dibatalkan
+
+        Returns:
+            dict: Delta yang harus diterapkan, atau None jika tidak ada
+        """
+        history = model.history
+        if not history.redo_stack:
+            return None
+        op = history.redo_stack.pop()
+        history.undo_stack.append(op)
+        return _delta(op)
+
+    def checkpoint(self, model, doc_dir):
+        """
+        Simpan state lengkap dokumen lalu padatkan log jika perlu
+
+        Checkpoint yang diikuti pemadatan di-fsync (beserta direktorinya)
+        lebih dulu: setelah log dipadatkan, checkpoint adalah satu-satunya
+        salinan record yang dibuang.
+        """
+        history = model.history
+        state = {
+            "v": model.version,
+            "sections": [[s.name, s.version, s.paragraphs] for s in model.sections.values()],
+        }
+        state.update(history.to_dict())
+        log = DeltaLog(os.path.join(doc_dir, DELTA_LOG_FILENAME))
+        try:
+            compact = os.path.getsize(log.path) > self.compact_bytes
+        except FileNotFoundError:
+            compact = False
+        write_atomic(os.path.join(doc_dir, CHECKPOINT_FILENAME),
+                     json.dumps(state, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), fsync=compact)
+        history.since_checkpoint = 0
+
+        # Record sebelum checkpoint tidak lagi dibutuhkan: sisakan header 'create'
+        # yang mencatat versi terakhir yang dibuang (COMPACTED_KEY)
+        if compact:
+            ops = log.read()
+            if ops:
+                header = dict(ops[0], **{COMPACTED_KEY: model.version})
+                log.rewrite([header] + [op for op in ops[1:] if op.get("v", 0) > model.version])
+                logger.debug(f"Log dokumen {model.doc_id} dipadatkan")
+
+    def load(self, doc_dir, factory):
+        """
+        Bangun model dari checkpoint terakhir dan log delta setelahnya
+
+        Args:
+            doc_dir (str): Direktori dokumen
+            factory (callable): factory(header) -> DocumentModel kosong
+
+        Returns:
+            DocumentModel: Model dokumen, atau None jika tidak ditemukan atau
+                tidak bisa dibangun utuh (checkpoint hilang/rusak untuk log
+                yang sudah dipadatkan, atau log tidak konsisten)
+        """
+        ops = DeltaLog(os.path.join(doc_dir, DELTA_LOG_FILENAME)).read()
+        if not ops or ops[0].get("op") != "create":
+            return None
+
+        model = factory(ops[0])
+        model.history = history = self.new_history()
+
+        checkpoint_version = 0
+        try:
+            with open(os.path.join(doc_dir, CHECKPOINT_FILENAME), 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            model.restore(state["v"], state["sections"])
+            history.load_dict(state)
+            checkpoint_version = state["v"]
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError) as e:
+            logger.error(f"Checkpoint dokumen {model.doc_id} rusak, replay dari log: {str(e)}")
+
+        # Dokumen yang hanya terbangun sebagian tidak dikembalikan: edit
+        # berikutnya akan ditulis di atas isi yang salah
+        compacted = ops[0].get(COMPACTED_KEY, 0)
+        if compacted > checkpoint_version:
+            logger.error(f"Checkpoint dokumen {model.doc_id} hilang atau lebih lama dari log yang sudah "
+                         f"dipadatkan (versi {compacted}); dokumen tidak dimuat")
+            return None
+        version = 0
+        applied = checkpoint_version
+        for op in ops[1:]:
+            version = op.get("v", version + 1)
+            if version <= checkpoint_version:
+                continue
+            if version != applied + 1:
+                logger.error(f"Log dokumen {model.doc_id} terputus: versi {applied + 1} sampai "
+                             f"{version - 1} tidak ada di checkpoint maupun log; dokumen tidak dimuat")
+                return None
+            try:
+                model.apply(op)
+            except (KeyError, IndexError, ValueError) as e:
+                logger.error(f"Log dokumen {model.doc_id} tidak konsisten di versi {version}, "
+                             f"dokumen tidak dimuat: {str(e)}")
+                return None
+            applied = version
+            self._replay_history(history, op)
+
+        history.trim(time.time())
+        return model
+
+    @staticmethod
+    def _replay_history(history, op):
+        mark = op.get("m")
+        if mark == MARK_UNDO:
+            if history.undo_stack:
+                history.redo_stack.append(history.undo_stack.pop())
+        elif mark == MARK_REDO:
+            if history.redo_stack:
+                history.undo_stack.append(history.redo_stack.pop())
+        else:
+            history.record(op)
+        history.since_checkpoint += 1
@@ -7,8 +7,8 @@ AI-WaiZ: Asisten Virtual Berbasis Suara
 import os
 import sys
 import argparse
-import json
 import logging
+import importlib.util
 from pathlib import Path
 
 # Konfigurasi logging
@@ -19,17 +19,28 @@ logging.basicConfig(
 )
 logger = logging.getLogger("AI-WaiZ")
 
-def check_dependencies():
-    """Memeriksa dependensi yang diperlukan"""
-    try:
-        import speech_recognition as sr
-        import pyttsx3
-        from openai import OpenAI
-        return True
-    except ImportError as e:
-        logger.error(f"Dependensi tidak terpenuhi: {e}")
+# Modul yang dibutuhkan setiap mode (nama import)
+REQUIRED_MODULES = {
+    "cli": ["speech_recognition", "pyttsx3", "openai"],
+    "web": ["flask", "speech_recognition", "pyttsx3", "openai"],
+}
+
+def check_dependencies(mode="cli"):
+    """
+    Memeriksa dependensi yang diperlukan tanpa mengimpornya
+
+    Modul berat baru diimpor oleh kode yang pertama kali membutuhkannya,
+    sehingga pemeriksaan ini tidak menambah waktu startup.
+
+    Args:
+        mode (str): 'cli' atau 'web'
+    """
+    missing = [name for name in REQUIRED_MODULES[mode] if importlib.util.find_spec(name) is None]
+    if missing:
+        logger.error(f"Dependensi tidak terpenuhi: {', '.join(missing)}")
         logger.info("Jalankan: pip install -r requirements.txt")
         return False
+    return True
 
 def check_config():
     """Memeriksa file konfigurasi"""
@@ -39,11 +50,12 @@ def check_config():
         return False
     
     try:
-        with open(CONFIG_FILE, "r") as f:
-            config = json.load(f)
+        # Settings dibangun sekali dan dipakai bersama oleh mode CLI/web
+        from config import get_settings
+        settings = get_settings()
         
         # Periksa API key
-        if config.get("openai_api_key") == "YOUR_API_KEY_HERE":
+        if settings.openai_api_key in ("", "YOUR_API_KEY_HERE"):
             logger.error("API key OpenAI belum dikonfigurasi")
             return False
         
@@ -66,7 +78,7 @@ def main():
         logger.debug("Mode debug diaktifkan")
     
     # Periksa dependensi
-    if not check_dependencies():
+    if not check_dependencies("web" if args.web else "cli"):
         return 1
     
     # Periksa konfigurasi
@@ -0,0 +1,171 @@
+# Modul cache write-behind untuk data sesi
+import copy
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Penanda sesi yang sudah diketahui tidak ada (negative cache)
+_MISSING = object()
+
+
+class SessionCache:
+    def __init__(self, load_fn, save_fn, delete_fn, max_entries=10000, flush_interval=1.0, dirty_threshold=100):
+        """
+        Inisialisasi cache sesi write-behind
+
+        Pembacaan dilayani dari memori. Penulisan hanya menandai sesi sebagai
+        dirty; thread latar belakang menulisnya ke penyimpanan setiap
+        flush_interval detik atau segera setelah jumlah sesi dirty mencapai
+        dirty_threshold. Sesi yang belum ditulis paling lama tertahan satu
+        flush_interval.
+
+        Args:
+            load_fn (callable): load_fn(user_id) -> dict atau None
+            save_fn (callable): save_fn(user_id, data) menulis ke penyimpanan
+            delete_fn (callable): delete_fn(user_id) menghapus dari penyimpanan
+            max_entries (int): Jumlah maksimum sesi di memori (LRU)
+            flush_interval (float): Jeda maksimum sebelum sesi dirty ditulis (detik)
+            dirty_threshold (int): Jumlah sesi dirty yang memicu flush lebih awal
+        """
+        self.load_fn = load_fn
+        self.save_fn = save_fn
+        self.delete_fn = delete_fn
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self.dirty_threshold = dirty_threshold
+
+        self._entries = OrderedDict()  # user_id -> data atau _MISSING
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # serialisasi flush vs delete
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+
+        self._flusher = threading.Thread(target=self._flush_loop, name="waiz-session-flush", daemon=True)
+        self._flusher.start()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, user_id):
+        """
+        Dapatkan data sesi (dari memori jika ada)
+
+        Returns:
+            dict: Salinan data sesi atau None jika tidak ada
+        """
+        with self._lock:
+            data = self._entries.get(user_id)
+            if data is not None:
+                self._entries.move_to_end(user_id)
+                return None if data is _MISSING else copy.deepcopy(data)
+
+        data = self.load_fn(user_id)
+        with self._lock:
+            # Jangan timpa put() yang terjadi selama load
+            if user_id not in self._entries:
+                self._entries[user_id] = _MISSING if data is None else data
+                self._evict_locked()
+        return copy.deepcopy(data) if data is not None else None
+
+    def put(self, user_id, data):
+        """Simpan data sesi di memori dan tandai untuk ditulis"""
+        with self._lock:
+            self._entries[user_id] = copy.deepcopy(data)
+            self._entries.move_to_end(user_id)
+            self._dirty.add(user_id)
+            dirty_count = len(self._dirty)
+            self._evict_locked()
+        if dirty_count >= self.max_entries:
+            # Backpressure: memori penuh oleh sesi dirty, tulis sekarang
+            self.flush()
+        elif dirty_count >= self.dirty_threshold:
+            self._wakeup.set()
+
+    def delete(self, user_id):
+        """
+        Hapus sesi dari memori dan penyimpanan (langsung, tidak ditunda)
+
+        Returns:
+            bool: Hasil delete_fn
+        """
+        with self._flush_lock:
+            with self._lock:
+                self._entries[user_id] = _MISSING
+                self._dirty.discard(user_id)
+            return self.delete_fn(user_id)
+
+    def exists(self, user_id):
+        """Cek apakah sesi ada"""
+        return self.get(user_id) is not None
+
+    def is_dirty(self, user_id):
+        """Cek apakah sesi punya perubahan yang belum ditulis"""
+        with self._lock:
+            return user_id in self._dirty
+
+    def dirty_count(self):
+        """Jumlah sesi yang belum ditulis"""
+        return len(self._dirty)
+
+    def flush(self):
+        """
+        Tulis semua sesi dirty ke penyimpanan
+
+        Returns:
+            int: Jumlah sesi yang ditulis
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch = [(user_id, self._entries[user_id]) for user_id in self._dirty]
+                self._dirty.clear()
+
+            written = 0
+            for user_id, data in batch:
+                try:
+                    self.save_fn(user_id, data)
+                    written += 1
+                except Exception as e:
+                    logger.error(f"Error menulis sesi {user_id} dari cache: {str(e)}")
+                    with self._lock:
+                        # Coba lagi di flush berikutnya kecuali sudah diganti/dihapus
+                        if self._entries.get(user_id) is data:
+                            self._dirty.add(user_id)
+        if written:
+            logger.debug(f"Flush cache sesi: {written} sesi ditulis")
+        return written
+
+    def close(self):
+        """Hentikan thread flush dan tulis semua sesi dirty"""
+        self._stopped.set()
+        self._wakeup.set()
+        self._flusher.join()
+        self.flush()
+
+    def _evict_locked(self):
+        # Buang entri bersih paling lama. Entri dirty tidak dibuang sebelum
+        # ditulis oleh flush, jadi minta flush lebih awal.
+        excess = len(self._entries) - self.max_entries
+        if excess <= 0:
+            return
+        victims = []
+        for user_id in self._entries:
+            if len(victims) >= excess:
+                break
+            if user_id not in self._dirty:
+                victims.append(user_id)
+        for user_id in victims:
+            del self._entries[user_id]
+        if len(victims) < excess:
+            self._wakeup.set()
+
+    def _flush_loop(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error di thread flush sesi: {str(e)}")
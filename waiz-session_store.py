@@ -0,0 +1,445 @@
+# Modul persistensi data sesi yang aman terhadap crash
+import os
+import json
+import zlib
+import struct
+import shutil
+import logging
+import threading
+from sharding import ShardedLayout
+
+logger = logging.getLogger(__name__)
+
+# Header record WAL: panjang body dan CRC32 body.
+# Body: b'S' + user_id + b'\x00' + payload (simpan) atau b'D' + user_id (hapus)
+WAL_HEADER = struct.Struct('>II')
+WAL_FILENAME = "sessions.wal"
+WAL_CHECKPOINT_SUFFIX = ".checkpoint"  # log lama yang sedang di-checkpoint
+
+
+def encode_session(data):
+    """Encode data sesi sebagai JSON ringkas (tanpa spasi/indentasi)"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def write_atomic(path, payload, fsync=True):
+    """
+    Tulis file secara atomik: file sementara + fsync + rename
+
+    Pembaca selalu melihat isi lama atau isi baru secara utuh, tidak pernah
+    file yang terpotong.
+
+    Args:
+        path (str): Path file tujuan
+        payload (bytes): Isi file
+        fsync (bool): Paksa data (dan direktori) ke disk sebelum kembali
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    if fsync:
+        fsync_dir(os.path.dirname(path))
+
+
+def fsync_dir(path):
+    """Fsync direktori agar rename/unlink tahan crash (diabaikan jika tidak didukung OS)"""
+    try:
+        fd = os.open(path or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class AtomicSessionStore:
+    def __init__(self, sessions_path, fsync=True, layout=None):
+        """
+        Penyimpanan sesi satu file per pengguna dengan penulisan atomik
+
+        Args:
+            sessions_path (str): Direktori file sesi
+            fsync (bool): Paksa setiap penulisan ke disk
+            layout (ShardedLayout, optional): Layout direktori (default: datar)
+        """
+        self.sessions_path = sessions_path
+        self.fsync = fsync
+        self.layout = layout or ShardedLayout(sessions_path, levels=0)
+        os.makedirs(sessions_path, exist_ok=True)
+
+    def session_file(self, user_id):
+        """Path file sesi untuk seorang pengguna (lokasi saat ini)"""
+        return self.layout.resolve(user_id, ".json")
+
+    def save(self, user_id, data):
+        """
+        Simpan data sesi secara atomik
+
+        Args:
+            user_id (str): ID pengguna
+            data (dict): Data sesi
+        """
+        self._write_session_file(user_id, encode_session(data))
+
+    def _write_session_file(self, user_id, payload):
+        # Selalu tulis ke path ber-shard, lalu buang salinan datar yang belum dimigrasi
+        self.layout.ensure_dir(user_id)
+        write_atomic(self.layout.path(user_id, ".json"), payload, self.fsync)
+        if self.layout.flat_fallback:
+            flat = self.layout.flat_path(user_id, ".json")
+            if os.path.exists(flat):
+                os.remove(flat)
+
+    def load(self, user_id):
+        """
+        Muat data sesi
+
+        File yang rusak tidak dianggap sebagai sesi kosong secara diam-diam:
+        file dipindahkan ke <user_id>.json.corrupt untuk diperiksa dan error dicatat.
+
+        Args:
+            user_id (str): ID pengguna
+
+        Returns:
+            dict: Data sesi atau None jika tidak ada / rusak
+        """
+        session_file = self.session_file(user_id)
+        try:
+            with open(session_file, 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return None
+
+        try:
+            return json.loads(raw)
+        except ValueError:
+            logger.error(f"File sesi {session_file} rusak, dipindahkan ke karantina")
+            try:
+                os.replace(session_file, f"{session_file}.corrupt")
+            except OSError as e:
+                logger.error(f"Gagal mengkarantina {session_file}: {str(e)}")
+            return None
+
+    def delete(self, user_id):
+        """
+        Hapus data sesi
+
+        Returns:
+            bool: True jika ada data yang dihapus
+        """
+        deleted = False
+        paths = [self.layout.path(user_id, ".json")]
+        if self.layout.flat_fallback:
+            paths.append(self.layout.flat_path(user_id, ".json"))
+        for path in paths:
+            try:
+                os.remove(path)
+                deleted = True
+            except FileNotFoundError:
+                pass
+        return deleted
+
+    def exists(self, user_id):
+        """Cek apakah pengguna punya data sesi"""
+        return os.path.exists(self.session_file(user_id))
+
+    def checkpoint(self):
+        """Tidak ada yang perlu di-checkpoint pada mode atomik"""
+
+    def close(self):
+        """Tutup penyimpanan"""
+
+
+class WalSessionStore(AtomicSessionStore):
+    def __init__(self, sessions_path, fsync=True, layout=None, checkpoint_bytes=4 * 1024 * 1024,
+                 wal_name=WAL_FILENAME):
+        """
+        Penyimpanan sesi dengan write-ahead log append-only
+
+        Setiap pembaruan ditambahkan ke log. Thread penulis menggabungkan
+        semua pembaruan yang menunggu menjadi satu write + satu fsync (group
+        commit), sehingga di bawah beban banyak pembaruan berbagi satu fsync.
+        save() kembali setelah pembaruannya tahan crash. Saat log melebihi
+        checkpoint_bytes, log diputar ke sessions.wal.checkpoint dan status
+        terbaru ditulis atomik ke file per pengguna oleh thread terpisah,
+        tanpa menahan lock yang dipakai load() dan save(); log lama dihapus
+        setelah semua file selesai ditulis.
+
+        Args:
+            sessions_path (str): Direktori file sesi
+            fsync (bool): Paksa log ke disk sebelum save() kembali
+            layout (ShardedLayout, optional): Layout direktori file sesi
+            checkpoint_bytes (int): Ukuran log yang memicu checkpoint
+            wal_name (str): Nama file log di sessions_path; satu log hanya
+                boleh dipakai satu proses
+        """
+        super().__init__(sessions_path, fsync, layout)
+        self.checkpoint_bytes = checkpoint_bytes
+        self.wal_path = os.path.join(sessions_path, wal_name)
+        self.checkpoint_path = self.wal_path + WAL_CHECKPOINT_SUFFIX
+
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()  # menjaga file log (tulis vs rotasi)
+        self._checkpoint_lock = threading.Lock()  # satu checkpoint pada satu waktu
+        self._checkpoint_due = threading.Event()
+        self._buffer = []        # record yang belum ditulis
+        self._pending = {}       # user_id -> payload terbaru (None = dihapus) sejak checkpoint
+        self._flushing = {}      # pembaruan yang sedang ditulis ke file oleh checkpoint
+        self._next_seq = 0       # nomor urut record berikutnya
+        self._committed_seq = 0  # record bernomor <= nilai ini sudah tahan crash
+        self._error = None
+        self._closed = False
+
+        interrupted = os.path.exists(self.checkpoint_path)
+        if interrupted:
+            # Checkpoint sebelumnya terhenti (crash): log lama diputar lebih dulu
+            self._replay(self.checkpoint_path)
+        self._replay(self.wal_path)
+        self._wal = open(self.wal_path, 'ab')
+        self._wal_size = self._wal.tell()
+        if interrupted:
+            # Selesaikan checkpoint yang terhenti sebelum menerima pembaruan baru
+            self._checkpoint()
+
+        self._writer = threading.Thread(target=self._writer_loop, name="waiz-session-wal", daemon=True)
+        self._writer.start()
+        self._checkpointer = threading.Thread(target=self._checkpoint_loop, name="waiz-session-checkpoint",
+                                              daemon=True)
+        self._checkpointer.start()
+
+    def save(self, user_id, data):
+        self._append(user_id, encode_session(data))
+
+    def load(self, user_id):
+        with self._cond:
+            for updates in (self._pending, self._flushing):
+                if user_id in updates:
+                    payload = updates[user_id]
+                    return json.loads(payload) if payload is not None else None
+        return super().load(user_id)
+
+    def delete(self, user_id):
+        existed = self.exists(user_id)
+        self._append(user_id, None)
+        return existed
+
+    def exists(self, user_id):
+        with self._cond:
+            for updates in (self._pending, self._flushing):
+                if user_id in updates:
+                    return updates[user_id] is not None
+        return super().exists(user_id)
+
+    def checkpoint(self):
+        """Tulis status terbaru ke file sesi dan kosongkan log"""
+        self._wait_for(self._reserve_barrier())
+        self._checkpoint()
+
+    def close(self):
+        """Commit semua pembaruan, lakukan checkpoint, dan hentikan thread penulis"""
+        with self._cond:
+            if self._closed:
+                return
+        self.checkpoint()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._checkpoint_due.set()
+        self._writer.join()
+        self._checkpointer.join()
+        self._wal.close()
+
+    def _append(self, user_id, payload):
+        if payload is None:
+            body = b'D' + user_id.encode('utf-8')
+        else:
+            body = b'S' + user_id.encode('utf-8') + b'\x00' + payload
+        record = WAL_HEADER.pack(len(body), zlib.crc32(body)) + body
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Session store sudah ditutup")
+            self._pending[user_id] = payload
+            self._buffer.append(record)
+            self._next_seq += 1
+            seq = self._next_seq
+            self._cond.notify_all()
+        self._wait_for(seq)
+
+    def _reserve_barrier(self):
+        with self._cond:
+            return self._next_seq
+
+    def _wait_for(self, seq):
+        with self._cond:
+            while self._committed_seq < seq and self._error is None:
+                self._cond.wait()
+            if self._error is not None:
+                raise self._error
+
+    def _writer_loop(self):
+        while True:
+            with self._cond:
+                while not self._buffer and not self._closed:
+                    self._cond.wait()
+                if not self._buffer and self._closed:
+                    return
+                batch = self._buffer
+                self._buffer = []
+                batch_seq = self._next_seq
+
+            try:
+                with self._io_lock:
+                    # Satu write dan satu fsync untuk seluruh batch (group commit)
+                    data = b''.join(batch)
+                    self._wal.write(data)
+                    self._wal.flush()
+                    if self.fsync:
+                        os.fsync(self._wal.fileno())
+                    self._wal_size += len(data)
+            except Exception as e:
+                logger.error(f"Error menulis WAL sesi: {str(e)}")
+                with self._cond:
+                    self._error = e
+                    self._cond.notify_all()
+                return
+
+            with self._cond:
+                self._committed_seq = batch_seq
+                self._cond.notify_all()
+
+            if self._wal_size >= self.checkpoint_bytes:
+                # Checkpoint di thread lain agar group commit tetap berjalan
+                self._checkpoint_due.set()
+
+    def _checkpoint_loop(self):
+        while True:
+            self._checkpoint_due.wait()
+            self._checkpoint_due.clear()
+            with self._cond:
+                if self._closed:
+                    return
+            try:
+                self._checkpoint()
+            except Exception as e:
+                logger.error(f"Error saat checkpoint WAL sesi: {str(e)}")
+
+    def _checkpoint(self):
+        with self._checkpoint_lock:
+            # Di bawah lock hanya tukar dict dan putar log: pembaruan berikutnya
+            # masuk ke log baru. Record yang masih di buffer ikut ditulis ke log
+            # baru; memutarnya ulang aman karena nilainya sama dengan yang
+            # ditulis ke file di bawah.
+            with self._io_lock, self._cond:
+                flushing = self._flushing = self._pending
+                self._pending = {}
+                self._rotate_locked()
+
+            # Penulisan file (masing-masing dengan fsync) tanpa menahan
+            # self._cond; load() membaca dari self._flushing sampai selesai
+            try:
+                for user_id, payload in flushing.items():
+                    if payload is None:
+                        super().delete(user_id)
+                    else:
+                        self._write_session_file(user_id, payload)
+            except BaseException:
+                # Kembalikan ke pending (pembaruan yang lebih baru menang);
+                # log lama tetap ada dan digabung pada checkpoint berikutnya
+                with self._cond:
+                    flushing.update(self._pending)
+                    self._pending = flushing
+                    self._flushing = {}
+                raise
+
+            with self._cond:
+                self._flushing = {}
+            os.remove(self.checkpoint_path)
+            if self.fsync:
+                fsync_dir(self.sessions_path)
+        logger.debug(f"Checkpoint WAL sesi selesai: {len(flushing)} pengguna")
+
+    def _rotate_locked(self):
+        # Dipanggil dengan self._io_lock dan self._cond dipegang
+        self._wal.close()
+        if os.path.exists(self.checkpoint_path):
+            # Checkpoint sebelumnya belum selesai: sambung log ke log lama
+            # agar tidak ada record yang hilang sebelum file sesi ditulis
+            with open(self.wal_path, 'rb') as src, open(self.checkpoint_path, 'ab') as dst:
+                shutil.copyfileobj(src, dst)
+                dst.flush()
+                if self.fsync:
+                    os.fsync(dst.fileno())
+            os.remove(self.wal_path)
+        else:
+            os.replace(self.wal_path, self.checkpoint_path)
+        self._wal = open(self.wal_path, 'ab')
+        self._wal_size = 0
+        if self.fsync:
+            fsync_dir(self.sessions_path)
+
+    def _replay(self, path):
+        """Muat ulang pembaruan dari log; ekor log yang terpotong dibuang"""
+        if not os.path.exists(path):
+            return
+
+        with open(path, 'rb') as f:
+            raw = f.read()
+
+        offset = 0
+        records = 0
+        while offset + WAL_HEADER.size <= len(raw):
+            length, crc = WAL_HEADER.unpack_from(raw, offset)
+            start = offset + WAL_HEADER.size
+            body = raw[start:start + length]
+            if len(body) < length or zlib.crc32(body) != crc:
+                break
+            if body[:1] == b'D':
+                self._pending[body[1:].decode('utf-8')] = None
+            else:
+                user_id, _, payload = body[1:].partition(b'\x00')
+                self._pending[user_id.decode('utf-8')] = payload
+            offset = start + length
+            records += 1
+
+        if offset < len(raw):
+            logger.warning(f"WAL sesi terpotong di offset {offset}, {len(raw) - offset} byte dibuang")
+            with open(path, 'r+b') as f:
+                f.truncate(offset)
+                os.fsync(f.fileno())
+
+        logger.info(f"WAL sesi {os.path.basename(path)} diputar ulang: "
+                    f"{records} record untuk {len(self._pending)} pengguna")
+
+
+def create_session_store(sessions_path, mode="atomic", fsync=True, layout=None, wal_name=None):
+    """
+    Buat penyimpanan sesi sesuai mode
+
+    Args:
+        sessions_path (str): Direktori file sesi
+        mode (str): 'atomic' (file per pengguna) atau 'wal' (write-ahead log)
+        fsync (bool): Paksa penulisan ke disk
+        layout (ShardedLayout, optional): Layout direktori file sesi
+        wal_name (str, optional): Nama file log untuk mode 'wal'
+
+    Returns:
+        AtomicSessionStore: Instance penyimpanan sesi
+    """
+    if mode == "wal":
+        return WalSessionStore(sessions_path, fsync=fsync, layout=layout, wal_name=wal_name or WAL_FILENAME)
+    if mode == "atomic":
+        return AtomicSessionStore(sessions_path, fsync=fsync, layout=layout)
+    raise ValueError(f"Mode penyimpanan sesi tidak dikenal: {mode}")
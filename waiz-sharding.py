@@ -0,0 +1,175 @@
+# Modul layout direktori ber-shard (prefix hash) untuk penyimpanan besar
+import os
+import json
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+LAYOUT_MARKER = ".layout.json"
+
+
+class ShardedLayout:
+    def __init__(self, base_path, levels=2, width=2):
+        """
+        Inisialisasi layout ber-shard
+
+        Entri dengan key 'abc' disimpan di base/<h0>/<h1>/abc, dengan h0, h1
+        adalah potongan hex dari hash MD5 key. Dengan levels=2 dan width=2
+        setiap direktori berisi paling banyak 256 subdirektori, sehingga
+        operasi direktori tetap cepat walau jumlah entri sangat besar.
+
+        Selama migrasi dari layout datar, lookup juga memeriksa path datar
+        lama sampai marker menyatakan migrasi selesai.
+
+        Args:
+            base_path (str): Direktori dasar
+            levels (int): Jumlah level shard (0 = layout datar)
+            width (int): Jumlah karakter hex per level
+        """
+        self.base_path = base_path
+        self.levels = levels
+        self.width = width
+        os.makedirs(base_path, exist_ok=True)
+        self._known_dirs = set()
+
+        marker = self.read_marker()
+        self.flat_fallback = levels > 0 and not (
+            marker.get("migrated") and marker.get("levels") == levels and marker.get("width") == width
+        )
+
+    def shard_dir(self, key):
+        """Direktori shard untuk sebuah key"""
+        if self.levels <= 0:
+            return self.base_path
+        digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+        parts = [digest[i * self.width:(i + 1) * self.width] for i in range(self.levels)]
+        return os.path.join(self.base_path, *parts)
+
+    def path(self, key, suffix=""):
+        """Path ber-shard untuk sebuah key (tidak memeriksa keberadaan)"""
+        return os.path.join(self.shard_dir(key), key + suffix)
+
+    def flat_path(self, key, suffix=""):
+        """Path layout datar lama untuk sebuah key"""
+        return os.path.join(self.base_path, key + suffix)
+
+    def resolve(self, key, suffix=""):
+        """
+        Path tempat entri berada saat ini
+
+        Returns:
+            str: Path ber-shard, atau path datar jika entri belum dimigrasi
+        """
+        sharded = self.path(key, suffix)
+        if not self.flat_fallback or os.path.exists(sharded):
+            return sharded
+        flat = self.flat_path(key, suffix)
+        if os.path.exists(flat):
+            return flat
+        return sharded
+
+    def ensure_dir(self, key):
+        """Buat direktori shard untuk key jika belum ada"""
+        directory = self.shard_dir(key)
+        if directory not in self._known_dirs:
+            os.makedirs(directory, exist_ok=True)
+            # Jumlahnya terbatas (16^(levels*width)), direktori shard tidak pernah dihapus
+            self._known_dirs.add(directory)
+        return directory
+
+    def iter_entries(self, suffix=None, dirs=False):
+        """
+        Iterasi semua entri (ber-shard dan datar)
+
+        Args:
+            suffix (str, optional): Hanya entri dengan akhiran ini (key tanpa akhiran)
+            dirs (bool): True untuk entri berupa direktori, False untuk file
+
+        Yields:
+            tuple: (key, path)
+        """
+        yield from self._iter_level(self.base_path, 0, suffix, dirs)
+
+    def _iter_level(self, directory, depth, suffix, dirs):
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            return
+
+        for entry in entries:
+            name = entry.name
+            if name.startswith('.'):
+                continue
+            is_dir = entry.is_dir()
+            if depth < self.levels and is_dir and self._is_shard_name(name):
+                yield from self._iter_level(entry.path, depth + 1, suffix, dirs)
+            elif is_dir == dirs:
+                if suffix:
+                    if not name.endswith(suffix):
+                        continue
+                    name = name[:-len(suffix)]
+                yield (name, entry.path)
+
+    def _is_shard_name(self, name):
+        if len(name) != self.width:
+            return False
+        return all(c in "0123456789abcdef" for c in name)
+
+    def read_marker(self):
+        """Baca marker layout (kosong jika belum ada)"""
+        try:
+            with open(os.path.join(self.base_path, LAYOUT_MARKER), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def write_marker(self, migrated):
+        """Tulis marker layout; migrated=True mematikan fallback ke layout datar"""
+        with open(os.path.join(self.base_path, LAYOUT_MARKER), 'w', encoding='utf-8') as f:
+            json.dump({"levels": self.levels, "width": self.width, "migrated": migrated}, f)
+        self.flat_fallback = self.levels > 0 and not migrated
+
+    def migrate_file(self, key, flat_path, suffix=""):
+        """
+        Pindahkan satu file dari layout datar ke path ber-shard
+
+        Memakai hard link + unlink: jika penulis sudah membuat versi
+        ber-shard yang lebih baru, link gagal dan file datar lama dibuang.
+
+        Returns:
+            bool: True jika file dipindahkan
+        """
+        target = self.path(key, suffix)
+        self.ensure_dir(key)
+        moved = False
+        try:
+            os.link(flat_path, target)
+            moved = True
+        except FileExistsError:
+            pass
+        except OSError:
+            # Filesystem tanpa hard link: rename hanya jika tujuan belum ada
+            if not os.path.exists(target):
+                os.rename(flat_path, target)
+                return True
+        try:
+            os.remove(flat_path)
+        except FileNotFoundError:
+            pass
+        return moved
+
+    def migrate_dir(self, key, flat_path):
+        """
+        Pindahkan satu direktori entri dari layout datar ke path ber-shard
+
+        Returns:
+            bool: True jika direktori dipindahkan
+        """
+        target = self.path(key)
+        self.ensure_dir(key)
+        if os.path.exists(target):
+            logger.warning(f"Entri {key} sudah ada di layout ber-shard, path datar dilewati")
+            return False
+        os.rename(flat_path, target)
+        return True
@@ -0,0 +1,160 @@
+# Modul shutdown bertahap dan snapshot state untuk restart yang "hangat"
+#
+# Saat proses dihentikan (SIGTERM/SIGINT atau exit biasa) langkah-langkah
+# ShutdownSequence dijalankan berurutan sekali saja: tolak pesan baru, kuras
+# antrean kerja, simpan snapshot, lalu tutup penyimpanan. Snapshot berisi
+# state di memori (konteks pengguna, riwayat percakapan, dokumen yang sedang
+# dimuat) sebagai satu file JSON terkompresi; proses berikutnya memuatnya
+# sekaligus saat startup lalu menghapus file tersebut, sehingga snapshot
+# lama tidak pernah dimuat dua kali (mis. setelah crash).
+import os
+import gzip
+import json
+import time
+import signal
+import logging
+import threading
+
+from session_store import write_atomic
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 1
+
+
+class Snapshotter:
+    def __init__(self, path, max_age=3600):
+        """
+        Args:
+            path (str): File snapshot (.json.gz); kosong = nonaktif
+            max_age (float): Snapshot yang lebih tua dari ini (detik) diabaikan
+        """
+        self.path = path
+        self.max_age = max_age
+        self._providers = {}
+
+    def register(self, name, dump, load):
+        """
+        Daftarkan bagian state
+
+        Args:
+            name (str): Nama bagian di file snapshot
+            dump (callable): dump() -> data yang bisa di-encode JSON
+            load (callable): load(data) -> jumlah item yang dimuat
+        """
+        self._providers[name] = (dump, load)
+
+    def save(self):
+        """
+        Tulis snapshot semua bagian secara atomik
+
+        Returns:
+            int: Ukuran file (byte), 0 jika nonaktif atau gagal
+        """
+        if not self.path:
+            return 0
+        start = time.perf_counter()
+        sections = {}
+        for name, (dump, _) in self._providers.items():
+            try:
+                sections[name] = dump()
+            except Exception as e:
+                logger.error(f"Gagal membuat snapshot {name}: {str(e)}")
+        payload = json.dumps({"format": SNAPSHOT_FORMAT, "created": time.time(), "sections": sections},
+                             ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        data = gzip.compress(payload, compresslevel=1)
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            write_atomic(self.path, data)
+        except OSError as e:
+            logger.error(f"Gagal menulis snapshot {self.path}: {str(e)}")
+            return 0
+        logger.info(f"Snapshot disimpan ke {self.path} ({len(data)} byte, "
+                    f"{(time.perf_counter() - start) * 1000:.1f} ms)")
+        return len(data)
+
+    def restore(self):
+        """
+        Muat snapshot (jika ada dan belum kadaluarsa) lalu hapus filenya
+
+        Returns:
+            dict: Nama bagian -> jumlah item yang dimuat
+        """
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        start = time.perf_counter()
+        try:
+            with open(self.path, 'rb') as f:
+                state = json.loads(gzip.decompress(f.read()))
+        except (OSError, ValueError, EOFError) as e:
+            logger.error(f"Snapshot {self.path} tidak bisa dibaca: {str(e)}")
+            state = None
+        finally:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+        if not state or state.get("format") != SNAPSHOT_FORMAT:
+            return {}
+        age = time.time() - state.get("created", 0)
+        if self.max_age and age > self.max_age:
+            logger.warning(f"Snapshot berumur {age:.0f} detik diabaikan")
+            return {}
+
+        loaded = {}
+        for name, data in state.get("sections", {}).items():
+            provider = self._providers.get(name)
+            if provider is None:
+                continue
+            try:
+                loaded[name] = provider[1](data)
+            except Exception as e:
+                logger.error(f"Gagal memuat snapshot {name}: {str(e)}")
+        logger.info(f"Snapshot dimuat dalam {(time.perf_counter() - start) * 1000:.1f} ms: {loaded}")
+        return loaded
+
+
+class ShutdownSequence:
+    def __init__(self):
+        """Langkah shutdown yang dijalankan berurutan, tepat satu kali"""
+        self._steps = []
+        self._lock = threading.Lock()
+        self._done = False
+        self.stopping = False
+
+    def add(self, name, fn):
+        """Tambahkan langkah; langkah dijalankan sesuai urutan penambahan"""
+        self._steps.append((name, fn))
+
+    def run(self):
+        with self._lock:
+            if self._done:
+                return
+            self._done = True
+            self.stopping = True
+        logger.info("Shutdown dimulai")
+        for name, fn in self._steps:
+            start = time.perf_counter()
+            try:
+                fn()
+            except Exception as e:
+                logger.error(f"Langkah shutdown {name} gagal: {str(e)}")
+            logger.info(f"Langkah shutdown {name} selesai ({(time.perf_counter() - start) * 1000:.0f} ms)")
+
+
+def install_signal_handlers():
+    """
+    Ubah SIGTERM menjadi KeyboardInterrupt di thread utama
+
+    Server Flask berhenti dengan rapi saat KeyboardInterrupt, sehingga
+    blok finally dan handler atexit (termasuk ShutdownSequence) tetap jalan.
+    Tanpa ini SIGTERM menghentikan proses tanpa membersihkan apa pun.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+
+    def handle(signum, frame):
+        raise KeyboardInterrupt(f"signal {signum}")
+
+    signal.signal(signal.SIGTERM, handle)
@@ -0,0 +1,306 @@
+# Modul katalog metadata (SQLite) untuk StorageManager
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id TEXT PRIMARY KEY,
+    user_id TEXT,
+    filename TEXT,
+    created_at REAL NOT NULL,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_documents_created_at ON documents (created_at);
+CREATE INDEX IF NOT EXISTS idx_documents_user_id ON documents (user_id);
+
+CREATE TABLE IF NOT EXISTS sessions (
+    user_id TEXT PRIMARY KEY,
+    last_updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_last_updated ON sessions (last_updated);
+"""
+
+
+class StorageCatalog:
+    def __init__(self, db_path):
+        """
+        Inisialisasi katalog metadata dokumen dan sesi
+
+        Katalog hanya berisi indeks; file di disk tetap menjadi sumber
+        kebenaran sehingga katalog selalu bisa dibangun ulang dengan rebuild().
+
+        Args:
+            db_path (str): Path ke file database SQLite
+        """
+        self.db_path = db_path
+        self.is_new = not os.path.exists(db_path)
+
+        # Satu koneksi dipakai bersama oleh semua thread, dijaga oleh lock
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+        logger.info(f"Katalog penyimpanan dibuka di {db_path}")
+
+    def close(self):
+        """Tutup koneksi database"""
+        with self._lock:
+            self.conn.close()
+
+    # Dokumen
+
+    def upsert_document(self, doc_id, filename, metadata=None):
+        """
+        Tambah atau perbarui entri dokumen
+
+        Args:
+            doc_id (str): ID dokumen
+            filename (str): Nama file dokumen di direktori dokumen
+            metadata (dict, optional): Metadata dokumen
+        """
+        metadata = metadata or {}
+        created_at = metadata.get('created_at') or time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO documents (doc_id, user_id, filename, created_at, metadata) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(doc_id) DO UPDATE SET "
+                "filename = excluded.filename, "
+                "user_id = COALESCE(excluded.user_id, documents.user_id), "
+                "metadata = COALESCE(excluded.metadata, documents.metadata)",
+                (doc_id, metadata.get('user_id'), filename, created_at,
+                 json.dumps(metadata, ensure_ascii=False, separators=(',', ':')) if metadata else None)
+            )
+
+    def upsert_documents_many(self, rows):
+        """
+        Tambah banyak dokumen dalam satu transaksi
+
+        Args:
+            rows (iterable): Tuple (doc_id, user_id, filename, created_at, metadata_json)
+        """
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO documents (doc_id, user_id, filename, created_at, metadata) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def get_document(self, doc_id):
+        """
+        Dapatkan entri dokumen
+
+        Args:
+            doc_id (str): ID dokumen
+
+        Returns:
+            dict: Entri dokumen atau None jika tidak ada di katalog
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT doc_id, user_id, filename, created_at, metadata FROM documents WHERE doc_id = ?",
+                (doc_id,)
+            ).fetchone()
+        return self._document_row(row) if row else None
+
+    def documents_for_user(self, user_id):
+        """
+        Dapatkan semua dokumen milik seorang pengguna (terbaru lebih dulu)
+
+        Args:
+            user_id (str): ID pengguna
+
+        Returns:
+            list: Daftar entri dokumen
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT doc_id, user_id, filename, created_at, metadata FROM documents "
+                "WHERE user_id = ? ORDER BY created_at DESC",
+                (user_id,)
+            ).fetchall()
+        return [self._document_row(row) for row in rows]
+
+    def delete_document(self, doc_id):
+        """Hapus entri dokumen dari katalog"""
+        with self._lock:
+            self.conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+
+    def expired_documents(self, cutoff, limit=None):
+        """
+        Dapatkan ID dokumen yang dibuat sebelum cutoff (range query pada indeks)
+
+        Args:
+            cutoff (float): Timestamp batas
+            limit (int, optional): Jumlah maksimum hasil
+
+        Returns:
+            list: Daftar doc_id
+        """
+        query = "SELECT doc_id FROM documents WHERE created_at < ? ORDER BY created_at"
+        params = [cutoff]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return [row[0] for row in self.conn.execute(query, params)]
+
+    # Sesi
+
+    def upsert_session(self, user_id, last_updated):
+        """Tambah atau perbarui entri sesi"""
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO sessions (user_id, last_updated) VALUES (?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET last_updated = excluded.last_updated",
+                (user_id, last_updated)
+            )
+
+    def delete_session(self, user_id):
+        """Hapus entri sesi dari katalog"""
+        with self._lock:
+            self.conn.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
+
+    def expired_sessions(self, cutoff, limit=None):
+        """
+        Dapatkan ID pengguna yang sesinya terakhir diperbarui sebelum cutoff
+
+        Args:
+            cutoff (float): Timestamp batas
+            limit (int, optional): Jumlah maksimum hasil
+
+        Returns:
+            list: Daftar user_id
+        """
+        query = "SELECT user_id FROM sessions WHERE last_updated < ? ORDER BY last_updated"
+        params = [cutoff]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return [row[0] for row in self.conn.execute(query, params)]
+
+    def document_timestamps(self):
+        """
+        Returns:
+            list: Tuple (doc_id, created_at, user_id) untuk semua dokumen
+        """
+        with self._lock:
+            return self.conn.execute("SELECT doc_id, created_at, user_id FROM documents").fetchall()
+
+    def session_timestamps(self):
+        """
+        Returns:
+            list: Tuple (user_id, last_updated) untuk semua sesi
+        """
+        with self._lock:
+            return self.conn.execute("SELECT user_id, last_updated FROM sessions").fetchall()
+
+    def counts(self):
+        """
+        Returns:
+            tuple: (jumlah dokumen, jumlah sesi) di katalog
+        """
+        with self._lock:
+            documents = self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            sessions = self.conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return (documents, sessions)
+
+    # Rebuild
+
+    def rebuild(self, document_dirs, session_files):
+        """
+        Bangun ulang katalog dari isi direktori dokumen dan sesi
+
+        Args:
+            document_dirs (iterable): Tuple (doc_id, path direktori dokumen)
+            session_files (iterable): Tuple (user_id, path file sesi)
+
+        Returns:
+            tuple: (jumlah dokumen, jumlah sesi) yang diindeks
+        """
+        documents = []
+        for doc_id, doc_dir in document_dirs:
+            try:
+                documents.append(self._scan_document(doc_id, doc_dir))
+            except Exception as e:
+                logger.error(f"Error saat mengindeks dokumen {doc_id}: {str(e)}")
+
+        sessions = []
+        for user_id, file_path in session_files:
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    last_updated = json.load(f).get('last_updated', 0)
+            except Exception as e:
+                logger.error(f"Error saat mengindeks sesi {user_id}: {str(e)}")
+                last_updated = os.path.getmtime(file_path)
+            sessions.append((user_id, last_updated))
+
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.execute("DELETE FROM documents")
+                self.conn.execute("DELETE FROM sessions")
+                self.conn.executemany(
+                    "INSERT INTO documents (doc_id, user_id, filename, created_at, metadata) VALUES (?, ?, ?, ?, ?)",
+                    documents
+                )
+                self.conn.executemany(
+                    "INSERT INTO sessions (user_id, last_updated) VALUES (?, ?)",
+                    sessions
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+        logger.info(f"Katalog dibangun ulang: {len(documents)} dokumen dan {len(sessions)} sesi")
+        return (len(documents), len(sessions))
+
+    def _scan_document(self, doc_id, doc_dir):
+        metadata = None
+        filename = None
+        for file in sorted(os.listdir(doc_dir)):
+            if file == "metadata.json":
+                with open(os.path.join(doc_dir, file), 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+            elif filename is None:
+                filename = file
+
+        if metadata and metadata.get('created_at'):
+            created_at = metadata['created_at']
+        else:
+            # Jika tidak ada metadata, gunakan waktu modifikasi dir
+            created_at = os.path.getmtime(doc_dir)
+
+        return (
+            doc_id,
+            (metadata or {}).get('user_id'),
+            filename,
+            created_at,
+            json.dumps(metadata, ensure_ascii=False, separators=(',', ':')) if metadata else None
+        )
+
+    @staticmethod
+    def _document_row(row):
+        return {
+            "doc_id": row[0],
+            "user_id": row[1],
+            "filename": row[2],
+            "created_at": row[3],
+            "metadata": json.loads(row[4]) if row[4] else None
+        }
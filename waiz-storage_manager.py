@@ -6,16 +6,45 @@ import shutil
 import uuid
 import time
 from datetime import datetime, timedelta
+from storage_catalog import StorageCatalog
+from expiry_scheduler import ExpiryScheduler
+from session_store import create_session_store
+from session_cache import SessionCache
+from sharding import ShardedLayout
+import metrics
+import profiler
 
 logger = logging.getLogger(__name__)
 
+STORAGE_SECONDS = metrics.histogram(
+    "waiz_storage_operation_seconds", "Durasi operasi penyimpanan", ("operation",))
+STORAGE_ERRORS = metrics.counter(
+    "waiz_storage_errors_total", "Jumlah operasi penyimpanan yang gagal", ("operation",))
+EXPIRED_TOTAL = metrics.counter(
+    "waiz_storage_expired_total", "Jumlah entri yang dihapus karena kadaluarsa", ("kind",))
+SESSIONS_CACHED = metrics.gauge("waiz_session_cache_entries", "Jumlah sesi di cache write-behind")
+SESSIONS_DIRTY = metrics.gauge("waiz_session_cache_dirty", "Jumlah sesi di cache yang belum ditulis")
+
 class StorageManager:
-    def __init__(self, storage_path):
+    def __init__(self, storage_path, use_catalog=True, session_mode="atomic", session_fsync=True,
+                 session_cache_size=0, session_flush_interval=1.0, session_dirty_threshold=100,
+                 shard_levels=2, session_wal_name=None):
         """
         Inisialisasi Storage Manager
         
         Args:
             storage_path (str): Path direktori untuk menyimpan data sementara
+            use_catalog (bool): Gunakan katalog SQLite untuk lookup dan cleanup
+                alih-alih memindai direktori
+            session_mode (str): 'atomic' (file per sesi, ditulis atomik) atau
+                'wal' (write-ahead log dengan group commit)
+            session_fsync (bool): Paksa penulisan sesi ke disk
+            session_cache_size (int): Jumlah sesi di cache write-behind (0 = tanpa cache)
+            session_flush_interval (float): Jeda maksimum sebelum sesi di cache ditulis (detik)
+            session_dirty_threshold (int): Jumlah sesi dirty yang memicu flush lebih awal
+            shard_levels (int): Jumlah level shard direktori dokumen dan sesi (0 = datar)
+            session_wal_name (str, optional): Nama file WAL sesi; setiap proses
+                yang berbagi direktori penyimpanan harus memakai WAL sendiri
         """
         self.storage_path = storage_path
         os.makedirs(storage_path, exist_ok=True)
@@ -28,8 +57,176 @@ class StorageManager:
         self.sessions_path = os.path.join(storage_path, "sessions")
         os.makedirs(self.sessions_path, exist_ok=True)
         
+        # Layout ber-shard (documents/ab/cd/<doc_id>, sessions/ab/cd/<user_id>.json)
+        self.document_layout = ShardedLayout(self.documents_path, shard_levels)
+        self.session_layout = ShardedLayout(self.sessions_path, shard_levels)
+        
+        # Persistensi sesi yang aman terhadap crash
+        self.session_store = create_session_store(
+            self.sessions_path, session_mode, session_fsync, self.session_layout, session_wal_name
+        )
+        
+        # Cache write-behind di depan penyimpanan sesi (opsional)
+        self.session_cache = None
+        if session_cache_size > 0:
+            self.session_cache = SessionCache(
+                self.session_store.load,
+                self._persist_session,
+                self.session_store.delete,
+                max_entries=session_cache_size,
+                flush_interval=session_flush_interval,
+                dirty_threshold=session_dirty_threshold
+            )
+            SESSIONS_CACHED.set_function(lambda: len(self.session_cache))
+            SESSIONS_DIRTY.set_function(self.session_cache.dirty_count)
+        
+        # Penjadwal kadaluarsa (aktif setelah start_expiry_scheduler dipanggil)
+        self.expiry = None
+        self.session_ttl = 3600
+        self.document_ttl = 86400
+        
+        # Dipanggil dengan (doc_id, doc_dir) setelah direktori dokumen dihapus
+        self._document_listeners = []
+        
+        # Katalog metadata terindeks (dibangun ulang dari disk jika baru)
+        self.catalog = None
+        if use_catalog:
+            self.catalog = StorageCatalog(os.path.join(storage_path, "catalog.db"))
+            if self.catalog.is_new:
+                self.rebuild_catalog()
+        
         logger.info(f"Storage Manager diinisialisasi di {storage_path}")
 
+    def rebuild_catalog(self):
+        """
+        Bangun ulang katalog dari isi direktori penyimpanan
+        
+        Returns:
+            tuple: (jumlah dokumen, jumlah sesi) yang diindeks
+        """
+        if not self.catalog:
+            return (0, 0)
+        # Pastikan semua sesi di cache dan WAL sudah ada di file sebelum dipindai
+        self.flush_sessions()
+        self.session_store.checkpoint()
+        return self.catalog.rebuild(
+            self.document_layout.iter_entries(dirs=True),
+            self.session_layout.iter_entries('.json')
+        )
+
+    def start_expiry_scheduler(self, session_ttl=3600, document_ttl=86400, interval=1.0, batch_size=100,
+                               owner=None):
+        """
+        Mulai penghapusan otomatis sesi dan dokumen yang kadaluarsa
+        
+        Entri didaftarkan saat disimpan dan diperpanjang saat diakses. Data
+        yang sudah ada di penyimpanan didaftarkan sekali saat start.
+        
+        Args:
+            session_ttl (int): Time to live sesi dalam detik sejak akses terakhir
+            document_ttl (int): Time to live dokumen dalam detik sejak akses terakhir
+            interval (float): Jeda maksimum antar pemeriksaan (detik)
+            batch_size (int): Jumlah maksimum entri yang dihapus per batch
+            owner (callable, optional): owner(user_id) -> bool; jika diisi, hanya
+                sesi dan dokumen milik pengguna yang dilayani proses ini yang
+                didaftarkan saat start (mode cluster: setiap worker menghapus
+                datanya sendiri lewat cache dan model di memorinya)
+        """
+        if self.expiry is not None:
+            return
+        
+        self.session_ttl = session_ttl
+        self.document_ttl = document_ttl
+        self.expiry = ExpiryScheduler(self._delete_expired, interval, batch_size)
+        
+        if self.catalog:
+            sessions = self.catalog.session_timestamps()
+            documents = self.catalog.document_timestamps()
+        else:
+            sessions = [
+                (user_id, os.path.getmtime(path))
+                for user_id, path in self.session_layout.iter_entries('.json')
+            ]
+            documents = [
+                (doc_id, os.path.getmtime(path), self._document_owner(path) if owner is not None else None)
+                for doc_id, path in self.document_layout.iter_entries(dirs=True)
+            ]
+        
+        for user_id, last_updated in sessions:
+            if owner is None or owner(user_id):
+                self.expiry.schedule(('session', user_id), deadline=last_updated + session_ttl)
+        for doc_id, created_at, user_id in documents:
+            if owner is None or owner(user_id):
+                self.expiry.schedule(('document', doc_id), deadline=created_at + document_ttl)
+        
+        self.expiry.start()
+    
+    @staticmethod
+    def _document_owner(doc_dir):
+        try:
+            with open(os.path.join(doc_dir, "metadata.json"), 'r', encoding='utf-8') as f:
+                return json.load(f).get("user_id")
+        except (OSError, ValueError):
+            return None
+    
+    def stop_expiry_scheduler(self):
+        """Hentikan penghapusan otomatis"""
+        if self.expiry is not None:
+            self.expiry.stop()
+            self.expiry = None
+    
+    def _delete_expired(self, keys):
+        """Callback penjadwal: hapus satu batch entri yang jatuh tempo"""
+        sessions_deleted = 0
+        documents_deleted = 0
+        for kind, item_id in keys:
+            if self.expiry is not None and self.expiry.is_scheduled((kind, item_id)):
+                # Didaftarkan ulang setelah jatuh tempo, jangan dihapus
+                continue
+            if kind == 'session':
+                self.clear_session_data(item_id)
+                sessions_deleted += 1
+            elif kind == 'document':
+                if self.delete_document(item_id):
+                    documents_deleted += 1
+        EXPIRED_TOTAL.labels("session").inc(sessions_deleted)
+        EXPIRED_TOTAL.labels("document").inc(documents_deleted)
+        logger.info(f"Kadaluarsa: {sessions_deleted} sesi dan {documents_deleted} dokumen dihapus")
+    
+    def _touch(self, kind, item_id, ttl):
+        if self.expiry is not None:
+            self.expiry.touch((kind, item_id), ttl)
+    
+    def touch_document(self, doc_id):
+        """Perpanjang masa hidup dokumen yang sedang dipakai (dibaca atau diedit)"""
+        self._touch('document', doc_id, self.document_ttl)
+    
+    def subscribe_document_deleted(self, callback):
+        """
+        Daftarkan callback(doc_id, doc_dir) yang dipanggil setelah dokumen dihapus
+        
+        Dipakai pemegang state dokumen di memori (model, indeks, cache ekspor)
+        agar dokumen yang dihapus karena kadaluarsa tidak tetap dipakai.
+        """
+        self._document_listeners.append(callback)
+    
+    def _document_removed(self, doc_id, doc_dir):
+        for callback in self._document_listeners:
+            try:
+                callback(doc_id, doc_dir)
+            except Exception as e:
+                logger.error(f"Error pada callback penghapusan dokumen {doc_id}: {str(e)}")
+    
+    def close(self):
+        """Tutup sumber daya penyimpanan"""
+        self.stop_expiry_scheduler()
+        if self.session_cache is not None:
+            self.session_cache.close()
+        self.session_store.close()
+        if self.catalog:
+            self.catalog.close()
+
+    @STORAGE_SECONDS.labels("document_save").time()
     def save_document(self, doc_id, file_path, metadata=None):
         """
         Simpan dokumen ke penyimpanan
@@ -43,7 +240,7 @@ class StorageManager:
             str: Path ke file dokumen yang disimpan
         """
         # Buat direktori untuk dokumen jika belum ada
-        doc_dir = os.path.join(self.documents_path, doc_id)
+        doc_dir = self.document_dir(doc_id)
         os.makedirs(doc_dir, exist_ok=True)
         
         # Tentukan nama file dan path tujuan
@@ -53,14 +250,54 @@ class StorageManager:
         # Salin file ke direktori tujuan
         shutil.copy2(file_path, dest_path)
         
+        self.register_document(doc_id, filename, metadata)
+        
+        logger.info(f"Dokumen {doc_id} disimpan ke {dest_path}")
+        return dest_path
+    
+    @STORAGE_SECONDS.labels("document_register").time()
+    def register_document(self, doc_id, filename, metadata=None):
+        """
+        Daftarkan file yang sudah ada di direktori dokumen
+        
+        Dipakai oleh penulis yang membuat file langsung di document_dir()
+        (misalnya log dokumen dan hasil ekspor) tanpa menyalin file.
+        
+        Args:
+            doc_id (str): ID dokumen
+            filename (str): Nama file di direktori dokumen
+            metadata (dict, optional): Metadata dokumen
+        
+        Returns:
+            str: Path direktori dokumen
+        """
+        doc_dir = self.document_dir(doc_id)
+        os.makedirs(doc_dir, exist_ok=True)
+        
         # Simpan metadata jika disediakan
         if metadata:
             metadata_path = os.path.join(doc_dir, "metadata.json")
             with open(metadata_path, 'w', encoding='utf-8') as f:
                 json.dump(metadata, f, ensure_ascii=False, indent=2)
         
-        logger.info(f"Dokumen {doc_id} disimpan ke {dest_path}")
-        return dest_path
+        if self.catalog:
+            self.catalog.upsert_document(doc_id, filename, metadata)
+        if self.expiry is not None:
+            self.expiry.schedule(('document', doc_id), ttl=self.document_ttl)
+        
+        return doc_dir
+    
+    def document_dir(self, doc_id):
+        """
+        Dapatkan direktori dokumen (ber-shard, atau datar jika belum dimigrasi)
+        
+        Args:
+            doc_id (str): ID dokumen
+        
+        Returns:
+            str: Path direktori dokumen
+        """
+        return self.document_layout.resolve(doc_id)
     
     def get_document_path(self, doc_id, filename=None):
         """
@@ -73,7 +310,21 @@ class StorageManager:
         Returns:
             str: Path ke dokumen atau None jika tidak ditemukan
         """
-        doc_dir = os.path.join(self.documents_path, doc_id)
+        doc_dir = self.document_dir(doc_id)
+        self._touch('document', doc_id, self.document_ttl)
+        
+        if self.catalog:
+            # Lookup terindeks, tanpa os.listdir
+            entry = self.catalog.get_document(doc_id)
+            if not entry:
+                logger.warning(f"Dokumen {doc_id} tidak ditemukan di katalog")
+                return None
+            filename = filename or entry['filename']
+            file_path = os.path.join(doc_dir, filename) if filename else None
+            if file_path and os.path.exists(file_path):
+                return file_path
+            logger.warning(f"File {filename} tidak ditemukan di dokumen {doc_id}")
+            return None
         
         if not os.path.exists(doc_dir):
             logger.warning(f"Direktori dokumen {doc_id} tidak ditemukan")
@@ -105,7 +356,14 @@ class StorageManager:
         Returns:
             dict: Metadata dokumen atau None jika tidak ditemukan
         """
-        metadata_path = os.path.join(self.documents_path, doc_id, "metadata.json")
+        self._touch('document', doc_id, self.document_ttl)
+        
+        if self.catalog:
+            entry = self.catalog.get_document(doc_id)
+            if entry and entry['metadata'] is not None:
+                return entry['metadata']
+        
+        metadata_path = os.path.join(self.document_dir(doc_id), "metadata.json")
         
         if os.path.exists(metadata_path):
             try:
@@ -118,6 +376,7 @@ class StorageManager:
             logger.warning(f"Metadata untuk dokumen {doc_id} tidak ditemukan")
             return None
     
+    @STORAGE_SECONDS.labels("document_delete").time()
     def delete_document(self, doc_id):
         """
         Hapus dokumen dan semua file terkait
@@ -128,11 +387,16 @@ class StorageManager:
         Returns:
             bool: True jika berhasil dihapus, False jika tidak
         """
-        doc_dir = os.path.join(self.documents_path, doc_id)
+        doc_dir = self.document_dir(doc_id)
         
         if os.path.exists(doc_dir):
             try:
                 shutil.rmtree(doc_dir)
+                if self.catalog:
+                    self.catalog.delete_document(doc_id)
+                if self.expiry is not None:
+                    self.expiry.cancel(('document', doc_id))
+                self._document_removed(doc_id, doc_dir)
                 logger.info(f"Dokumen {doc_id} berhasil dihapus")
                 return True
             except Exception as e:
@@ -142,6 +406,7 @@ class StorageManager:
             logger.warning(f"Dokumen {doc_id} tidak ditemukan untuk dihapus")
             return False
     
+    @STORAGE_SECONDS.labels("session_save").time()
     def save_session_data(self, user_id, data):
         """
         Simpan data sesi pengguna
@@ -156,17 +421,54 @@ class StorageManager:
         # Tambahkan timestamp untuk TTL
         data['last_updated'] = datetime.now().timestamp()
         
-        session_file = os.path.join(self.sessions_path, f"{user_id}.json")
-        
         try:
-            with open(session_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            if self.session_cache is not None:
+                self.session_cache.put(user_id, data)
+            else:
+                self._persist_session(user_id, data)
+            if self.expiry is not None:
+                self.expiry.schedule(('session', user_id), ttl=self.session_ttl)
             logger.debug(f"Data sesi untuk {user_id} berhasil disimpan")
             return True
         except Exception as e:
+            STORAGE_ERRORS.labels("session_save").inc()
             logger.error(f"Error menyimpan data sesi untuk {user_id}: {str(e)}")
             return False
     
+    def flush_sessions(self):
+        """
+        Tulis semua sesi di cache write-behind ke penyimpanan
+        
+        Returns:
+            int: Jumlah sesi yang ditulis
+        """
+        if self.session_cache is None:
+            return 0
+        return self.session_cache.flush()
+    
+    @STORAGE_SECONDS.labels("session_write").time()
+    def _persist_session(self, user_id, data):
+        """Tulis sesi ke penyimpanan dan perbarui katalog"""
+        self.session_store.save(user_id, data)
+        if self.catalog:
+            self.catalog.upsert_session(user_id, data['last_updated'])
+    
+    def _load_session(self, user_id):
+        if self.session_cache is not None:
+            return self.session_cache.get(user_id)
+        return self.session_store.load(user_id)
+    
+    def _delete_session(self, user_id):
+        if self.session_cache is not None:
+            return self.session_cache.delete(user_id)
+        return self.session_store.delete(user_id)
+    
+    def _session_exists(self, user_id):
+        if self.session_cache is not None:
+            return self.session_cache.exists(user_id)
+        return self.session_store.exists(user_id)
+    
+    @STORAGE_SECONDS.labels("session_load").time()
     def get_session_data(self, user_id):
         """
         Dapatkan data sesi pengguna
@@ -177,21 +479,23 @@ class StorageManager:
         Returns:
             dict: Data sesi atau empty dict jika tidak ada
         """
-        session_file = os.path.join(self.sessions_path, f"{user_id}.json")
+        self._touch('session', user_id, self.session_ttl)
         
-        if os.path.exists(session_file):
-            try:
-                with open(session_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                logger.debug(f"Data sesi untuk {user_id} berhasil dimuat")
-                return data
-            except Exception as e:
-                logger.error(f"Error membaca data sesi untuk {user_id}: {str(e)}")
-                return {}
-        else:
+        try:
+            data = self._load_session(user_id)
+        except Exception as e:
+            STORAGE_ERRORS.labels("session_load").inc()
+            logger.error(f"Error membaca data sesi untuk {user_id}: {str(e)}")
+            return {}
+        
+        if data is None:
             logger.debug(f"Tidak ada data sesi untuk {user_id}")
             return {}
+        
+        logger.debug(f"Data sesi untuk {user_id} berhasil dimuat")
+        return data
     
+    @STORAGE_SECONDS.labels("session_delete").time()
     def clear_session_data(self, user_id):
         """
         Hapus data sesi pengguna
@@ -202,11 +506,13 @@ class StorageManager:
         Returns:
             bool: True jika berhasil dihapus
         """
-        session_file = os.path.join(self.sessions_path, f"{user_id}.json")
-        
-        if os.path.exists(session_file):
+        if self._session_exists(user_id):
             try:
-                os.remove(session_file)
+                self._delete_session(user_id)
+                if self.catalog:
+                    self.catalog.delete_session(user_id)
+                if self.expiry is not None:
+                    self.expiry.cancel(('session', user_id))
                 logger.debug(f"Data sesi untuk {user_id} berhasil dihapus")
                 return True
             except Exception as e:
@@ -216,6 +522,7 @@ class StorageManager:
             logger.debug(f"Tidak ada data sesi untuk {user_id} yang perlu dihapus")
             return True
     
+    @profiler.tag("storage.cleanup_expired_data")
     def cleanup_expired_data(self, session_ttl=3600, document_ttl=86400):
         """
         Bersihkan data sesi dan dokumen yang sudah kadaluarsa
@@ -227,29 +534,28 @@ class StorageManager:
         Returns:
             tuple: (jumlah sesi dihapus, jumlah dokumen dihapus)
         """
+        if self.catalog:
+            return self._cleanup_by_catalog(session_ttl, document_ttl)
+        
         now = datetime.now().timestamp()
         sessions_deleted = 0
         documents_deleted = 0
         
         # Cleanup sesi
-        for filename in os.listdir(self.sessions_path):
-            if filename.endswith('.json'):
-                file_path = os.path.join(self.sessions_path, filename)
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                    
-                    last_updated = data.get('last_updated', 0)
-                    if now - last_updated > session_ttl:
-                        os.remove(file_path)
-                        sessions_deleted += 1
-                        logger.debug(f"Sesi kadaluarsa {filename} dihapus")
-                except Exception as e:
-                    logger.error(f"Error saat cleanup sesi {filename}: {str(e)}")
+        for user_id, _ in list(self.session_layout.iter_entries('.json')):
+            try:
+                data = self._load_session(user_id) or {}
+                
+                last_updated = data.get('last_updated', 0)
+                if now - last_updated > session_ttl:
+                    self._delete_session(user_id)
+                    sessions_deleted += 1
+                    logger.debug(f"Sesi kadaluarsa {user_id} dihapus")
+            except Exception as e:
+                logger.error(f"Error saat cleanup sesi {user_id}: {str(e)}")
         
         # Cleanup dokumen
-        for doc_id in os.listdir(self.documents_path):
-            doc_dir = os.path.join(self.documents_path, doc_id)
+        for doc_id, doc_dir in list(self.document_layout.iter_entries(dirs=True)):
             if os.path.isdir(doc_dir):
                 metadata_path = os.path.join(doc_dir, "metadata.json")
                 try:
@@ -260,6 +566,7 @@ class StorageManager:
                         created_at = metadata.get('created_at', 0)
                         if now - created_at > document_ttl:
                             shutil.rmtree(doc_dir)
+                            self._document_removed(doc_id, doc_dir)
                             documents_deleted += 1
                             logger.debug(f"Dokumen kadaluarsa {doc_id} dihapus")
                     else:
@@ -267,6 +574,7 @@ class StorageManager:
                         dir_mtime = os.path.getmtime(doc_dir)
                         if now - dir_mtime > document_ttl:
                             shutil.rmtree(doc_dir)
+                            self._document_removed(doc_id, doc_dir)
                             documents_deleted += 1
                             logger.debug(f"Dokumen kadaluarsa {doc_id} dihapus (berdasarkan mtime)")
                 except Exception as e:
@@ -274,3 +582,36 @@ class StorageManager:
         
         logger.info(f"Cleanup: {sessions_deleted} sesi dan {documents_deleted} dokumen dihapus")
         return (sessions_deleted, documents_deleted)
+    
+    def _cleanup_by_catalog(self, session_ttl, document_ttl):
+        """Cleanup dengan range query pada katalog, tanpa memindai direktori"""
+        now = datetime.now().timestamp()
+        sessions_deleted = 0
+        documents_deleted = 0
+        
+        for user_id in self.catalog.expired_sessions(now - session_ttl):
+            if self.session_cache is not None and self.session_cache.is_dirty(user_id):
+                # Diperbarui di cache tapi belum ditulis, belum kadaluarsa
+                continue
+            try:
+                self._delete_session(user_id)
+                self.catalog.delete_session(user_id)
+                sessions_deleted += 1
+                logger.debug(f"Sesi kadaluarsa {user_id} dihapus")
+            except Exception as e:
+                logger.error(f"Error saat cleanup sesi {user_id}: {str(e)}")
+        
+        for doc_id in self.catalog.expired_documents(now - document_ttl):
+            doc_dir = self.document_dir(doc_id)
+            try:
+                if os.path.isdir(doc_dir):
+                    shutil.rmtree(doc_dir)
+                self.catalog.delete_document(doc_id)
+                self._document_removed(doc_id, doc_dir)
+                documents_deleted += 1
+                logger.debug(f"Dokumen kadaluarsa {doc_id} dihapus")
+            except Exception as e:
+                logger.error(f"Error saat cleanup dokumen {doc_id}: {str(e)}")
+        
+        logger.info(f"Cleanup: {sessions_deleted} sesi dan {documents_deleted} dokumen dihapus")
+        return (sessions_deleted, documents_deleted)
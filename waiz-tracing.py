@@ -0,0 +1,312 @@
+# Modul tracing ringan: satu trace per pesan masuk dengan span bersarang
+#
+# Span dicatat untuk setiap trace (murah: satu objek per span), lalu saat
+# trace selesai diputuskan apakah disimpan di ring buffer: trace tersampel,
+# trace lambat (>= slow_ms), dan trace dengan error selalu disimpan.
+import time
+import uuid
+import random
+import logging
+import threading
+import contextvars
+from collections import deque
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar("waiz_current_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "trace", "parent", "start", "end", "attributes", "children", "error")
+
+    def __init__(self, name, trace, parent=None, attributes=None):
+        self.name = name
+        self.trace = trace
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.end = None
+        self.attributes = attributes or {}
+        self.children = []
+        self.error = None
+
+    @property
+    def duration(self):
+        end = self.end if self.end is not None else time.perf_counter()
+        return end - self.start
+
+    def to_dict(self, origin):
+        data = {
+            "name": self.name,
+            "offset_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+        }
+        if self.attributes:
+            data["attributes"] = self.attributes
+        if self.error:
+            data["error"] = self.error
+        if self.children:
+            data["children"] = [child.to_dict(origin) for child in self.children]
+        return data
+
+
+class Trace:
+    __slots__ = ("trace_id", "started_at", "root", "span_count", "dropped_spans", "error")
+
+    def __init__(self, trace_id, name, attributes=None):
+        self.trace_id = trace_id
+        self.started_at = time.time()
+        self.root = Span(name, self, attributes=attributes)
+        self.span_count = 1
+        self.dropped_spans = 0
+        self.error = False
+
+    @property
+    def duration(self):
+        return self.root.duration
+
+    def summary(self):
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3),
+            "spans": self.span_count,
+            "error": self.error,
+        }
+
+    def to_dict(self):
+        data = self.summary()
+        if self.dropped_spans:
+            data["dropped_spans"] = self.dropped_spans
+        data["root"] = self.root.to_dict(self.root.start)
+        return data
+
+
+class _SpanContext:
+    __slots__ = ("_tracer", "_name", "_attributes", "_trace_id", "_span", "_token")
+
+    def __init__(self, tracer, name, attributes, trace_id=None):
+        self._tracer = tracer
+        self._name = name
+        self._attributes = attributes
+        self._trace_id = trace_id
+        self._span = None
+        self._token = None
+
+    def __enter__(self):
+        if self._trace_id is not None:
+            self._span = Trace(self._trace_id, self._name, self._attributes).root
+        else:
+            self._span = self._tracer._child_span(self._name, self._attributes)
+        if self._span is not None:
+            self._token = _current.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        span = self._span
+        if span is None:
+            return False
+        span.end = time.perf_counter()
+        if exc is not None:
+            span.error = f"{exc_type.__name__}: {exc}"
+            span.trace.error = True
+        _current.reset(self._token)
+        if span.parent is None:
+            self._tracer._finish(span.trace)
+        return False
+
+
+class Tracer:
+    def __init__(self, sample_rate=0.1, buffer_size=200, slow_ms=2000, max_spans=256):
+        """
+        Inisialisasi tracer
+
+        Args:
+            sample_rate (float): Peluang trace biasa disimpan (0..1)
+            buffer_size (int): Jumlah trace terakhir yang disimpan
+            slow_ms (float): Trace selama ini atau lebih selalu disimpan
+            max_spans (int): Batas span per trace
+        """
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.max_spans = max_spans
+        self._buffer = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self.finished = 0
+        self.kept = 0
+
+    def configure(self, sample_rate=None, buffer_size=None, slow_ms=None):
+        """Ubah parameter tracer (mis. setelah konfigurasi dimuat ulang)"""
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+        if buffer_size is not None and buffer_size != self._buffer.maxlen:
+            with self._lock:
+                self._buffer = deque(self._buffer, maxlen=buffer_size)
+
+    def start_trace(self, name, trace_id=None, **attributes):
+        """
+        Buka trace baru (context manager); span di dalamnya menjadi anaknya
+
+        Args:
+            name (str): Nama span akar
+            trace_id (str, optional): ID trace (mis. message_id WhatsApp)
+            **attributes: Atribut span akar
+
+        Returns:
+            _SpanContext: Context manager yang menghasilkan span akar
+        """
+        return _SpanContext(self, name, attributes, trace_id or uuid.uuid4().hex)
+
+    def span(self, name, **attributes):
+        """
+        Buka span anak dari span aktif; tanpa trace aktif tidak mencatat apa pun
+
+        Returns:
+            _SpanContext: Context manager yang menghasilkan span (atau None)
+        """
+        return _SpanContext(self, name, attributes)
+
+    def traced(self, name=None):
+        """Decorator: jalankan fungsi di dalam span"""
+        def decorator(function):
+            span_name = name or function.__qualname__
+
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if _current.get() is None:
+                    return function(*args, **kwargs)
+                with _SpanContext(self, span_name, None):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _child_span(self, name, attributes):
+        parent = _current.get()
+        if parent is None:
+            return None
+        trace = parent.trace
+        if trace.span_count >= self.max_spans:
+            trace.dropped_spans += 1
+            return None
+        span = Span(name, trace, parent, attributes)
+        parent.children.append(span)
+        trace.span_count += 1
+        return span
+
+    def _finish(self, trace):
+        keep = (trace.error
+                or trace.duration * 1000 >= self.slow_ms
+                or random.random() < self.sample_rate)
+        with self._lock:
+            self.finished += 1
+            if keep:
+                self.kept += 1
+                self._buffer.append(trace)
+
+    def recent(self, limit=20):
+        """
+        Returns:
+            list: Trace terbaru (terbaru lebih dulu)
+        """
+        with self._lock:
+            traces = list(self._buffer)
+        return traces[::-1][:limit]
+
+    def slowest(self, limit=20, min_ms=0):
+        """
+        Returns:
+            list: Trace paling lambat di buffer (paling lambat lebih dulu)
+        """
+        with self._lock:
+            traces = list(self._buffer)
+        traces = [trace for trace in traces if trace.duration * 1000 >= min_ms]
+        traces.sort(key=lambda trace: trace.duration, reverse=True)
+        return traces[:limit]
+
+    def get(self, trace_id):
+        with self._lock:
+            for trace in self._buffer:
+                if trace.trace_id == trace_id:
+                    return trace
+        return None
+
+
+def annotate(**attributes):
+    """Tambahkan atribut ke span aktif (tidak melakukan apa pun tanpa trace)"""
+    span = _current.get()
+    if span is not None:
+        span.attributes.update(attributes)
+
+
+def current_trace_id():
+    """
+    Returns:
+        str: ID trace aktif atau None
+    """
+    span = _current.get()
+    return span.trace.trace_id if span is not None else None
+
+
+TRACER = Tracer()
+
+
+def start_trace(name, trace_id=None, **attributes):
+    return TRACER.start_trace(name, trace_id, **attributes)
+
+
+def span(name, **attributes):
+    return TRACER.span(name, **attributes)
+
+
+def traced(name=None):
+    return TRACER.traced(name)
+
+
+def register_flask(app, token, path="/debug/traces", tracer=None):
+    """
+    Tambahkan endpoint daftar trace paling lambat ke aplikasi Flask
+
+    Query: ?limit=20&min_ms=0&order=slowest|recent&trace_id=...
+
+    Trace memuat ID pesan WhatsApp dan pesan error, jadi endpoint dilindungi
+    token debug yang sama dengan /debug/memory.
+
+    Args:
+        token (callable): token() -> token debug yang berlaku saat ini
+    """
+    from flask import request, jsonify
+    from diagnostics import debug_authorized
+    tracer = tracer or TRACER
+
+    def traces_endpoint():
+        if not debug_authorized(request, token()):
+            return jsonify({"status": "error", "message": "Tidak diizinkan"}), 403
+        trace_id = request.args.get('trace_id')
+        if trace_id:
+            trace = tracer.get(trace_id)
+            if trace is None:
+                return jsonify({"status": "error", "message": "Trace tidak ditemukan"}), 404
+            return jsonify(trace.to_dict())
+
+        try:
+            limit = int(request.args.get('limit', 20))
+            min_ms = float(request.args.get('min_ms', 0))
+        except ValueError:
+            return jsonify({"status": "error", "message": "Parameter tidak valid"}), 400
+
+        if request.args.get('order') == 'recent':
+            traces = tracer.recent(limit)
+        else:
+            traces = tracer.slowest(limit, min_ms)
+        return jsonify({
+            "finished": tracer.finished,
+            "kept": tracer.kept,
+            "sample_rate": tracer.sample_rate,
+            "slow_ms": tracer.slow_ms,
+            "traces": [trace.to_dict() for trace in traces],
+        })
+
+    app.add_url_rule(path, "debug_traces", traces_endpoint, methods=["GET"])
@@ -0,0 +1,260 @@
+# Modul perekam trafik webhook (payload dianonimkan) untuk replay dan benchmark
+#
+# Format file: gzip multi-member yang hanya ditambah (append-only). Setiap
+# flush menulis satu member berisi baris JSON {"t": epoch_ms, "p": payload}.
+# gzip.open membaca semua member sebagai satu aliran; member terakhir yang
+# terpotong (mis. proses mati saat menulis) diabaikan oleh read_records().
+import os
+import re
+import gzip
+import hmac
+import json
+import time
+import queue
+import random
+import hashlib
+import logging
+import secrets
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Kunci payload WhatsApp yang berisi nomor telepon
+PHONE_KEYS = frozenset({"from", "wa_id", "to", "recipient_id", "display_phone_number", "input", "phone"})
+# Kunci yang berisi teks bebas dari pengguna
+TEXT_KEYS = frozenset({"body", "caption", "name", "title", "description"})
+# Kunci yang berisi ID (pesan, media, akun)
+ID_KEYS = frozenset({"id", "phone_number_id", "media_id", "context_id"})
+# Bagian payload dari pengguna: semua nilai di dalamnya disamarkan kecuali
+# kunci struktural di bawah (default-deny, termasuk jenis pesan yang baru)
+PRIVATE_SECTIONS = frozenset({"messages", "contacts"})
+STRUCTURAL_KEYS = frozenset({"type", "timestamp", "mime_type", "sha256", "status", "messaging_product",
+                             "voice", "animated", "code"})
+
+_WORD = re.compile(r"[^\W\d_]+|\d+", re.UNICODE)
+_ID_PREFIX = re.compile(r"^([A-Za-z]+[.:_-])")
+_LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+class Anonymizer:
+    def __init__(self, salt, keep_words=()):
+        """
+        Anonimisasi deterministik: nilai yang sama selalu menjadi samaran yang
+        sama (untuk salt yang sama), sehingga alur percakapan, pencarian, dan
+        edit tetap bisa diputar ulang.
+
+        Args:
+            salt (str|bytes): Kunci HMAC rahasia
+            keep_words (iterable): Kata yang dipertahankan (kata kunci intent)
+        """
+        self._key = salt.encode("utf-8") if isinstance(salt, str) else salt
+        self.keep_words = frozenset(word.lower() for word in keep_words)
+        self._cache = {}
+
+    def _digest(self, kind, value):
+        cache_key = (kind, value)
+        digest = self._cache.get(cache_key)
+        if digest is None:
+            digest = hmac.new(self._key, f"{kind}:{value}".encode("utf-8"), hashlib.sha256).digest()
+            if len(self._cache) < 100000:
+                self._cache[cache_key] = digest
+        return digest
+
+    def phone(self, value):
+        """Samarkan nomor telepon; kode negara (2 digit) dan panjang dipertahankan"""
+        value = str(value)
+        digits = self._digest("phone", value)
+        prefix = value[:2] if value[:2].isdigit() else ""
+        body = "".join(str(digits[i % len(digits)] % 10) for i in range(len(value) - len(prefix)))
+        return prefix + body
+
+    def identifier(self, value):
+        """Samarkan ID; prefiks seperti 'wamid.' dipertahankan"""
+        value = str(value)
+        match = _ID_PREFIX.match(value)
+        prefix = match.group(1) if match else ""
+        return prefix + self._digest("id", value).hex()[:max(8, min(32, len(value) - len(prefix)))]
+
+    def _word(self, word):
+        if word.isdigit():
+            digest = self._digest("num", word)
+            return "".join(str(digest[i % len(digest)] % 10) for i in range(len(word)))
+        lower = word.lower()
+        if lower in self.keep_words:
+            return word
+        digest = self._digest("word", lower)
+        pseudo = "".join(_LETTERS[digest[i % len(digest)] % 26] for i in range(len(word)))
+        if word[0].isupper():
+            pseudo = pseudo.upper() if word.isupper() and len(word) > 1 else pseudo.capitalize()
+        return pseudo
+
+    def text(self, value):
+        """Samarkan teks bebas; tanda baca, kutipan, dan kata kunci intent dipertahankan"""
+        return _WORD.sub(lambda match: self._word(match.group(0)), str(value))
+
+    def filename(self, value):
+        stem, ext = os.path.splitext(str(value))
+        return self.text(stem) + ext
+
+    def payload(self, value, key=None, private=False):
+        """
+        Anonimkan payload webhook secara rekursif
+
+        Di dalam PRIVATE_SECTIONS (pesan dan kartu kontak) setiap string dan
+        angka disamarkan kecuali kunci di STRUCTURAL_KEYS; di luar bagian
+        tersebut hanya kunci telepon, ID, dan teks yang dikenal.
+
+        Returns:
+            object: Salinan payload yang sudah dianonimkan
+        """
+        if isinstance(value, dict):
+            return {k: self.payload(v, k, private or k in PRIVATE_SECTIONS) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self.payload(v, key, private) for v in value]
+        if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+            return value
+        if key in PHONE_KEYS:
+            return self.phone(value)
+        if key in ID_KEYS:
+            return self.identifier(value)
+        if key == "filename":
+            return self.filename(value)
+        if private:
+            if key in STRUCTURAL_KEYS:
+                return value
+            if isinstance(value, str):
+                return self.text(value)
+            # Angka (mis. koordinat lokasi) disamarkan per digit, tipe dipertahankan
+            return type(value)(self.text(value))
+        if key in TEXT_KEYS and isinstance(value, str):
+            return self.text(value)
+        return value
+
+
+class TrafficRecorder:
+    def __init__(self, path, salt=None, keep_words=(), sample_rate=1.0,
+                 flush_interval=2.0, flush_records=500, max_pending=10000):
+        """
+        Perekam payload webhook ke file append-only
+
+        Anonimisasi, serialisasi, dan kompresi dilakukan di thread penulis;
+        record() hanya memasukkan payload ke antrean (dibuang jika penuh).
+
+        Args:
+            path (str): File tujuan (.jsonl.gz)
+            salt (str, optional): Kunci anonimisasi; tanpa salt dipakai kunci
+                acak sehingga samaran tidak stabil antar restart
+            keep_words (iterable): Kata yang tidak disamarkan
+            sample_rate (float): Peluang payload direkam
+            flush_interval (float): Jeda maksimum sebelum data ditulis (detik)
+            flush_records (int): Jumlah record per member gzip
+            max_pending (int): Kapasitas antrean
+        """
+        if not salt:
+            logger.warning("WEBHOOK_RECORD_SALT kosong; memakai salt acak (samaran berubah setiap restart)")
+            salt = secrets.token_hex(16)
+        self.path = path
+        self.anonymizer = Anonymizer(salt, keep_words)
+        self.sample_rate = sample_rate
+        self.flush_interval = flush_interval
+        self.flush_records = flush_records
+        self.recorded = 0
+        self.dropped = 0
+        self._queue = queue.Queue(max_pending)
+        self._stop = object()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="waiz-traffic-recorder", daemon=True)
+        self._thread.start()
+        logger.info(f"Merekam trafik webhook ke {path}")
+
+    def record(self, payload, received_at=None):
+        """
+        Rekam satu payload webhook (tidak memblokir)
+
+        Args:
+            payload (dict): Payload JSON webhook
+            received_at (float, optional): Waktu diterima (epoch detik)
+        """
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+        try:
+            self._queue.put_nowait((received_at or time.time(), payload))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is self._stop:
+                self._write(batch)
+                return
+            if item is not None:
+                received_at, payload = item
+                try:
+                    line = json.dumps({"t": int(received_at * 1000), "p": self.anonymizer.payload(payload)},
+                                      ensure_ascii=False, separators=(",", ":"))
+                    batch.append(line)
+                except (TypeError, ValueError) as e:
+                    logger.error(f"Payload webhook tidak bisa direkam: {str(e)}")
+            if len(batch) >= self.flush_records or time.monotonic() >= deadline:
+                self._write(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _write(self, batch):
+        if not batch:
+            return
+        data = gzip.compress(("\n".join(batch) + "\n").encode("utf-8"), compresslevel=6)
+        try:
+            with open(self.path, "ab") as f:
+                f.write(data)
+            self.recorded += len(batch)
+        except OSError as e:
+            logger.error(f"Gagal menulis rekaman trafik: {str(e)}")
+
+    def close(self):
+        """Tulis sisa antrean dan hentikan thread penulis"""
+        if self._thread.is_alive():
+            self._queue.put(self._stop)
+            self._thread.join()
+
+
+def read_records(path):
+    """
+    Baca rekaman trafik
+
+    Yields:
+        tuple: (waktu_ms, payload) sesuai urutan rekaman
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logger.warning("Baris rekaman rusak dilewati")
+                    continue
+                yield record["t"], record["p"]
+        except (EOFError, gzip.BadGzipFile):
+            logger.warning(f"Rekaman {path} terpotong di akhir; sisa data diabaikan")
+
+
+def sender_of(payload):
+    """
+    Returns:
+        str: Pengirim pesan pertama di payload webhook (atau None)
+    """
+    for entry in payload.get("entry", []):
+        for change in entry.get("changes", []):
+            for message in change.get("value", {}).get("messages", []):
+                return message.get("from")
+    return None
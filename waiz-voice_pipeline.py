@@ -0,0 +1,310 @@
+# Modul untuk pipeline giliran suara (voice turn) secara streaming
+import re
+import time
+import queue
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Akhir kalimat: tanda baca penutup diikuti spasi, atau baris baru
+SENTENCE_END = re.compile(r'[.!?…]+["\'\)\]]*\s+|\n+')
+
+# Urutan tahap dalam satu giliran suara (untuk instrumentasi)
+TURN_STAGES = (
+    "speech_end",      # user selesai berbicara (audio selesai direkam)
+    "recognized",      # teks hasil pengenalan suara tersedia
+    "first_token",     # token pertama dari LLM diterima
+    "first_sentence",  # kalimat pertama lengkap dikirim ke TTS
+    "first_audio",     # TTS mulai mengucapkan kalimat pertama
+    "llm_done",        # LLM selesai menghasilkan respons
+    "audio_done",      # semua kalimat selesai diucapkan
+)
+
+
+class SentenceSplitter:
+    def __init__(self, min_chars=10):
+        """
+        Inisialisasi pemecah kalimat untuk token yang datang bertahap
+
+        Args:
+            min_chars (int): Panjang minimum kalimat; potongan yang lebih pendek
+                digabung dengan kalimat berikutnya agar TTS tidak terputus-putus
+        """
+        self.min_chars = min_chars
+        self.buffer = ""
+
+    def feed(self, token):
+        """
+        Tambahkan token dan kembalikan kalimat yang sudah lengkap
+
+        Args:
+            token (str): Potongan teks dari LLM
+
+        Returns:
+            list: Daftar kalimat lengkap (bisa kosong)
+        """
+        self.buffer += token
+        sentences = []
+        start = 0
+
+        for match in SENTENCE_END.finditer(self.buffer):
+            candidate = self.buffer[start:match.end()].strip()
+            if len(candidate) < self.min_chars:
+                # Terlalu pendek, tunggu kalimat berikutnya
+                continue
+            sentences.append(candidate)
+            start = match.end()
+
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self):
+        """
+        Kembalikan sisa teks di buffer sebagai kalimat terakhir
+
+        Returns:
+            str: Sisa teks atau string kosong
+        """
+        rest = self.buffer.strip()
+        self.buffer = ""
+        return rest
+
+
+class TurnTimings:
+    def __init__(self, speech_end=None):
+        """
+        Pencatat waktu setiap tahap dalam satu giliran suara
+
+        Args:
+            speech_end (float, optional): Waktu (time.monotonic) user selesai berbicara
+        """
+        self.marks = {}
+        if speech_end is not None:
+            self.marks["speech_end"] = speech_end
+
+    def mark(self, stage, ts=None):
+        """Catat waktu sebuah tahap (hanya kejadian pertama yang dicatat)"""
+        if stage not in self.marks:
+            self.marks[stage] = ts if ts is not None else time.monotonic()
+
+    def summary(self):
+        """
+        Dapatkan durasi setiap tahap relatif terhadap awal giliran
+
+        Returns:
+            dict: Nama tahap -> milidetik sejak tahap pertama yang tercatat
+        """
+        if not self.marks:
+            return {}
+        origin = self.marks.get("speech_end", min(self.marks.values()))
+        return {
+            stage: round((self.marks[stage] - origin) * 1000, 1)
+            for stage in TURN_STAGES
+            if stage in self.marks
+        }
+
+
+class VoicePipeline:
+    def __init__(self, speak_fn, stop_speech_fn=None, min_sentence_chars=10, history_size=50, echo_tail=2.0):
+        """
+        Inisialisasi pipeline suara: LLM -> pemecah kalimat -> TTS
+
+        Kalimat dikirim ke thread TTS segera setelah lengkap sehingga model
+        tetap menghasilkan token selama audio diputar, dan thread pemanggil
+        bisa kembali mendengarkan sebelum audio selesai.
+
+        Args:
+            speak_fn (callable): Fungsi yang mengucapkan satu kalimat (blocking)
+            stop_speech_fn (callable, optional): Fungsi untuk menghentikan ucapan yang sedang berjalan
+            min_sentence_chars (int): Panjang minimum kalimat yang dikirim ke TTS
+            history_size (int): Jumlah ringkasan waktu giliran yang disimpan
+            echo_tail (float): Lama (detik) setelah audio selesai di mana teks
+                yang terdengar masih bisa dianggap gema
+        """
+        self.speak_fn = speak_fn
+        self.stop_speech_fn = stop_speech_fn
+        self.min_sentence_chars = min_sentence_chars
+
+        self._queue = queue.Queue()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._speaking = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._pending = 0
+        self._current_sentences = deque(maxlen=8)
+        self.echo_tail = echo_tail
+        self._spoken_at = 0.0
+        self._worker = None
+        self._stopped = threading.Event()
+
+        # Ringkasan waktu giliran terakhir untuk instrumentasi
+        self.recent_timings = deque(maxlen=history_size)
+
+    def start(self):
+        """Mulai thread TTS"""
+        if self._worker and self._worker.is_alive():
+            return
+        self._stopped.clear()
+        self._worker = threading.Thread(target=self._tts_worker, name="waiz-tts", daemon=True)
+        self._worker.start()
+        logger.info("Voice pipeline dimulai")
+
+    def stop(self, timeout=2.0):
+        """Hentikan thread TTS dan buang kalimat yang belum diucapkan"""
+        self.interrupt()
+        self._stopped.set()
+        self._queue.put(None)
+        if self._worker:
+            self._worker.join(timeout)
+        logger.info("Voice pipeline dihentikan")
+
+    def say(self, text):
+        """Antrekan teks untuk diucapkan tanpa menunggu (di luar giliran LLM)"""
+        if text:
+            self._enqueue(self._generation, text, None)
+
+    def run_turn(self, token_stream, timings=None):
+        """
+        Jalankan satu giliran: konsumsi token LLM dan kirim per kalimat ke TTS
+
+        Fungsi kembali setelah LLM selesai; audio bisa masih diputar sehingga
+        pemanggil dapat langsung mendengarkan perintah berikutnya (barge-in).
+
+        Args:
+            token_stream (iterable): Token teks dari LLM
+            timings (TurnTimings, optional): Pencatat waktu giliran
+
+        Returns:
+            str: Teks respons lengkap yang diterima
+        """
+        timings = timings or TurnTimings()
+        generation = self._generation
+        splitter = SentenceSplitter(self.min_sentence_chars)
+        parts = []
+
+        try:
+            for token in token_stream:
+                if generation != self._generation:
+                    # Giliran ini dibatalkan (barge-in)
+                    logger.info("Giliran suara dibatalkan saat LLM masih berjalan")
+                    break
+                timings.mark("first_token")
+                parts.append(token)
+                for sentence in splitter.feed(token):
+                    timings.mark("first_sentence")
+                    self._enqueue(generation, sentence, timings)
+        finally:
+            close = getattr(token_stream, "close", None)
+            if close:
+                close()
+
+        if generation == self._generation:
+            rest = splitter.flush()
+            if rest:
+                timings.mark("first_sentence")
+                self._enqueue(generation, rest, timings)
+        timings.mark("llm_done")
+
+        # Penanda akhir giliran agar worker mencatat audio_done
+        self._enqueue(generation, None, timings)
+        return "".join(parts).strip()
+
+    def is_speaking(self):
+        """Cek apakah masih ada audio yang diputar atau menunggu diputar"""
+        return not self._idle.is_set()
+
+    def wait_until_idle(self, timeout=None):
+        """Tunggu sampai semua kalimat selesai diucapkan"""
+        return self._idle.wait(timeout)
+
+    def is_echo(self, text, threshold=0.6):
+        """
+        Cek apakah teks yang terdengar kemungkinan adalah gema dari TTS sendiri
+
+        Args:
+            text (str): Teks hasil pengenalan suara
+            threshold (float): Rasio kata yang sama untuk dianggap gema
+
+        Gema hanya mungkin selama audio diputar atau sesaat setelahnya
+        (echo_tail); di luar itu pengguna bebas mengulang kata dari balasan,
+        termasuk hotword.
+
+        Returns:
+            bool: True jika teks mirip dengan kalimat yang sedang atau baru
+                saja diucapkan
+        """
+        if not self.is_speaking() and time.monotonic() - self._spoken_at > self.echo_tail:
+            return False
+        words = set(re.findall(r"\w+", text.lower()))
+        if not words:
+            return False
+        spoken = set()
+        for sentence in list(self._current_sentences):
+            spoken.update(re.findall(r"\w+", sentence.lower()))
+        return len(words & spoken) / len(words) >= threshold
+
+    def interrupt(self):
+        """Barge-in: batalkan giliran berjalan dan hentikan audio"""
+        with self._lock:
+            self._generation += 1
+        # Buang kalimat yang belum diucapkan
+        try:
+            while True:
+                self._queue.get_nowait()
+                self._task_done()
+        except queue.Empty:
+            pass
+        if self._speaking.is_set() and self.stop_speech_fn:
+            try:
+                self.stop_speech_fn()
+            except Exception as e:
+                logger.error(f"Error saat menghentikan TTS: {e}")
+
+    def _enqueue(self, generation, sentence, timings):
+        with self._lock:
+            self._pending += 1
+            self._idle.clear()
+        self._queue.put((generation, sentence, timings))
+
+    def _task_done(self):
+        with self._lock:
+            self._pending = max(0, self._pending - 1)
+            if self._pending == 0:
+                self._idle.set()
+
+    def _tts_worker(self):
+        while not self._stopped.is_set():
+            item = self._queue.get()
+            if item is None:
+                continue
+
+            generation, sentence, timings = item
+            try:
+                if sentence is None:
+                    # Akhir giliran
+                    if timings is not None and generation == self._generation:
+                        timings.mark("audio_done")
+                        summary = timings.summary()
+                        self.recent_timings.append(summary)
+                        logger.info(f"Waktu giliran suara (ms): {summary}")
+                    continue
+
+                if generation != self._generation:
+                    continue
+
+                if timings is not None:
+                    timings.mark("first_audio")
+                self._current_sentences.append(sentence)
+                self._speaking.set()
+                try:
+                    self.speak_fn(sentence)
+                finally:
+                    self._spoken_at = time.monotonic()
+                    self._speaking.clear()
+            except Exception as e:
+                logger.error(f"Error di thread TTS: {e}")
+            finally:
+                self._task_done()
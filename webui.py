@@ -3,10 +3,11 @@
 import os
 import sys
 import time
-import json
+import atexit
 import logging
+import importlib.util
 from pathlib import Path
-from threading import Thread, Event
+from threading import Thread, Event, Lock
 
 # Konfigurasi logging
 logging.basicConfig(
@@ -16,77 +17,241 @@ logging.basicConfig(
 )
 logger = logging.getLogger("AI-WaiZ-WebUI")
 
-# Import modul utama
+# Import modul utama. Modul berat (speech_recognition, pyttsx3, openai)
+# hanya diperiksa keberadaannya di sini dan baru diimpor saat pertama dipakai.
 try:
-    import speech_recognition as sr
-    import pyttsx3
-    from openai import OpenAI
     from flask import Flask, render_template, request, jsonify
+    from voice_pipeline import VoicePipeline, TurnTimings
+    from config import get_settings, subscribe, start_watcher, ASSISTANT_FIELDS
+    import metrics
+    from snapshot import Snapshotter, ShutdownSequence, install_signal_handlers
+    import diagnostics
+    import profiler
 except ImportError as e:
     logger.error(f"Gagal mengimpor modul yang diperlukan: {e}")
     logger.info("Silakan jalankan: pip install -r requirements.txt")
     sys.exit(1)
 
+_missing = [name for name in ("speech_recognition", "pyttsx3", "openai") if importlib.util.find_spec(name) is None]
+if _missing:
+    logger.error(f"Gagal mengimpor modul yang diperlukan: {', '.join(_missing)}")
+    logger.info("Silakan jalankan: pip install -r requirements.txt")
+    sys.exit(1)
+
 # Pastikan file konfigurasi ada
 CONFIG_FILE = Path("config.json")
 if not CONFIG_FILE.exists():
     logger.error(f"File konfigurasi tidak ditemukan: {CONFIG_FILE}")
     sys.exit(1)
 
-# Muat konfigurasi
+# Muat konfigurasi (sekali; dimuat ulang otomatis saat file berubah)
 try:
-    with open(CONFIG_FILE, "r") as f:
-        config = json.load(f)
+    get_settings()
 except Exception as e:
     logger.error(f"Gagal memuat konfigurasi: {e}")
     sys.exit(1)
 
-# Inisialisasi OpenAI client
-client = OpenAI(api_key=config.get("openai_api_key"))
-
 # Inisialisasi Flask
 app = Flask(__name__)
 app.secret_key = os.urandom(24)
+metrics.register_flask(app)
+
+OPENAI_SECONDS = metrics.histogram("waiz_openai_request_seconds", "Durasi request OpenAI sampai selesai", ("mode",))
+OPENAI_FIRST_TOKEN_SECONDS = metrics.histogram("waiz_openai_first_token_seconds", "Waktu sampai token pertama (streaming)")
+OPENAI_REQUESTS = metrics.counter("waiz_openai_requests_total", "Jumlah request OpenAI", ("mode", "status"))
+OPENAI_TOKENS = metrics.counter("waiz_openai_tokens_total", "Jumlah token OpenAI yang dipakai", ("kind",))
 
 # Variabel global untuk status
 is_listening = False
 stop_event = Event()
 conversation_history = []
 
-# Inisialisasi TTS engine
-engine = pyttsx3.init()
-voices = engine.getProperty('voices')
-if 0 <= config.get("voice_id", 0) < len(voices):
-    engine.setProperty('voice', voices[config.get("voice_id")].id)
-engine.setProperty('rate', config.get("speech_rate", 150))
+# Engine TTS, recognizer, dan OpenAI client dibuat saat pertama dibutuhkan
+engine = None
+client = None
+recognizer = None
+_init_lock = Lock()
+
+# pyttsx3 tidak thread-safe: thread TTS dan endpoint /api/tts berbagi engine
+tts_lock = Lock()
+
+def get_engine():
+    """Dapatkan engine TTS (diinisialisasi saat pertama dipanggil)"""
+    global engine
+    if engine is None:
+        with _init_lock:
+            if engine is None:
+                import pyttsx3
+                tts = pyttsx3.init()
+                apply_voice_settings(tts, get_settings())
+                engine = tts
+                logger.info("Engine TTS diinisialisasi")
+    return engine
+
+def get_client():
+    """Dapatkan OpenAI client (dibuat saat pertama dipanggil)"""
+    global client
+    if client is None:
+        with _init_lock:
+            if client is None:
+                from openai import OpenAI
+                settings = get_settings()
+                client = OpenAI(api_key=settings.openai_api_key, base_url=settings.openai_base_url or None)
+    return client
+
+def apply_voice_settings(tts, settings):
+    """Terapkan suara dan kecepatan bicara ke engine TTS"""
+    voices = tts.getProperty('voices')
+    if 0 <= settings.voice_id < len(voices):
+        tts.setProperty('voice', voices[settings.voice_id].id)
+    tts.setProperty('rate', settings.speech_rate)
+
+def on_config_change(old, new, changed):
+    """Perbarui engine dan client yang sudah berjalan saat konfigurasi berubah"""
+    global client
+    if engine is not None and changed & {"voice_id", "speech_rate"}:
+        with tts_lock:
+            apply_voice_settings(engine, new)
+        logger.info(f"Pengaturan suara diperbarui: rate={new.speech_rate}, voice_id={new.voice_id}")
+    if changed & {"openai_api_key", "openai_base_url"}:
+        # Client dibuat ulang dengan API key/endpoint baru saat dibutuhkan
+        client = None
+    if changed & {"model", "max_tokens", "temperature"}:
+        # Dibaca dari get_settings() di setiap permintaan
+        logger.info(f"Pengaturan model diperbarui: {new.model}, max_tokens={new.max_tokens}, "
+                    f"temperature={new.temperature}")
+
+subscribe(on_config_change)
+
+def get_recognizer():
+    """Dapatkan modul speech_recognition dan recognizer (dibuat saat pertama dipanggil)"""
+    global recognizer
+    import speech_recognition as sr
+    if recognizer is None:
+        with _init_lock:
+            if recognizer is None:
+                recognizer = sr.Recognizer()
+    return sr, recognizer
+
+SYSTEM_PROMPT = "Kamu adalah asisten AI bernama WaiZ yang membantu dan ramah."
 
 def speak(text):
     """Fungsi untuk mengucapkan teks"""
     try:
         logger.info(f"AI: {text}")
-        engine.say(text)
-        engine.runAndWait()
+        tts = get_engine()
+        with tts_lock:
+            tts.say(text)
+            tts.runAndWait()
         return True
     except Exception as e:
         logger.error(f"Error pada TTS: {e}")
         return False
 
-def listen_once():
-    """Fungsi untuk mendengarkan satu perintah"""
-    recognizer = sr.Recognizer()
+def stop_speaking():
+    """Hentikan ucapan yang sedang berjalan (untuk barge-in)"""
+    # Engine yang belum pernah dibuat tidak sedang berbicara
+    if engine is not None:
+        engine.stop()
+
+# Pipeline suara: kalimat diucapkan selagi LLM masih menghasilkan token
+voice_pipeline = VoicePipeline(speak, stop_speaking)
+
+def listen_once(timings=None):
+    """
+    Fungsi untuk mendengarkan satu perintah
+
+    Args:
+        timings (dict, optional): Diisi dengan waktu 'speech_end' dan 'recognized'
+    """
+    settings = get_settings()
     try:
+        sr, recognizer = get_recognizer()
         with sr.Microphone() as source:
             logger.info("Mendengarkan input suara...")
             recognizer.adjust_for_ambient_noise(source, duration=0.5)
-            audio = recognizer.listen(source, timeout=5)
+            audio = recognizer.listen(source, timeout=settings.listening_timeout)
+        speech_end = time.monotonic()
             
-        text = recognizer.recognize_google(audio, language=config.get("language", "id"))
+        text = recognizer.recognize_google(audio, language=settings.language)
+        if timings is not None:
+            timings["speech_end"] = speech_end
+            timings["recognized"] = time.monotonic()
         logger.info(f"Input suara: {text}")
         return text.lower()
     except Exception as e:
         logger.error(f"Error saat mendengarkan: {e}")
         return ""
 
+def record_usage(usage):
+    """Catat pemakaian token dari respons OpenAI"""
+    if usage is None:
+        return
+    OPENAI_TOKENS.labels("prompt").inc(usage.prompt_tokens or 0)
+    OPENAI_TOKENS.labels("completion").inc(usage.completion_tokens or 0)
+
+def build_messages():
+    """Susun messages untuk API dari system prompt dan riwayat percakapan"""
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT}
+    ]
+    # Tambahkan riwayat percakapan (batasi jumlah pesan untuk menghemat token)
+    messages.extend(conversation_history[-5:])
+    return messages
+
+@profiler.tag("openai.stream_ai_response")
+def stream_ai_response(prompt):
+    """
+    Dapatkan respons dari model AI secara streaming
+
+    Yields:
+        str: Potongan teks respons sesuai urutan kedatangan
+    """
+    conversation_history.append({"role": "user", "content": prompt})
+    parts = []
+    settings = get_settings()
+    start = time.perf_counter()
+    status = "error"
+    try:
+        stream = get_client().chat.completions.create(
+            model=settings.model,
+            messages=build_messages(),
+            max_tokens=settings.max_tokens,
+            temperature=settings.temperature,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        for chunk in stream:
+            # Chunk terakhir hanya berisi usage (choices kosong)
+            record_usage(getattr(chunk, "usage", None))
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if not parts:
+                    OPENAI_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - start)
+                parts.append(delta)
+                yield delta
+        status = "success"
+    except GeneratorExit:
+        # Generator ditutup lebih awal (barge-in), bukan kegagalan API
+        status = "interrupted"
+        raise
+    except Exception as e:
+        logger.error(f"Error saat meminta respons AI: {e}")
+        if not parts:
+            fallback = "Maaf, saya mengalami kesulitan untuk merespons saat ini."
+            parts.append(fallback)
+            yield fallback
+    finally:
+        OPENAI_SECONDS.labels("stream").observe(time.perf_counter() - start)
+        OPENAI_REQUESTS.labels("stream", status).inc()
+        # Simpan respons (termasuk yang terpotong oleh barge-in) ke riwayat
+        response_text = "".join(parts).strip()
+        if response_text:
+            conversation_history.append({"role": "assistant", "content": response_text})
+
+@profiler.tag("openai.get_ai_response")
 def get_ai_response(prompt):
     """Dapatkan respons dari model AI"""
     try:
@@ -94,19 +259,25 @@ def get_ai_response(prompt):
         conversation_history.append({"role": "user", "content": prompt})
         
         # Siapkan messages untuk API
-        messages = [
-            {"role": "system", "content": "Kamu adalah asisten AI bernama WaiZ yang membantu dan ramah."}
-        ]
-        # Tambahkan riwayat percakapan (batasi jumlah pesan untuk menghemat token)
-        messages.extend(conversation_history[-5:])
+        messages = build_messages()
         
         # Buat API call
-        response = client.chat.completions.create(
-            model=config.get("model", "gpt-3.5-turbo"),
-            messages=messages,
-            max_tokens=config.get("max_tokens", 150),
-            temperature=config.get("temperature", 0.7)
-        )
+        settings = get_settings()
+        start = time.perf_counter()
+        try:
+            response = get_client().chat.completions.create(
+                model=settings.model,
+                messages=messages,
+                max_tokens=settings.max_tokens,
+                temperature=settings.temperature
+            )
+        except Exception:
+            OPENAI_REQUESTS.labels("complete", "error").inc()
+            raise
+        finally:
+            OPENAI_SECONDS.labels("complete").observe(time.perf_counter() - start)
+        OPENAI_REQUESTS.labels("complete", "success").inc()
+        record_usage(getattr(response, "usage", None))
         
         # Dapatkan teks respons
         response_text = response.choices[0].message.content.strip()
@@ -123,47 +294,68 @@ def voice_assistant_thread():
     """Thread untuk asisten suara"""
     global is_listening
     
-    speak("Asisten suara WaiZ telah diaktifkan.")
+    voice_pipeline.start()
+    voice_pipeline.say("Asisten suara WaiZ telah diaktifkan.")
     
-    hotword = config.get("hotword", "waiz").lower()
     is_active = False
     
     while not stop_event.is_set():
+        settings = get_settings()
+        hotword = settings.hotword.lower()
+        barge_in = settings.barge_in
         try:
+            # Mendengarkan dimulai walaupun audio masih diputar (barge-in)
+            listen_timings = {}
+            text = listen_once(listen_timings)
+
+            if text and voice_pipeline.is_echo(text):
+                # Mikrofon menangkap suara TTS sendiri (balasan sering memuat
+                # hotword), abaikan sebelum hotword diperiksa
+                continue
+
+            if text and voice_pipeline.is_speaking():
+                if not barge_in:
+                    continue
+                logger.info("Barge-in: menghentikan audio yang sedang diputar")
+                voice_pipeline.interrupt()
+
             if not is_active:
                 # Mode hotword - menunggu aktivasi
-                text = listen_once()
                 if hotword in text:
                     is_active = True
-                    speak("Ya, saya mendengarkan.")
+                    voice_pipeline.say("Ya, saya mendengarkan.")
             else:
                 # Mode aktif - mendengarkan perintah
-                text = listen_once()
                 if text:
                     # Periksa untuk keluar dari mode aktif
                     if "kembali ke hotword" in text or "mode siaga" in text:
-                        speak("Kembali ke mode hotword.")
+                        voice_pipeline.say("Kembali ke mode hotword.")
                         is_active = False
                         continue
                     
-                    # Proses perintah/pertanyaan
-                    response = get_ai_response(text)
-                    speak(response)
-                else:
+                    # Proses perintah/pertanyaan: kalimat diucapkan selagi LLM berjalan
+                    timings = TurnTimings(listen_timings.get("speech_end"))
+                    timings.mark("recognized", listen_timings.get("recognized"))
+                    voice_pipeline.run_turn(stream_ai_response(text), timings)
+                elif not voice_pipeline.is_speaking():
                     # Jika tidak ada input, kembali ke mode hotword
                     is_active = False
             
             # Periksa perintah keluar
             if "matikan asisten" in text:
-                speak("Mematikan asisten suara.")
+                voice_pipeline.interrupt()
+                voice_pipeline.say("Mematikan asisten suara.")
+                voice_pipeline.wait_until_idle(5)
                 break
                 
-            time.sleep(0.1)
+            if not text:
+                time.sleep(0.1)
                 
         except Exception as e:
             logger.error(f"Error di thread asisten suara: {e}")
             time.sleep(1)
     
+    voice_pipeline.stop()
     is_listening = False
     logger.info("Thread asisten suara berhenti.")
 
@@ -174,6 +366,8 @@ def index():
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
+    if shutdown is not None and shutdown.stopping:
+        return jsonify({"error": "Server sedang dimatikan"}), 503
     try:
         data = request.json
         user_input = data.get('message', '')
@@ -221,7 +415,7 @@ def start_voice():
         stop_event.clear()
         
         # Mulai thread asisten suara
-        voice_thread = Thread(target=voice_assistant_thread)
+        voice_thread = Thread(target=voice_assistant_thread, name="waiz-voice")
         voice_thread.daemon = True
         voice_thread.start()
         
@@ -250,16 +444,59 @@ def stop_voice():
         logger.error(f"Error saat menghentikan asisten suara: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/voice/timings', methods=['GET'])
+def voice_timings():
+    # Ringkasan waktu per tahap untuk giliran suara terakhir
+    return jsonify({"turns": list(voice_pipeline.recent_timings)})
+
 @app.route('/api/config', methods=['GET'])
 def get_config():
     # Kembalikan konfigurasi (kecuali API key)
-    safe_config = {k: v for k, v in config.items() if k != 'openai_api_key'}
+    safe_config = get_settings().as_dict(keys=ASSISTANT_FIELDS)
     return jsonify(safe_config)
 
+def _load_history(history):
+    conversation_history[:0] = history
+    return len(history)
+
+def _stop_voice():
+    stop_event.set()
+    voice_pipeline.stop()
+
+# Estimasi memori per subsistem; memori native pyttsx3/driver TTS tidak
+# terlihat dari Python dan hanya tampak di RSS
+diagnostics.register_source("conversation_history", diagnostics.collection_source(conversation_history))
+diagnostics.register_source("voice_pipeline", diagnostics.object_source(voice_pipeline))
+diagnostics.register_source("tts_engine", lambda: {"initialized": engine is not None})
+diagnostics.register_flask(app, lambda: get_settings().debug_token)
+profiler.PROFILER.output_dir = get_settings().profile_dir
+profiler.register_flask(app, lambda: get_settings().debug_token)
+if get_settings().memory_sampler_interval > 0:
+    diagnostics.AllocationSampler(get_settings().memory_sampler_interval, get_settings().memory_sampler_top).start()
+
+# Urutan shutdown; hanya dibuat oleh main() agar modul yang sekadar mengimpor
+# webui (mis. benchmark) tidak memakan atau menulis snapshot
+shutdown = None
+
 def main():
     """Fungsi utama untuk menjalankan web UI"""
+    global shutdown
     try:
         logger.info("Memulai WaiZ Web UI...")
+        # Riwayat percakapan disimpan saat shutdown dan dimuat lagi saat start
+        snapshotter = Snapshotter(os.path.join(get_settings().snapshot_dir, "webui.json.gz"),
+                                  max_age=get_settings().snapshot_max_age)
+        snapshotter.register("conversation_history", lambda: list(conversation_history), _load_history)
+        snapshotter.restore()
+
+        # Urutan shutdown: tolak chat baru, hentikan asisten suara, lalu snapshot
+        shutdown = ShutdownSequence()
+        shutdown.add("voice", _stop_voice)
+        shutdown.add("snapshot", snapshotter.save)
+        atexit.register(shutdown.run)
+
+        start_watcher()
+        install_signal_handlers()
         app.run(host='0.0.0.0', port=5000, debug=False)
     except Exception as e:
         logger.error(f"Error saat menjalankan server: {e}")